@@ -0,0 +1,87 @@
+"""Startup cost of the CLI — what `geo db-stats` / `geo costs` / `geo export` pay before doing any work.
+
+For each command, times fresh interpreters importing what it imports (cli
+plus the modules the command loads itself), then runs one more under
+`-X importtime` and lists the slowest imports (cumulative). Interpreters start
+in a scratch directory, so anything that still depends on the working
+directory shows up as a failure.
+
+    python benchmarks/bench_import.py
+    python benchmarks/bench_import.py --command db-stats --runs 5 --top 20
+    python benchmarks/bench_import.py --module src.runner
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Import path of each command: cli, then the modules the command imports itself
+COMMANDS = {
+    "startup": ["cli"],
+    "db-stats": ["cli", "src.storage.db"],
+    "costs": ["cli", "src.providers.targets", "src.reporting.costs"],
+    "export": ["cli", "src.reporting.csv_export"],
+}
+
+
+def _python(args: list[str], cwd: str) -> subprocess.CompletedProcess:
+    env = {**os.environ, "PYTHONPATH": str(ROOT), "PYTHONDONTWRITEBYTECODE": "1"}
+    return subprocess.run([sys.executable, *args], cwd=cwd, env=env, capture_output=True, text=True)
+
+
+def _slowest(importtime_log: str, top: int) -> list[tuple[int, str]]:
+    """(cumulative µs, module) for the slowest imports in an `-X importtime` log."""
+    rows = []
+    for line in importtime_log.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, module = line.removeprefix("import time:").split("|")
+        rows.append((int(cumulative), module.rstrip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def _bench(name: str, code: str, runs: int, top: int, tmp: str):
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        proc = _python(["-c", code], tmp)
+        timings.append(time.perf_counter() - start)
+        if proc.returncode:
+            sys.exit(f"`{code}` failed outside the project directory:\n{proc.stderr}")
+    profile = _python(["-X", "importtime", "-c", code], tmp)
+
+    print(f"\n{name} ({code}): median {statistics.median(timings) * 1000:.0f} ms, "
+          f"min {min(timings) * 1000:.0f} ms over {runs} runs")
+    for cumulative, module in _slowest(profile.stderr, top):
+        print(f"  {cumulative / 1000:8.1f} ms  {module}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--command", action="append", choices=list(COMMANDS), help="Command(s) to time (default: all)")
+    parser.add_argument("--module", action="append", default=[], help="Also time a plain `import <module>`")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--top", type=int, default=8, help="Slowest imports to list per command")
+    args = parser.parse_args()
+
+    benches = {name: COMMANDS[name] for name in args.command or ([] if args.module else COMMANDS)}
+    benches.update({module: [module] for module in args.module})
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        _python(["-c", "pass"], tmp)
+        print(f"bare interpreter: {(time.perf_counter() - start) * 1000:.0f} ms")
+        for name, modules in benches.items():
+            _bench(name, f"import {', '.join(modules)}", args.runs, args.top, tmp)
+
+
+if __name__ == "__main__":
+    main()
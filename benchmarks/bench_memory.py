@@ -0,0 +1,91 @@
+"""Peak memory of responses held in flight during a high-concurrency run.
+
+Builds N provider responses shaped like real OpenAI/Gemini answers (text,
+offset-only citations, a raw payload), persists each one to a scratch
+database, releases the payload and normalizes the citations, keeping every
+response alive as if it were waiting on extraction. Reports the tracemalloc
+peak and the process's peak RSS.
+
+    python benchmarks/bench_memory.py --responses 5000
+    python benchmarks/bench_memory.py --responses 5000 --keep-payload   # before release_payload()
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.extraction.normalizer import normalize_citations  # noqa: E402
+from src.providers.base import ProviderResponse, RawCitation  # noqa: E402
+from src.storage import db  # noqa: E402
+
+WORDS = "coca-cola thums up sprite pepsi refreshing classic cola india summer drink best popular brand".split()
+
+
+def _response(rnd: random.Random, text_chars: int, citations: int, payload_kb: int) -> ProviderResponse:
+    text = " ".join(rnd.choice(WORDS) for _ in range(text_chars // 7))[:text_chars]
+    cites = []
+    for i in range(citations):
+        start = rnd.randrange(0, max(len(text) - 200, 1))
+        cites.append(RawCitation(
+            url=f"https://www.example{i}.com/article/{rnd.randrange(10**6)}?utm_source=openai",
+            title=f"Source {i}",
+            start_index=start,
+            end_index=start + 150,
+        ))
+    payload = {"output": [{"type": "message", "content": [{"text": text, "blob": "x" * (payload_kb * 1024)}]}]}
+    return ProviderResponse(
+        provider="openai", model="bench", raw_text=text, raw_citations=cites, raw_response=payload,
+        latency_ms=1000, input_tokens=50, output_tokens=text_chars // 4,
+    )
+
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024  # bytes on macOS, KiB on Linux
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--responses", type=int, default=2000)
+    parser.add_argument("--text-chars", type=int, default=4000)
+    parser.add_argument("--citations", type=int, default=10)
+    parser.add_argument("--payload-kb", type=int, default=40)
+    parser.add_argument("--keep-payload", action="store_true", help="Don't release raw payloads after storing")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db.DB_PATH = Path(tmp) / "bench.db"
+        db.init_db()
+        run_id = db.create_run(args.responses, 1, 1)
+        rnd = random.Random(0)
+        in_flight = []
+
+        tracemalloc.start()
+        start = time.perf_counter()
+        for i in range(args.responses):
+            resp = _response(rnd, args.text_chars, args.citations, args.payload_kb)
+            db.store_response(run_id, f"p{i}", "prompt", resp)
+            if not args.keep_payload:
+                resp.release_payload()
+            in_flight.append((resp, normalize_citations(resp)))
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    print(f"responses in flight: {len(in_flight):,} ({'payload kept' if args.keep_payload else 'payload released'})")
+    print(f"elapsed:             {elapsed:.2f}s")
+    print(f"tracemalloc peak:    {peak / 1024 / 1024:.1f} MiB")
+    print(f"peak RSS:            {_peak_rss_mb():.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,19 +3,15 @@
 from __future__ import annotations
 
 import asyncio
+import sys
 
-import yaml
 import typer
 from dotenv import load_dotenv
 from rich.console import Console
 from rich.panel import Panel
 from rich.table import Table
 
-from src.providers.openai_provider import OpenAIProvider
-from src.providers.gemini_provider import GeminiProvider
-from src.providers.perplexity_provider import PerplexityProvider
-from src.extraction.normalizer import normalize_citations
-from src.extraction.analyzer import analyze_response
+from src.config import load_config as _load_config
 
 load_dotenv()
 
@@ -23,187 +19,251 @@ app = typer.Typer(help="Coca-Cola India GEO Measure Loop")
 console = Console()
 
 
-def _load_config() -> dict:
-    """Load config.yaml."""
-    with open("config.yaml") as f:
-        return yaml.safe_load(f)
+def _enabled_providers() -> list[str]:
+    """Registered providers enabled in config.yaml (their SDKs are not imported)."""
+    from src.providers.registry import available_providers
 
+    provider_cfg = _load_config().get("providers", {})
+    return [name for name in available_providers() if (provider_cfg.get(name) or {}).get("enabled", False)]
 
-def _build_providers() -> dict:
-    """Build provider map from config.yaml."""
-    cfg = _load_config()
-    providers = {}
-    provider_cfg = cfg.get("providers", {})
 
-    if provider_cfg.get("openai", {}).get("enabled", False):
-        model = provider_cfg["openai"].get("model", "gpt-5.2-chat-latest")
-        providers["openai"] = lambda m=model: OpenAIProvider(model=m)
-
-    if provider_cfg.get("gemini", {}).get("enabled", False):
-        model = provider_cfg["gemini"].get("model", "gemini-3-flash-preview")
-        providers["gemini"] = lambda m=model: GeminiProvider(model=m)
-
-    if provider_cfg.get("perplexity", {}).get("enabled", False):
-        model = provider_cfg["perplexity"].get("model", "sonar")
-        providers["perplexity"] = lambda m=model: PerplexityProvider(model=m)
+def _run_async(coro):
+    """Run an async function synchronously."""
+    return asyncio.run(coro)
 
-    return providers
 
+def _read_prompts(prompt: str | None, prompts_file: str | None) -> list[str]:
+    """The prompt argument and/or prompts from stdin (`-`) and a file: one per line,
+    blank lines and #comments skipped."""
+    lines = sys.stdin.read().splitlines() if prompt == "-" else []
+    if prompts_file:
+        with open(prompts_file) as f:
+            lines += f.read().splitlines()
+    prompts = [prompt] if prompt and prompt != "-" else []
+    return prompts + [line.strip() for line in lines if line.strip() and not line.lstrip().startswith("#")]
 
-PROVIDERS = _build_providers()
 
+def _print_query_result(pname: str, resp, normalized: list, analysis, local_confidence: float | None, show_text: bool):
+    """Render one provider's response: text, citations, stats and brand analysis."""
+    # Response text (truncated for display); already shown live when streaming
+    if show_text:
+        display_text = resp.raw_text[:2000]
+        if len(resp.raw_text) > 2000:
+            display_text += "\n... (truncated)"
+        console.print(Panel(display_text, title=f"{pname} — {resp.model}", border_style="green"))
 
-def _run_async(coro):
-    """Run an async function synchronously."""
-    return asyncio.run(coro)
+    # Citations table
+    if resp.raw_citations:
+        table = Table(title=f"Citations ({len(resp.raw_citations)})")
+        table.add_column("#", style="dim", width=3)
+        table.add_column("URL", style="cyan", max_width=80)
+        table.add_column("Title", max_width=40)
 
+        for i, c in enumerate(resp.raw_citations, 1):
+            table.add_row(str(i), c.url, c.title or "—")
 
-@app.command()
-def query(
-    prompt: str = typer.Argument(..., help="The prompt to send to LLM(s)"),
-    provider: str = typer.Option("openai", "--provider", "-p", help="Provider to query (openai, gemini, perplexity, all)"),
-    show_citations: bool = typer.Option(False, "--show-citations", "-c", help="Show normalized citation table"),
-    analyze: bool = typer.Option(False, "--analyze", "-a", help="Run brand extraction analysis"),
-):
-    """Query a single prompt against one or all providers."""
-    if provider == "all":
-        providers_to_run = list(PROVIDERS.keys())
-    elif provider in PROVIDERS:
-        providers_to_run = [provider]
+        console.print(table)
     else:
-        console.print(f"[red]Unknown provider: {provider}[/red]")
-        console.print(f"Available: {', '.join(PROVIDERS.keys())}, all")
-        raise typer.Exit(1)
+        console.print("[dim]No citations returned[/dim]")
+
+    # Stats
+    ttft = f"TTFT: {resp.ttft_ms}ms | " if resp.ttft_ms is not None else ""
+    tps = f" ({resp.tokens_per_second:.0f} tok/s)" if resp.tokens_per_second else ""
+    console.print(
+        f"  [dim]Latency: {resp.latency_ms}ms | {ttft}"
+        f"Tokens: {resp.input_tokens} in / {resp.output_tokens} out{tps} | "
+        f"Citations: {len(resp.raw_citations)}[/dim]"
+    )
 
-    console.print(Panel(f"[bold]{prompt}[/bold]", title="Prompt", border_style="cyan"))
+    # Brand extraction analysis
+    if local_confidence is not None:
+        console.print(f"  [dim]Local analyzer confidence: {local_confidence:.2f}[/dim]")
+    if isinstance(analysis, Exception):
+        console.print(f"  [red]Analysis error: {analysis}[/red]")
+        return
+    if analysis is None:
+        return
+
+    analysis_table = Table(title=f"Brand Analysis — {pname}", border_style="magenta")
+    analysis_table.add_column("Brand", style="bold", width=15)
+    analysis_table.add_column("Pos", justify="center", width=4)
+    analysis_table.add_column("Sentiment", width=10)
+    analysis_table.add_column("Recommended?", justify="center", width=12)
+    analysis_table.add_column("Context", max_width=50)
+
+    for m in analysis.all_mentions:
+        sent_color = {"positive": "green", "neutral": "yellow", "negative": "red", "mixed": "blue"}
+        color = sent_color.get(m.sentiment.value, "white")
+        analysis_table.add_row(
+            m.brand,
+            str(m.position),
+            f"[{color}]{m.sentiment.value}[/{color}]",
+            "[green]Yes[/green]" if m.is_recommended else "—",
+            m.context,
+        )
 
-    all_normalized = []
+    console.print(analysis_table)
 
-    for pname in providers_to_run:
-        p = PROVIDERS[pname]()
-        console.print(f"\n[bold blue]Querying {pname}...[/bold blue]")
+    # Summary line
+    coke_str = ", ".join(analysis.coke_brands_found) if analysis.coke_brands_found else "none"
+    comp_str = ", ".join(analysis.competitor_brands_found) if analysis.competitor_brands_found else "none"
+    primary = "[green]Yes[/green]" if analysis.coke_is_primary_recommendation else "[red]No[/red]"
 
-        try:
-            resp = _run_async(p.query(prompt))
-        except Exception as e:
-            console.print(f"[red]Error from {pname}: {e}[/red]")
-            continue
+    console.print(f"  Coke brands: [cyan]{coke_str}[/cyan]")
+    console.print(f"  Competitors: [yellow]{comp_str}[/yellow]")
+    console.print(f"  Response type: {analysis.response_type}")
+    console.print(f"  Coke is primary recommendation: {primary}")
 
-        # Response text (truncated for display)
-        display_text = resp.raw_text[:2000]
-        if len(resp.raw_text) > 2000:
-            display_text += "\n... (truncated)"
-        console.print(Panel(display_text, title=f"{pname} — {resp.model}", border_style="green"))
 
-        # Normalize citations
-        normalized = normalize_citations(resp)
-        all_normalized.extend([(pname, c) for c in normalized])
+def _print_normalized_citations(all_normalized: list):
+    """Unified normalized citation table across providers, with their domain overlap."""
+    table = Table(title="Normalized Citations (All Providers)", border_style="blue")
+    table.add_column("Provider", style="bold", width=12)
+    table.add_column("Domain", style="cyan", max_width=30)
+    table.add_column("Title", max_width=40)
+    table.add_column("Conf.", justify="right", width=6)
+    table.add_column("Coke?", justify="center", width=5)
 
-        # Citations table
-        if resp.raw_citations:
-            table = Table(title=f"Citations ({len(resp.raw_citations)})")
-            table.add_column("#", style="dim", width=3)
-            table.add_column("URL", style="cyan", max_width=80)
-            table.add_column("Title", max_width=40)
+    for pname, c in all_normalized:
+        coke_flag = "[green]Yes[/green]" if c.is_coke_domain else "—"
+        table.add_row(
+            pname,
+            c.domain,
+            c.title or "—",
+            f"{c.confidence:.2f}",
+            coke_flag,
+        )
 
-            for i, c in enumerate(resp.raw_citations, 1):
-                table.add_row(str(i), c.url, c.title or "—")
+    console.print(table)
 
-            console.print(table)
-        else:
-            console.print("[dim]No citations returned[/dim]")
+    # Domain overlap analysis
+    domains_by_provider: dict[str, set[str]] = {}
+    for pname, c in all_normalized:
+        domains_by_provider.setdefault(pname, set()).add(c.domain)
+
+    if len(domains_by_provider) > 1:
+        all_domains = [s for s in domains_by_provider.values()]
+        shared = set.intersection(*all_domains) if all_domains else set()
+        total = set.union(*all_domains) if all_domains else set()
+        overlap_pct = (len(shared) / len(total) * 100) if total else 0
 
-        # Stats
         console.print(
-            f"  [dim]Latency: {resp.latency_ms}ms | "
-            f"Tokens: {resp.input_tokens} in / {resp.output_tokens} out | "
-            f"Citations: {len(resp.raw_citations)}[/dim]"
+            f"\n  [dim]Domain overlap: {len(shared)}/{len(total)} "
+            f"({overlap_pct:.0f}%) — shared: {', '.join(shared) if shared else 'none'}[/dim]"
         )
 
-        # Brand extraction analysis
+
+@app.command()
+def query(
+    prompt: str = typer.Argument(None, help="The prompt to send to LLM(s); '-' reads prompts from stdin, one per line"),
+    prompts_file: str = typer.Option(None, "--file", "-f", help="Also query each line of this file (blank lines and #comments skipped)"),
+    provider: str = typer.Option("openai", "--provider", "-p", help="Provider(s) to query, comma-separated, or all"),
+    show_citations: bool = typer.Option(False, "--show-citations", "-c", help="Show normalized citation table"),
+    analyze: bool = typer.Option(False, "--analyze", "-a", help="Run brand extraction analysis"),
+    analyzer: str = typer.Option("llm", "--analyzer", help="Extraction with --analyze: llm, local (rule-based, offline) or hybrid"),
+    stream: bool = typer.Option(False, "--stream", help="Stream responses and report time-to-first-token (text shown live for a single provider)"),
+):
+    """Query prompts against one or more providers.
+
+    Providers are queried concurrently; each response is analyzed as soon as it
+    arrives and shown in completion order, so a prompt takes about as long as
+    the slowest engine. Several prompts are handled one after another.
+    """
+    from src.extraction.analyzer import analyze_response
+    from src.extraction.client import close_extraction_clients
+    from src.extraction.local_analyzer import analyze_local
+    from src.extraction.normalizer import normalize_citations
+    from src.runner import _create_provider
+
+    enabled = _enabled_providers()
+    if provider == "all":
+        providers_to_run = enabled
+    else:
+        providers_to_run = [p.strip() for p in provider.split(",")]
+        unknown = [p for p in providers_to_run if p not in enabled]
+        if unknown:
+            console.print(f"[red]Unknown provider: {', '.join(unknown)}[/red]")
+            console.print(f"Available: {', '.join(enabled)}, all")
+            raise typer.Exit(1)
+
+    prompts = _read_prompts(prompt, prompts_file)
+    if not prompts:
+        console.print("[red]No prompt given (pass one, '-' for stdin, or --file).[/red]")
+        raise typer.Exit(1)
+
+    clients = {pname: _create_provider(pname) for pname in providers_to_run}
+    # Deltas of several concurrent streams would interleave; show text live for one provider only
+    live = stream and len(providers_to_run) == 1
+    on_delta = (lambda d: console.out(d, end="", highlight=False)) if live else None
+    min_confidence = _load_config().get("extraction", {}).get("hybrid_min_confidence", 0.7)
+
+    async def _analyze(text: str, normalized: list):
+        """(analysis, local analyzer confidence) for one response."""
+        local_confidence = None
+        if analyzer in ("local", "hybrid"):
+            local = analyze_local(text, [c.domain for c in normalized if c.is_coke_domain])
+            local_confidence = local.confidence
+            if analyzer == "local" or local.confidence >= min_confidence:
+                return local.analysis, local_confidence
+        return await analyze_response(text, [c.domain for c in normalized]), local_confidence
+
+    async def _query_provider(pname: str, text: str):
+        """Query one provider, then normalize and analyze its response."""
+        p = clients[pname]
+        try:
+            resp = await (p.query_stream(text, on_delta=on_delta) if stream else p.query(text))
+        except Exception as e:
+            return pname, e, [], None, None
+        normalized = normalize_citations(resp)
+        analysis, local_confidence = None, None
         if analyze and resp.raw_text:
             try:
-                domains = [c.domain for _, c in all_normalized if _ == pname]
-                analysis = _run_async(analyze_response(resp.raw_text, domains))
-
-                analysis_table = Table(title=f"Brand Analysis — {pname}", border_style="magenta")
-                analysis_table.add_column("Brand", style="bold", width=15)
-                analysis_table.add_column("Pos", justify="center", width=4)
-                analysis_table.add_column("Sentiment", width=10)
-                analysis_table.add_column("Recommended?", justify="center", width=12)
-                analysis_table.add_column("Context", max_width=50)
-
-                for m in analysis.all_mentions:
-                    sent_color = {"positive": "green", "neutral": "yellow", "negative": "red", "mixed": "blue"}
-                    color = sent_color.get(m.sentiment.value, "white")
-                    analysis_table.add_row(
-                        m.brand,
-                        str(m.position),
-                        f"[{color}]{m.sentiment.value}[/{color}]",
-                        "[green]Yes[/green]" if m.is_recommended else "—",
-                        m.context,
-                    )
-
-                console.print(analysis_table)
-
-                # Summary line
-                coke_str = ", ".join(analysis.coke_brands_found) if analysis.coke_brands_found else "none"
-                comp_str = ", ".join(analysis.competitor_brands_found) if analysis.competitor_brands_found else "none"
-                primary = "[green]Yes[/green]" if analysis.coke_is_primary_recommendation else "[red]No[/red]"
-
-                console.print(f"  Coke brands: [cyan]{coke_str}[/cyan]")
-                console.print(f"  Competitors: [yellow]{comp_str}[/yellow]")
-                console.print(f"  Response type: {analysis.response_type}")
-                console.print(f"  Coke is primary recommendation: {primary}")
-
+                analysis, local_confidence = await _analyze(resp.raw_text, normalized)
             except Exception as e:
-                console.print(f"  [red]Analysis error: {e}[/red]")
-
-    # Unified normalized citation table (when --show-citations or multiple providers)
-    if show_citations and all_normalized:
-        console.print("\n")
-        table = Table(title="Normalized Citations (All Providers)", border_style="blue")
-        table.add_column("Provider", style="bold", width=12)
-        table.add_column("Domain", style="cyan", max_width=30)
-        table.add_column("Title", max_width=40)
-        table.add_column("Conf.", justify="right", width=6)
-        table.add_column("Coke?", justify="center", width=5)
-
-        for pname, c in all_normalized:
-            coke_flag = "[green]Yes[/green]" if c.is_coke_domain else "—"
-            table.add_row(
-                pname,
-                c.domain,
-                c.title or "—",
-                f"{c.confidence:.2f}",
-                coke_flag,
-            )
-
-        console.print(table)
-
-        # Domain overlap analysis
-        domains_by_provider: dict[str, set[str]] = {}
-        for pname, c in all_normalized:
-            domains_by_provider.setdefault(pname, set()).add(c.domain)
-
-        if len(domains_by_provider) > 1:
-            all_domains = [s for s in domains_by_provider.values()]
-            shared = set.intersection(*all_domains) if all_domains else set()
-            total = set.union(*all_domains) if all_domains else set()
-            overlap_pct = (len(shared) / len(total) * 100) if total else 0
-
-            console.print(
-                f"\n  [dim]Domain overlap: {len(shared)}/{len(total)} "
-                f"({overlap_pct:.0f}%) — shared: {', '.join(shared) if shared else 'none'}[/dim]"
-            )
+                analysis = e
+        return pname, resp, normalized, analysis, local_confidence
+
+    async def _run_queries():
+        for i, text in enumerate(prompts, 1):
+            title = f"Prompt {i}/{len(prompts)}" if len(prompts) > 1 else "Prompt"
+            console.print(Panel(f"[bold]{text}[/bold]", title=title, border_style="cyan"))
+            console.print(f"\n[bold blue]Querying {', '.join(providers_to_run)}...[/bold blue]")
+
+            all_normalized = []
+            for done in asyncio.as_completed([_query_provider(pname, text) for pname in providers_to_run]):
+                pname, resp, normalized, analysis, local_confidence = await done
+                if isinstance(resp, Exception):
+                    console.print(f"[red]Error from {pname}: {resp}[/red]")
+                    continue
+                if live:
+                    console.print()
+                else:
+                    console.print(f"\n[bold blue]{pname}[/bold blue]")
+                all_normalized.extend([(pname, c) for c in normalized])
+                _print_query_result(pname, resp, normalized, analysis, local_confidence, show_text=not live)
+
+            # Unified normalized citation table (when --show-citations)
+            if show_citations and all_normalized:
+                console.print("\n")
+                _print_normalized_citations(all_normalized)
+        await close_extraction_clients()
+
+    _run_async(_run_queries())
 
 
 @app.command()
 def run(
     category: str = typer.Option(None, "--category", help="Filter prompts by category"),
-    provider: str = typer.Option("all", "--provider", "-p", help="Provider(s) to query"),
+    provider: str = typer.Option("all", "--provider", "-p", help="Provider(s) to query, comma-separated; provider:model picks one model"),
     repeats: int = typer.Option(1, "--repeats", "-r", help="Number of repeats per prompt/provider"),
     no_analyze: bool = typer.Option(False, "--no-analyze", help="Skip brand extraction analysis"),
+    no_prescan: bool = typer.Option(False, "--no-prescan", help="Send every response to the LLM extractor, even with no known brand in it"),
+    no_cache: bool = typer.Option(False, "--no-cache", help="Re-analyze every response instead of reusing cached analyses"),
+    no_batch: bool = typer.Option(False, "--no-batch", help="Analyze each response in its own extraction call"),
+    no_chunk: bool = typer.Option(False, "--no-chunk", help="Send long responses to the extractor whole instead of in chunks"),
+    analyzer: str = typer.Option(None, "--analyzer", help="llm, local (rule-based, offline) or hybrid (default: extraction.analyzer)"),
+    stream: bool = typer.Option(False, "--stream", help="Stream provider responses and record time-to-first-token"),
+    estimate: bool = typer.Option(False, "--estimate", help="Project the run's cost from history and exit without querying"),
     prompts_file: str = typer.Option("prompts/seed_prompts.yaml", "--prompts", help="Path to prompts YAML"),
 ):
     """Run all prompts across providers with optional repeats."""
@@ -215,22 +275,191 @@ def run(
         raise typer.Exit(1)
 
     if provider == "all":
-        providers = list(PROVIDERS.keys())
+        providers = _enabled_providers()
     else:
         providers = [p.strip() for p in provider.split(",")]
 
     console.print(f"[bold]Loaded {len(prompts)} prompts, {len(providers)} providers, {repeats} repeats[/bold]")
 
-    run_id = _run_async(run_batch(prompts, providers, repeats=repeats, analyze=not no_analyze))
+    if estimate:
+        from src.providers.registry import available_providers
+        from src.providers.targets import resolve_targets, target_pricing
+        from src.reporting.costs import project_costs
+        from src.storage.db import init_db
+
+        init_db()
+        cfg = _load_config()
+        models = [(t.provider, t.model or t.provider) for t in resolve_targets(cfg, providers, available_providers())]
+        extraction_model = cfg.get("extraction", {}).get("model", "gpt-4o-mini")
+        console.print(_cost_table(
+            project_costs([p.id for p in prompts], models, repeats, extraction_model, target_pricing(cfg)),
+            "Projected Cost",
+        ))
+        return
+
+    run_id = _run_async(run_batch(prompts, providers, repeats=repeats, analyze=not no_analyze, prescan=not no_prescan, use_cache=not no_cache, batch=not no_batch, chunk=not no_chunk, analyzer=analyzer, stream=stream))
     console.print(f"\n[bold cyan]Run ID: {run_id}[/bold cyan] — use this for reports and comparisons")
 
 
+@app.command()
+def reanalyze(
+    run_id: str = typer.Option(None, "--run", help="Only this run (default: all stored responses)"),
+    workers: int = typer.Option(16, "--workers", "-w", help="Responses in flight (LLM calls are bounded by extraction.batch.concurrency)"),
+    commit_every: int = typer.Option(50, "--commit-every", help="Results per DB transaction"),
+    limit: int = typer.Option(None, "--limit", "-n", help="Stop after this many responses"),
+    no_prescan: bool = typer.Option(False, "--no-prescan", help="Send every response to the LLM extractor, even with no known brand in it"),
+    no_cache: bool = typer.Option(False, "--no-cache", help="Re-analyze every response instead of reusing cached analyses"),
+    analyzer: str = typer.Option(None, "--analyzer", help="llm, local (rule-based, offline) or hybrid (default: extraction.analyzer)"),
+    dry_run: bool = typer.Option(False, "--dry-run", help="Only count stale analyses"),
+):
+    """Re-extract stored responses whose analysis predates the current analyzer version or config."""
+    from rich.progress import BarColumn, Progress, SpinnerColumn, TaskProgressColumn, TextColumn
+
+    from src.extraction.pipeline import ExtractionPipeline
+    from src.reanalyze import reanalyze as run_reanalysis
+    from src.storage.db import count_stale_responses, init_db
+
+    init_db()
+    pipeline = ExtractionPipeline.from_config(
+        _load_config(), prescan=not no_prescan, use_cache=not no_cache, analyzer=analyzer,
+    )
+    stale = count_stale_responses(*pipeline.stale_filter, run_id=run_id)
+    total = min(stale, limit) if limit else stale
+    console.print(f"[bold]{stale} stale analyses[/bold] (config {pipeline.config_hash})")
+    if dry_run or not total:
+        return
+
+    with Progress(
+        SpinnerColumn(),
+        TextColumn("[progress.description]{task.description}"),
+        BarColumn(),
+        TaskProgressColumn(),
+        console=console,
+    ) as progress:
+        task = progress.add_task("Re-analyzing...", total=total)
+
+        def on_progress(stats):
+            progress.update(
+                task, completed=stats.reanalyzed + stats.failed,
+                description=f"Re-analyzing — {stats.cached} cached, {stats.failed} failed",
+            )
+
+        stats = _run_async(run_reanalysis(pipeline, run_id, workers, commit_every, limit, on_progress))
+
+    console.print(
+        f"[green]Re-analyzed {stats.reanalyzed} responses[/green] "
+        f"({stats.cached} from cache, {stats.failed} failed, {stats.commits} commits)"
+    )
+    for line in pipeline.summary():
+        console.print(f"[dim]{line}[/dim]")
+
+
+@app.command("resolve-redirects")
+def resolve_redirects(
+    run_id: str = typer.Option(None, "--run", help="Only this run (default: all stored citations)"),
+    concurrency: int = typer.Option(None, "--concurrency", help="HEAD requests in flight (default: citations.redirects.concurrency)"),
+    timeout: float = typer.Option(None, "--timeout", help="Per-request timeout in seconds"),
+):
+    """Resolve proxied Gemini citation URLs to their real source domain (backfill)."""
+    from src.extraction.redirects import RedirectResolver, resolve_citation_redirects
+    from src.storage.db import init_db
+
+    init_db()
+    resolver = RedirectResolver.from_config(_load_config())
+    resolver.concurrency = concurrency or resolver.concurrency
+    resolver.timeout = timeout or resolver.timeout
+    stats = _run_async(resolve_citation_redirects(resolver, run_id))
+    console.print(
+        f"[green]{stats.updated} citations re-pointed[/green] — {stats.resolved} redirects resolved, "
+        f"{stats.known} already known, {stats.not_redirects} not redirects, {stats.failed} failed (retried next time)"
+    )
+
+
+def _live_tables(acc, run_info: dict, provider: str | None = None):
+    """Render a RunAccumulator snapshot."""
+    from rich.console import Group
+
+    expected = (run_info.get("prompt_count") or 0) * (run_info.get("provider_count") or 0) * (run_info.get("repeats") or 0)
+    total = acc.total
+    header = (
+        f"[bold]Run {run_info['run_id']}[/bold] ({run_info['status']}) — "
+        f"{total.responses}/{expected or '?'} responses, {total.analyzed} analyzed"
+    )
+
+    table = Table(title="Live Visibility by Engine", border_style="cyan")
+    table.add_column("Engine", style="bold", width=12)
+    table.add_column("Responses", justify="right", width=10)
+    table.add_column("Visibility", justify="right", width=10)
+    table.add_column("Rec. Rate", justify="right", width=10)
+    table.add_column("Cite Rate", justify="right", width=10)
+    table.add_column("Coke Cites", justify="right", width=11)
+    for name, c in sorted(acc.by_provider.items()):
+        if provider and name != provider:
+            continue
+        table.add_row(
+            name, str(c.responses), f"{c.visibility}%", f"{c.recommendation_rate}%",
+            f"{c.citation_rate}%", f"{c.coke_citation_rate}%",
+        )
+
+    btable = Table(title="Top Brands So Far", border_style="yellow")
+    btable.add_column("Brand", style="bold", width=18)
+    btable.add_column("Coke?", justify="center", width=6)
+    btable.add_column("Mentions", justify="right", width=9)
+    btable.add_column("Avg Pos", justify="right", width=8)
+    btable.add_column("Recommended", justify="right", width=12)
+    top = sorted(acc.by_brand.items(), key=lambda kv: -kv[1].mentions)[:10]
+    for brand, b in top:
+        btable.add_row(
+            brand, "[green]Yes[/green]" if b.is_coke else "—", str(b.mentions),
+            f"{b.avg_position}" if b.avg_position else "—", str(b.recommended),
+        )
+
+    return Group(Panel(header, border_style="cyan"), table, btable)
+
+
+def _follow_report(run_id: str, interval: float, provider: str | None = None):
+    """Tail a run's stored results and refresh running aggregates until it finishes."""
+    import time
+
+    from rich.live import Live
+
+    from src.aggregation.live import RunFollower
+
+    follower = RunFollower(run_id)
+    run_info = follower.run_info()
+    if not run_info:
+        console.print(f"[red]Run not found: {run_id}[/red]")
+        raise typer.Exit(1)
+
+    try:
+        with Live(console=console, auto_refresh=False) as live:
+            while True:
+                follower.poll()
+                run_info = follower.run_info() or run_info
+                live.update(_live_tables(follower.acc, run_info, provider), refresh=True)
+                if run_info["status"] != "running":
+                    break
+                time.sleep(interval)
+    except KeyboardInterrupt:
+        pass
+
+
 @app.command()
 def report(
     run_id: str = typer.Option(None, "--run", help="Specific run ID (default: all data)"),
     provider: str = typer.Option(None, "--provider", "-p", help="Filter by provider"),
+    follow: str = typer.Option(None, "--follow", help="Run ID to watch live while it is in progress"),
+    interval: float = typer.Option(3.0, "--interval", help="Refresh interval in seconds for --follow"),
+    by_model: bool = typer.Option(None, "--by-model/--by-provider", help="One row per provider/model (default: when several models were run)"),
 ):
     """Generate visibility report from stored data."""
+    from src.storage.db import init_db
+
+    init_db()  # syncs the brand alias index (if brands.yaml changed) used for canonical competitors
+    if follow:
+        _follow_report(follow, interval, provider)
+        return
+
     from src.aggregation.stats import (
         compute_engine_overview,
         get_top_competitors,
@@ -238,7 +467,12 @@ def report(
         get_weakest_prompts,
     )
 
-    overviews = compute_engine_overview(run_id)
+    overviews = compute_engine_overview(run_id, by_model=by_model is not False)
+    if by_model is None:
+        # Break down by model only when some provider ran more than one
+        by_model = len(overviews) > len({o.provider for o in overviews})
+        if not by_model:
+            overviews = compute_engine_overview(run_id)
     if provider:
         overviews = [o for o in overviews if o.provider == provider]
 
@@ -249,6 +483,8 @@ def report(
     # Engine overview table
     table = Table(title="Visibility by Engine", border_style="cyan")
     table.add_column("Engine", style="bold", width=12)
+    if by_model:
+        table.add_column("Model", width=22)
     table.add_column("Visibility", justify="right", width=12)
     table.add_column("SOV", justify="right", width=8)
     table.add_column("Rec. Rate", justify="right", width=10)
@@ -260,6 +496,7 @@ def report(
         sent_str = ", ".join(f"{k}: {v}" for k, v in o.sentiment_dist.items()) if o.sentiment_dist else "—"
         table.add_row(
             o.provider,
+            *([o.model] if by_model else []),
             f"{o.visibility_score}%",
             f"{o.share_of_voice}%",
             f"{o.recommendation_rate}%",
@@ -312,6 +549,210 @@ def report(
         console.print(wtable)
 
 
+@app.command()
+def compare(
+    run_ids: list[str] = typer.Argument(..., help="Baseline run ID followed by one or more runs to compare"),
+    alpha: float = typer.Option(0.05, "--alpha", help="False discovery rate for significance"),
+    limit: int = typer.Option(10, "--limit", "-n", help="Rows per prompt/brand/domain table"),
+    show_all: bool = typer.Option(False, "--all", help="Include non-significant prompt/brand/domain deltas"),
+):
+    """Compare runs against a baseline with significance testing."""
+    from src.aggregation.compare import compare_runs
+    from src.storage.db import init_db
+
+    if len(run_ids) < 2:
+        console.print("[red]Need a baseline run and at least one run to compare.[/red]")
+        raise typer.Exit(1)
+
+    init_db()  # ensures the rollup indexes exist on older databases
+    comparisons = compare_runs(run_ids, alpha=alpha)
+
+    def fmt_delta(d) -> str:
+        color = "green" if d.delta > 0 else "red" if d.delta < 0 else "dim"
+        marker = " *" if d.significant else ""
+        return f"[{color}]{d.delta:+.1f}{marker}[/{color}]"
+
+    for comp in comparisons:
+        console.print(Panel(
+            f"[bold]{comp.baseline_run}[/bold] → [bold]{comp.current_run}[/bold]  "
+            f"({comp.aligned_cells} aligned prompt × provider cells)",
+            title="Run Comparison", border_style="cyan",
+        ))
+        if not comp.aligned_cells:
+            console.print("[red]No overlapping prompt/provider cells between these runs.[/red]")
+            continue
+
+        # Engine level — always shown in full
+        etable = Table(title="Engine Deltas (pp, * = significant)", border_style="cyan")
+        etable.add_column("Engine", style="bold", width=12)
+        etable.add_column("Metric", width=15)
+        etable.add_column("Baseline", justify="right", width=10)
+        etable.add_column("Current", justify="right", width=10)
+        etable.add_column("Δ", justify="right", width=10)
+        etable.add_column("p", justify="right", width=8)
+        for d in sorted(comp.level("engine"), key=lambda d: (d.key, d.metric)):
+            etable.add_row(d.key, d.metric, f"{d.baseline_rate}%", f"{d.current_rate}%", fmt_delta(d), f"{d.p_value:.3f}")
+        console.print(etable)
+
+        for level, title in (("prompt", "Prompt"), ("brand", "Brand"), ("domain", "Domain")):
+            rows = [d for d in comp.level(level) if show_all or d.significant][:limit]
+            if not rows:
+                console.print(f"  [dim]No significant {level}-level changes.[/dim]")
+                continue
+            table = Table(title=f"{title} Deltas", border_style="yellow")
+            table.add_column(title, style="bold", min_width=12, max_width=30)
+            table.add_column("Metric", width=15)
+            table.add_column("Baseline", justify="right", width=10)
+            table.add_column("Current", justify="right", width=10)
+            table.add_column("Δ", justify="right", width=10)
+            table.add_column("p", justify="right", width=8)
+            table.add_column("Test", width=6)
+            for d in rows:
+                table.add_row(
+                    d.key, d.metric, f"{d.baseline_rate}%", f"{d.current_rate}%",
+                    fmt_delta(d), f"{d.p_value:.3f}", d.test,
+                )
+            console.print(table)
+
+
+@app.command()
+def matrix(
+    run_id: str = typer.Option(None, "--run", help="Specific run ID (default: all data)"),
+    by: str = typer.Option("provider", "--by", help="Columns: provider or brand"),
+    metric: str = typer.Option("visibility", "--metric", "-m", help="visibility, recommendation, avg_position or citation_rate"),
+    category: str = typer.Option(None, "--category", help="Filter prompts by category"),
+    persona: str = typer.Option(None, "--persona", help="Filter prompts by persona"),
+    intent: str = typer.Option(None, "--intent", help="Filter prompts by intent"),
+    output: str = typer.Option(None, "--output", "-o", help="Export to .json, .csv or .npz"),
+    refresh: bool = typer.Option(False, "--refresh", help="Ignore the cached matrix"),
+    prompts_file: str = typer.Option("prompts/seed_prompts.yaml", "--prompts", help="Path to prompts YAML"),
+):
+    """Show a prompt × provider (or prompt × brand) heatmap matrix."""
+    import numpy as np
+
+    from src.aggregation.matrix import load_prompt_matrix
+    from src.storage.db import init_db
+
+    init_db()
+    m = load_prompt_matrix(run_id, category, persona, intent, prompts_file, refresh=refresh)
+    if not len(m.prompt_ids):
+        console.print("[red]No data found.[/red]")
+        raise typer.Exit(1)
+
+    if by == "brand":
+        brand_metrics = {
+            "visibility": m.brand_visibility,
+            "recommendation": m.brand_recommendation,
+            "avg_position": m.brand_avg_position,
+        }
+        if metric not in brand_metrics:
+            console.print(f"[red]--by brand supports: {', '.join(brand_metrics)}[/red]")
+            raise typer.Exit(1)
+        values = brand_metrics[metric]
+        # Keep the table readable: most-mentioned brands first
+        top = np.argsort(-m.brand_responses.sum(axis=0), kind="stable")[:6]
+        columns, values = m.brands[top], values[:, top]
+    else:
+        provider_metrics = {
+            "visibility": m.visibility,
+            "recommendation": m.recommendation,
+            "avg_position": m.avg_position,
+            "citation_rate": m.citation_rate,
+        }
+        if metric not in provider_metrics:
+            console.print(f"[red]Unknown metric: {metric}[/red]")
+            raise typer.Exit(1)
+        columns, values = m.providers, provider_metrics[metric]
+
+    is_position = metric == "avg_position"
+    table = Table(title=f"Prompt × {by.title()} — {metric}", border_style="cyan")
+    table.add_column("ID", style="dim", width=5)
+    table.add_column("Prompt", max_width=40)
+    for col in columns:
+        table.add_column(str(col), justify="right", width=12)
+
+    for i, pid in enumerate(m.prompt_ids):
+        cells = []
+        for v in values[i]:
+            if np.isnan(v):
+                cells.append("[dim]—[/dim]")
+            elif is_position:
+                cells.append(f"{v:.1f}")
+            else:
+                color = "green" if v >= 67 else "yellow" if v >= 34 else "red"
+                cells.append(f"[{color}]{v:.0f}%[/{color}]")
+        table.add_row(str(pid), str(m.prompt_texts[i]), *cells)
+
+    console.print(table)
+
+    if output:
+        if output.endswith(".json"):
+            m.to_json(output)
+        elif output.endswith(".npz"):
+            from pathlib import Path
+
+            m.save(Path(output))
+        else:
+            m.to_csv(output)
+        console.print(f"[green]Exported matrix to {output}[/green]")
+
+
+@app.command("citation-graph")
+def citation_graph(
+    run_id: str = typer.Option(None, "--run", help="Specific run ID (default: full history)"),
+    limit: int = typer.Option(15, "--limit", "-n", help="Rows per table"),
+    min_weight: int = typer.Option(2, "--min-weight", help="Minimum co-citations for a cluster edge"),
+):
+    """Domain co-citation graph: centrality, engine affinity, clusters."""
+    import numpy as np
+
+    from src.aggregation.citation_graph import export_citation_graph
+
+    graph, path = export_citation_graph(run_id, min_weight=min_weight)
+    if not graph.n_domains:
+        console.print("[red]No citations found.[/red]")
+        raise typer.Exit(1)
+
+    summary = graph.summary(limit, min_weight)
+
+    table = Table(title="Most Central Domains", border_style="green")
+    table.add_column("Domain", style="cyan", max_width=35)
+    table.add_column("Cites", justify="right", width=6)
+    table.add_column("Degree", justify="right", width=7)
+    table.add_column("Centrality", justify="right", width=10)
+    table.add_column("Near Coke", justify="right", width=9)
+    table.add_column("Cluster", justify="right", width=7)
+    for d in sorted(summary["domains"], key=lambda d: -d["centrality"]):
+        name = f"[bold green]{d['domain']}[/bold green]" if d["is_coke_domain"] else d["domain"]
+        table.add_row(
+            name, str(d["count"]), f"{d['degree']:.0f}", f"{d['centrality']:.3f}",
+            f"{d['coke_proximity'] * 100:.0f}%", str(d["cluster"]),
+        )
+    console.print(table)
+
+    ptable = Table(title="Most Co-cited Pairs", border_style="blue")
+    ptable.add_column("Domain A", style="cyan", max_width=35)
+    ptable.add_column("Domain B", style="cyan", max_width=35)
+    ptable.add_column("Together", justify="right", width=9)
+    for p in summary["pairs"][:limit]:
+        ptable.add_row(p["source"], p["target"], str(p["weight"]))
+    console.print(ptable)
+
+    atable = Table(title="Engine Domain Affinity (lift vs. all engines)", border_style="yellow")
+    atable.add_column("Engine", style="bold", width=12)
+    atable.add_column("Preferred domains", max_width=70)
+    for engine, prefs in summary["engine_affinity"].items():
+        atable.add_row(engine, ", ".join(f"{p['domain']} ({p['lift']}×)" for p in prefs[:5]) or "—")
+    console.print(atable)
+
+    labels = graph.clusters(min_weight)
+    sizes = np.bincount(labels)
+    console.print(
+        f"\n  [dim]{graph.n_domains} domains, {len(graph.co_weights)} co-citation edges, "
+        f"{int((sizes > 1).sum())} clusters of 2+ domains — exported to {path}[/dim]"
+    )
+
+
 @app.command("db-stats")
 def db_stats():
     """Show database statistics."""
@@ -329,6 +770,9 @@ def db_stats():
     table.add_row("Citations", str(stats["citations"]))
     table.add_row("Brand Mentions", str(stats["brand_mentions"]))
     table.add_row("Analyses", str(stats["analyses"]))
+    table.add_row("  from cache", str(stats["cached_analyses"]))
+    table.add_row("  extraction retries", str(stats["extraction_retries"]))
+    table.add_row("  validation failures", str(stats["validation_failures"]))
 
     console.print(table)
 
@@ -348,17 +792,24 @@ def db_stats():
 @app.command()
 def costs(
     run_id: str = typer.Option(None, "--run", help="Specific run ID (default: all data)"),
+    by_key: bool = typer.Option(False, "--by-key", help="Split query costs per API key"),
 ):
-    """Show cost breakdown by provider."""
+    """Show cost breakdown by provider and model."""
+    from src.providers.targets import target_pricing
     from src.reporting.costs import compute_costs
 
-    cost_data = compute_costs(run_id)
+    cost_data = compute_costs(run_id, target_pricing(_load_config()), by_key=by_key)
     if not cost_data:
         console.print("[red]No data found.[/red]")
         raise typer.Exit(1)
 
-    table = Table(title="Cost Breakdown", border_style="cyan")
-    table.add_column("Provider", style="bold", width=12)
+    console.print(_cost_table(cost_data, "Cost Breakdown"))
+
+
+def _cost_table(cost_data, title: str) -> Table:
+    """Render ProviderCost rows with a total."""
+    table = Table(title=title, border_style="cyan")
+    table.add_column("Provider", style="bold", min_width=17)
     table.add_column("Model", width=18)
     table.add_column("Queries", justify="right", width=8)
     table.add_column("Tokens Used", justify="right", width=12)
@@ -372,8 +823,7 @@ def costs(
 
     table.add_section()
     table.add_row("[bold]TOTAL[/bold]", "", "", "", f"[bold]${total_cost:.4f}[/bold]")
-
-    console.print(table)
+    return table
 
 
 @app.command()
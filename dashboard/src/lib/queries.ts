@@ -1,3 +1,5 @@
+import fs from "fs";
+import path from "path";
 import { getDb } from "./db";
 import { PRICING, REQUEST_FEES } from "./constants";
 import type {
@@ -6,6 +8,7 @@ import type {
   PromptData,
   Competitor,
   CitationDomain,
+  CitationGraph,
   CostEntry,
   ResponseDetail,
 } from "./types";
@@ -141,7 +144,46 @@ export function getEngineOverview(runId: string): EngineOverview[] {
   });
 }
 
+const MATRIX_DIR = process.env.MATRIX_DIR || "../data/matrices";
+const GRAPH_DIR = process.env.GRAPH_DIR || "../data/graphs";
+
+// JSON exports written by the Python CLI, keyed by run ID
+function readExport<T>(dir: string, runId: string): T | null {
+  const file = path.resolve(process.cwd(), dir, `${runId}.json`);
+  if (!fs.existsSync(file)) return null;
+  try {
+    return JSON.parse(fs.readFileSync(file, "utf-8")) as T;
+  } catch {
+    return null;
+  }
+}
+
+// Same change detector as _fingerprint in src/aggregation/matrix.py
+function matrixFingerprint(runId: string): string {
+  const row = getDb()
+    .prepare(
+      `SELECT COUNT(*) as responses, COUNT(a.response_id) as analyzed,
+            COALESCE(MAX(a.analysis_id), 0) as last_analysis
+     FROM responses r LEFT JOIN analyses a ON a.response_id = r.response_id
+     WHERE r.run_id = ?`
+    )
+    .get(runId) as { responses: number; analyzed: number; last_analysis: number };
+  return `${row.responses}:${row.analyzed}:${row.last_analysis}`;
+}
+
+// Prompt x provider cells precomputed by `geo matrix` (src/aggregation/matrix.py),
+// used only while the run's responses and analyses are unchanged since `geo matrix`
+// wrote the sidecar (see matrixFingerprint)
+function readCachedPromptMatrix(runId: string): PromptData[] | null {
+  const cached = readExport<{ fingerprint?: string; prompts?: PromptData[] }>(MATRIX_DIR, runId);
+  if (!cached || !Array.isArray(cached.prompts)) return null;
+  return cached.fingerprint === matrixFingerprint(runId) ? cached.prompts : null;
+}
+
 export function getPromptData(runId: string): PromptData[] {
+  const cached = readCachedPromptMatrix(runId);
+  if (cached) return cached;
+
   const db = getDb();
   const rows = db
     .prepare(
@@ -178,19 +220,42 @@ export function getPromptData(runId: string): PromptData[] {
 
 export function getCompetitors(runId: string, limit = 10): Competitor[] {
   const db = getDb();
+  // Canonical brands via brand_aliases (synced by init_db), labelled with their
+  // display names; true sentiment mode per brand
   const rows = db
     .prepare(
-      `SELECT bm.brand, COUNT(*) as cnt, AVG(bm.position) as avg_pos,
-            bm.sentiment, SUM(bm.is_recommended) as rec_cnt
-     FROM brand_mentions bm
-     JOIN responses r ON bm.response_id = r.response_id
-     WHERE r.run_id = ? AND bm.is_coke_brand = 0
-     GROUP BY bm.brand
-     ORDER BY cnt DESC
+      `WITH m AS (
+       SELECT COALESCE(ba.canonical, LOWER(TRIM(bm.brand))) AS brand,
+              COALESCE(ba.display, TRIM(bm.brand)) AS display,
+              bm.position, bm.sentiment, bm.is_recommended
+       FROM brand_mentions bm
+       JOIN responses r ON bm.response_id = r.response_id
+       LEFT JOIN brand_aliases ba ON ba.alias = LOWER(TRIM(bm.brand))
+       WHERE r.run_id = ? AND bm.is_coke_brand = 0 AND COALESCE(ba.is_coke, 0) = 0
+     ),
+     grouped AS (
+       SELECT brand, sentiment, COUNT(*) AS n, MIN(display) AS display,
+              SUM(position) AS pos_sum, COUNT(position) AS pos_n,
+              SUM(is_recommended) AS rec
+       FROM m GROUP BY brand, sentiment
+     ),
+     ranked AS (
+       SELECT brand, sentiment,
+              MIN(display) OVER w AS display,
+              SUM(n) OVER w AS cnt,
+              SUM(pos_sum) OVER w * 1.0 / NULLIF(SUM(pos_n) OVER w, 0) AS avg_pos,
+              SUM(rec) OVER w AS rec_cnt,
+              ROW_NUMBER() OVER (PARTITION BY brand ORDER BY n DESC, sentiment) AS rk
+       FROM grouped
+       WINDOW w AS (PARTITION BY brand)
+     )
+     SELECT display, cnt, avg_pos, sentiment, rec_cnt
+     FROM ranked WHERE rk = 1
+     ORDER BY cnt DESC, brand
      LIMIT ?`
     )
     .all(runId, limit) as {
-    brand: string;
+    display: string;
     cnt: number;
     avg_pos: number;
     sentiment: string;
@@ -198,9 +263,9 @@ export function getCompetitors(runId: string, limit = 10): Competitor[] {
   }[];
 
   return rows.map((r) => ({
-    brand: r.brand,
+    brand: r.display,
     mention_count: r.cnt,
-    avg_position: Math.round(r.avg_pos * 10) / 10,
+    avg_position: Math.round((r.avg_pos || 0) * 10) / 10,
     sentiment_mode: r.sentiment || "neutral",
     recommendation_count: r.rec_cnt || 0,
   }));
@@ -209,6 +274,7 @@ export function getCompetitors(runId: string, limit = 10): Competitor[] {
 export function getCitations(runId: string): {
   domains: CitationDomain[];
   coke_share: { coke: number; total: number; pct: number };
+  graph: CitationGraph | null;
 } {
   const db = getDb();
   const rows = db
@@ -256,7 +322,41 @@ export function getCitations(runId: string): {
         ? Math.round((cokeCitations / totalCitations) * 1000) / 10
         : 0,
     },
+    // Co-citation graph exported by `geo citation-graph --run <id>`
+    graph: readExport<CitationGraph>(GRAPH_DIR, runId),
+  };
+}
+
+// Mirrors src/reporting/costs.py: extraction tokens per response as a linear
+// function of response length, fitted on analyses with recorded usage.
+const DEFAULT_TOKEN_MODEL = { inputBase: 330, inputPerChar: 0.25, outputBase: 200, outputPerChar: 0.02 };
+const MIN_TOKEN_MODEL_SAMPLES = 20;
+
+function fitExtractionModel(db: ReturnType<typeof getDb>): typeof DEFAULT_TOKEN_MODEL {
+  const s = db
+    .prepare(
+      `SELECT COUNT(*) as n, SUM(x) as sx, SUM(x * x) as sxx,
+            SUM(inp) as s_in, SUM(x * inp) as sx_in,
+            SUM(out) as s_out, SUM(x * out) as sx_out
+     FROM (SELECT CAST(LENGTH(r.raw_text) AS REAL) as x,
+                  a.extraction_input_tokens as inp, a.extraction_output_tokens as out
+           FROM analyses a JOIN responses r ON r.response_id = a.response_id
+           WHERE a.extraction_model IS NOT NULL AND a.extraction_input_tokens > 0)`
+    )
+    .get() as Record<string, number>;
+  if (s.n < MIN_TOKEN_MODEL_SAMPLES) return DEFAULT_TOKEN_MODEL;
+
+  // Ordinary least squares y = a + b·x, with b clamped at 0
+  const meanX = s.sx / s.n;
+  const variance = s.sxx - s.n * meanX * meanX;
+  const fit = (sy: number, sxy: number) => {
+    const meanY = sy / s.n;
+    const slope = variance > 0 ? Math.max((sxy - s.n * meanX * meanY) / variance, 0) : 0;
+    return [meanY - slope * meanX, slope];
   };
+  const [inputBase, inputPerChar] = fit(s.s_in, s.sx_in);
+  const [outputBase, outputPerChar] = fit(s.s_out, s.sx_out);
+  return { inputBase, inputPerChar, outputBase, outputPerChar };
 }
 
 export function getCosts(runId: string): {
@@ -296,22 +396,63 @@ export function getCosts(runId: string): {
     };
   });
 
-  // Extraction cost estimate
-  const totalAnalyses = rows.reduce((sum, r) => sum + r.queries, 0);
-  if (totalAnalyses > 0) {
-    const extPricing = PRICING["gpt-4o-mini"];
-    const extInput = totalAnalyses * 500;
-    const extOutput = totalAnalyses * 200;
-    const extCost =
-      (extInput / 1_000_000) * extPricing.input +
-      (extOutput / 1_000_000) * extPricing.output;
+  // Extraction: real tokens (retries included) recorded per analysis
+  const extraction = db
+    .prepare(
+      `SELECT a.extraction_model as model, COUNT(*) as analyses,
+            SUM(a.extraction_input_tokens) as total_input,
+            SUM(a.extraction_output_tokens) as total_output
+     FROM analyses a JOIN responses r ON r.response_id = a.response_id
+     WHERE r.run_id = ? AND a.extraction_model IS NOT NULL
+     GROUP BY a.extraction_model`
+    )
+    .all(runId) as {
+    model: string;
+    analyses: number;
+    total_input: number;
+    total_output: number;
+  }[];
+
+  for (const r of extraction) {
+    const pricing = PRICING[r.model] || { input: 0, output: 0 };
+    const cost =
+      ((r.total_input || 0) / 1_000_000) * pricing.input +
+      ((r.total_output || 0) / 1_000_000) * pricing.output;
     costs.push({
       provider: "extraction",
+      model: r.model,
+      queries: r.analyses,
+      input_tokens: r.total_input || 0,
+      output_tokens: r.total_output || 0,
+      total_cost: Math.round(cost * 10000) / 10000,
+    });
+  }
+
+  // Analyses stored before usage was recorded: estimate from response length,
+  // like the CLI. Only those with brand mentions are known to have gone through the LLM.
+  const legacy = db
+    .prepare(
+      `SELECT COUNT(*) as analyses, SUM(LENGTH(r.raw_text)) as chars
+     FROM analyses a JOIN responses r ON r.response_id = a.response_id
+     WHERE r.run_id = ? AND a.extraction_model IS NULL AND a.is_cached = 0
+       AND EXISTS (SELECT 1 FROM brand_mentions bm WHERE bm.response_id = a.response_id)`
+    )
+    .get(runId) as { analyses: number; chars: number | null };
+
+  if (legacy.analyses > 0) {
+    const model = fitExtractionModel(db);
+    const chars = legacy.chars || 0;
+    const input = Math.round(legacy.analyses * model.inputBase + model.inputPerChar * chars);
+    const output = Math.round(legacy.analyses * model.outputBase + model.outputPerChar * chars);
+    const pricing = PRICING["gpt-4o-mini"];
+    const cost = (input / 1_000_000) * pricing.input + (output / 1_000_000) * pricing.output;
+    costs.push({
+      provider: "extraction (est.)",
       model: "gpt-4o-mini",
-      queries: totalAnalyses,
-      input_tokens: extInput,
-      output_tokens: extOutput,
-      total_cost: Math.round(extCost * 10000) / 10000,
+      queries: legacy.analyses,
+      input_tokens: input,
+      output_tokens: output,
+      total_cost: Math.round(cost * 10000) / 10000,
     });
   }
 
@@ -45,6 +45,25 @@ export interface CitationDomain {
   is_coke_domain: boolean;
 }
 
+export interface CitationGraphDomain {
+  domain: string;
+  count: number;
+  is_coke_domain: boolean;
+  degree: number;
+  centrality: number;
+  coke_proximity: number;
+  cluster: number;
+}
+
+export interface CitationGraph {
+  domains: CitationGraphDomain[];
+  pairs: { source: string; target: string; weight: number }[];
+  engine_affinity: Record<
+    string,
+    { domain: string; lift: number; count: number }[]
+  >;
+}
+
 export interface CostEntry {
   provider: string;
   model: string;
@@ -0,0 +1,271 @@
+"""Domain co-citation graph — sparse response × domain incidence and domain × domain co-occurrence."""
+
+from __future__ import annotations
+
+import json
+import sqlite3
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+
+DB_PATH = Path(__file__).parent.parent.parent / "data" / "coke_geo.db"
+EXPORT_DIR = Path(__file__).parent.parent.parent / "data" / "graphs"
+
+
+def _get_conn() -> sqlite3.Connection:
+    conn = sqlite3.connect(str(DB_PATH))
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+@dataclass
+class CitationGraph:
+    """Compact sparse citation graph.
+
+    The response × domain incidence matrix is kept in CSR form (indptr,
+    indices). Domain co-occurrence is the upper triangle of incidenceᵀ·incidence
+    in COO form (co_rows < co_cols), weighted by the number of responses that
+    cite both domains.
+    """
+    domains: np.ndarray  # (D,)
+    is_coke: np.ndarray  # (D,) bool
+    providers: np.ndarray  # (E,)
+    response_provider: np.ndarray  # (R,) provider code per response
+    indptr: np.ndarray  # (R + 1,)
+    indices: np.ndarray  # (nnz,) domain codes
+    co_rows: np.ndarray  # (K,)
+    co_cols: np.ndarray  # (K,)
+    co_weights: np.ndarray  # (K,)
+
+    @property
+    def n_domains(self) -> int:
+        return len(self.domains)
+
+    def citation_counts(self) -> np.ndarray:
+        """Responses citing each domain."""
+        return np.bincount(self.indices, minlength=self.n_domains)
+
+    def _matvec(self, x: np.ndarray, rows: np.ndarray, cols: np.ndarray, weights: np.ndarray) -> np.ndarray:
+        """Symmetric sparse adjacency × vector from the upper-triangle COO."""
+        n = self.n_domains
+        return np.bincount(rows, weights * x[cols], minlength=n) + np.bincount(cols, weights * x[rows], minlength=n)
+
+    def degree(self) -> np.ndarray:
+        """Weighted co-citation degree."""
+        return self._matvec(np.ones(self.n_domains), self.co_rows, self.co_cols, self.co_weights.astype(np.float64))
+
+    def eigenvector_centrality(self, iterations: int = 100, tol: float = 1e-8) -> np.ndarray:
+        """Power iteration on the co-citation adjacency, normalized to max 1."""
+        n = self.n_domains
+        if not n or not len(self.co_weights):
+            return np.zeros(n)
+        w = self.co_weights.astype(np.float64)
+        x = np.full(n, 1.0 / n)
+        for _ in range(iterations):
+            # Adding x keeps the iteration stable on bipartite-like components
+            nxt = self._matvec(x, self.co_rows, self.co_cols, w) + x
+            norm = np.linalg.norm(nxt)
+            if norm == 0:
+                break
+            nxt /= norm
+            done = np.abs(nxt - x).sum() < tol
+            x = nxt
+            if done:
+                break
+        return x / x.max() if x.max() > 0 else x
+
+    def engine_affinity(self) -> np.ndarray:
+        """(E, D) lift: a domain's share of an engine's citations over its share of all citations."""
+        n_e, n_d = len(self.providers), self.n_domains
+        row_provider = np.repeat(self.response_provider, np.diff(self.indptr))
+        counts = np.bincount(row_provider * n_d + self.indices, minlength=n_e * n_d).reshape(n_e, n_d).astype(np.float64)
+        engine_share = counts / np.maximum(counts.sum(axis=1, keepdims=True), 1)
+        overall_share = counts.sum(axis=0) / max(counts.sum(), 1)
+        out = np.zeros_like(engine_share)
+        np.divide(engine_share, overall_share, out=out, where=overall_share > 0)
+        return out
+
+    def coke_proximity(self) -> np.ndarray:
+        """Share of each domain's co-citation weight that is with Coke-owned domains."""
+        w = self.co_weights.astype(np.float64)
+        with_coke = self._matvec(self.is_coke.astype(np.float64), self.co_rows, self.co_cols, w)
+        degree = self.degree()
+        out = np.zeros(self.n_domains)
+        np.divide(with_coke, degree, out=out, where=degree > 0)
+        return out
+
+    def clusters(self, min_weight: int = 2, iterations: int = 30) -> np.ndarray:
+        """Weighted label propagation over edges with at least `min_weight` co-citations.
+
+        Each domain repeatedly adopts the label carrying the most edge weight
+        among its neighbours (ties go to the smaller label), so results are
+        deterministic. Isolated domains keep their own label.
+        """
+        n = self.n_domains
+        labels = np.arange(n)
+        keep = self.co_weights >= min_weight
+        if not keep.any():
+            return labels
+        src = np.concatenate([self.co_rows[keep], self.co_cols[keep]])
+        dst = np.concatenate([self.co_cols[keep], self.co_rows[keep]])
+        w = np.concatenate([self.co_weights[keep], self.co_weights[keep]]).astype(np.float64)
+
+        for _ in range(iterations):
+            # Sum edge weight per (node, neighbour label)
+            key = src.astype(np.int64) * n + labels[dst]
+            uniq, inv = np.unique(key, return_inverse=True)
+            totals = np.bincount(inv, weights=w)
+            node, label = uniq // n, uniq % n
+            # Best label per node: highest weight, then smallest label
+            order = np.lexsort((label, -totals, node))
+            first = np.ones(len(order), dtype=bool)
+            first[1:] = node[order][1:] != node[order][:-1]
+            best = order[first]
+            new_labels = labels.copy()
+            new_labels[node[best]] = label[best]
+            if np.array_equal(new_labels, labels):
+                break
+            labels = new_labels
+
+        # Relabel clusters 0..k-1 by first appearance (cluster of node 0 is 0, ...)
+        _, first, inverse = np.unique(labels, return_index=True, return_inverse=True)
+        rank = np.empty(len(first), dtype=np.int64)
+        rank[np.argsort(first)] = np.arange(len(first))
+        return rank[inverse]
+
+    def top_pairs(self, limit: int = 20) -> list[tuple[str, str, int]]:
+        """Most frequently co-cited domain pairs."""
+        order = np.argsort(-self.co_weights, kind="stable")[:limit]
+        return [
+            (str(self.domains[self.co_rows[i]]), str(self.domains[self.co_cols[i]]), int(self.co_weights[i]))
+            for i in order
+        ]
+
+    def summary(self, limit: int = 50, min_weight: int = 2) -> dict:
+        """Dashboard-ready summary of the graph."""
+        counts = self.citation_counts()
+        degree = self.degree()
+        eigen = self.eigenvector_centrality()
+        proximity = self.coke_proximity()
+        labels = self.clusters(min_weight)
+        affinity = self.engine_affinity()
+        top = np.argsort(-counts, kind="stable")[:limit]
+
+        return {
+            "domains": [
+                {
+                    "domain": str(self.domains[i]),
+                    "count": int(counts[i]),
+                    "is_coke_domain": bool(self.is_coke[i]),
+                    "degree": round(float(degree[i]), 1),
+                    "centrality": round(float(eigen[i]), 4),
+                    "coke_proximity": round(float(proximity[i]), 3),
+                    "cluster": int(labels[i]),
+                }
+                for i in top
+            ],
+            "pairs": [
+                {"source": a, "target": b, "weight": w} for a, b, w in self.top_pairs(limit)
+            ],
+            "engine_affinity": {
+                str(p): [
+                    {"domain": str(self.domains[j]), "lift": round(float(affinity[e, j]), 2), "count": int(counts[j])}
+                    for j in np.argsort(-affinity[e], kind="stable")[:10] if affinity[e, j] > 0
+                ]
+                for e, p in enumerate(self.providers)
+            },
+        }
+
+    def to_json(self, path: str | Path, limit: int = 50, min_weight: int = 2):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(self.summary(limit, min_weight), f)
+
+
+def _co_occurrence(indptr: np.ndarray, indices: np.ndarray, n_domains: int) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Upper triangle of incidenceᵀ·incidence, enumerating in-row pairs without Python loops."""
+    nnz = len(indices)
+    if nnz == 0:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty, empty
+    row_end = np.repeat(indptr[1:], np.diff(indptr))
+    # Each entry pairs with every later entry in its row
+    partners = row_end - np.arange(nnz) - 1
+    total = int(partners.sum())
+    if total == 0:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty, empty
+    src = np.repeat(np.arange(nnz), partners)
+    offsets = np.arange(total) - np.repeat(np.cumsum(partners) - partners, partners)
+    dst = src + 1 + offsets
+
+    a, b = indices[src], indices[dst]
+    lo, hi = np.minimum(a, b), np.maximum(a, b)
+    keys, weights = np.unique(lo.astype(np.int64) * n_domains + hi, return_counts=True)
+    return keys // n_domains, keys % n_domains, weights
+
+
+def build_citation_graph(run_ids: list[str] | None = None) -> CitationGraph:
+    """Build the graph from citations for the given runs (default: full history)."""
+    conn = _get_conn()
+    where = f"WHERE r.run_id IN ({','.join('?' * len(run_ids))})" if run_ids else ""
+
+    # Distinct (response, domain) pairs, grouped by response for CSR construction
+    rows = conn.execute(f"""
+        SELECT c.response_id, r.provider, c.domain, MAX(c.is_coke_domain) AS is_coke
+        FROM citations c
+        JOIN responses r ON r.response_id = c.response_id
+        {where}
+        {"AND" if where else "WHERE"} c.domain IS NOT NULL AND c.domain != ''
+        GROUP BY c.response_id, c.domain
+        ORDER BY c.response_id
+    """, run_ids or ()).fetchall()
+    conn.close()
+
+    domain_index: dict[str, int] = {}
+    provider_index: dict[str, int] = {}
+    domain_coke: list[bool] = []
+    indices = np.empty(len(rows), dtype=np.int64)
+    indptr = [0]
+    response_provider: list[int] = []
+    last_response = None
+
+    for i, r in enumerate(rows):
+        d = domain_index.get(r["domain"])
+        if d is None:
+            d = domain_index[r["domain"]] = len(domain_index)
+            domain_coke.append(False)
+        domain_coke[d] = domain_coke[d] or bool(r["is_coke"])
+        indices[i] = d
+        if r["response_id"] != last_response:
+            if last_response is not None:
+                indptr.append(i)
+            last_response = r["response_id"]
+            response_provider.append(provider_index.setdefault(r["provider"], len(provider_index)))
+    if rows:
+        indptr.append(len(rows))
+
+    indptr_arr = np.array(indptr, dtype=np.int64)
+    co_rows, co_cols, co_weights = _co_occurrence(indptr_arr, indices, len(domain_index))
+
+    return CitationGraph(
+        domains=np.array(list(domain_index), dtype=str),
+        is_coke=np.array(domain_coke, dtype=bool),
+        providers=np.array(list(provider_index), dtype=str),
+        response_provider=np.array(response_provider, dtype=np.int64),
+        indptr=indptr_arr,
+        indices=indices,
+        co_rows=co_rows,
+        co_cols=co_cols,
+        co_weights=co_weights,
+    )
+
+
+def export_citation_graph(run_id: str | None = None, limit: int = 50, min_weight: int = 2) -> tuple[CitationGraph, Path]:
+    """Build the graph and write the dashboard JSON to data/graphs/<run_id|all>.json."""
+    graph = build_citation_graph([run_id] if run_id else None)
+    path = EXPORT_DIR / f"{run_id or 'all'}.json"
+    graph.to_json(path, limit, min_weight)
+    return graph, path
@@ -0,0 +1,276 @@
+"""Run-to-run comparison — aligned metric deltas with significance testing."""
+
+from __future__ import annotations
+
+import math
+import sqlite3
+from dataclasses import dataclass, field
+from pathlib import Path
+
+DB_PATH = Path(__file__).parent.parent.parent / "data" / "coke_geo.db"
+
+# Below this expected cell count the chi-square approximation is unreliable
+_MIN_EXPECTED = 5
+
+
+def _get_conn() -> sqlite3.Connection:
+    conn = sqlite3.connect(str(DB_PATH))
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+@dataclass
+class MetricDelta:
+    """Change in one rate metric between a baseline run and a later run."""
+    level: str  # engine | prompt | brand | domain
+    key: str
+    metric: str
+    baseline_hits: int
+    baseline_total: int
+    current_hits: int
+    current_total: int
+    p_value: float
+    test: str  # chi2 | fisher
+    significant: bool = False
+
+    @property
+    def baseline_rate(self) -> float:
+        return round(self.baseline_hits / self.baseline_total * 100, 1) if self.baseline_total else 0.0
+
+    @property
+    def current_rate(self) -> float:
+        return round(self.current_hits / self.current_total * 100, 1) if self.current_total else 0.0
+
+    @property
+    def delta(self) -> float:
+        """Change in percentage points."""
+        base = self.baseline_hits / self.baseline_total if self.baseline_total else 0.0
+        cur = self.current_hits / self.current_total if self.current_total else 0.0
+        return round((cur - base) * 100, 1)
+
+
+@dataclass
+class RunComparison:
+    """All deltas between a baseline run and one later run."""
+    baseline_run: str
+    current_run: str
+    aligned_cells: int  # (prompt_id, provider) pairs present in both runs
+    deltas: list[MetricDelta] = field(default_factory=list)
+
+    def level(self, level: str) -> list[MetricDelta]:
+        """Deltas for one level, most significant first."""
+        return sorted(
+            (d for d in self.deltas if d.level == level),
+            key=lambda d: (d.p_value, -abs(d.delta)),
+        )
+
+
+# --- Significance tests ---
+
+def _chi2_2x2(a: int, b: int, c: int, d: int) -> float:
+    """Pearson chi-square p-value (1 dof) for the table [[a, b], [c, d]]."""
+    n = a + b + c + d
+    denom = (a + b) * (c + d) * (a + c) * (b + d)
+    if denom == 0:
+        return 1.0
+    stat = n * (a * d - b * c) ** 2 / denom
+    # Survival function of chi-square with 1 dof
+    return math.erfc(math.sqrt(stat / 2))
+
+
+def _fisher_2x2(a: int, b: int, c: int, d: int) -> float:
+    """Two-sided Fisher exact p-value for the table [[a, b], [c, d]]."""
+    row1, row2, col1 = a + b, c + d, a + c
+    n = row1 + row2
+    lo, hi = max(0, col1 - row2), min(row1, col1)
+
+    base = math.lgamma(row1 + 1) + math.lgamma(row2 + 1) + math.lgamma(col1 + 1) + math.lgamma(n - col1 + 1) - math.lgamma(n + 1)
+
+    def log_p(x: int) -> float:
+        return base - (
+            math.lgamma(x + 1) + math.lgamma(row1 - x + 1)
+            + math.lgamma(col1 - x + 1) + math.lgamma(row2 - col1 + x + 1)
+        )
+
+    observed = log_p(a)
+    # Relative tolerance so tables as extreme as the observed one are included
+    cutoff = observed + 1e-7
+    total = sum(math.exp(lp) for lp in map(log_p, range(lo, hi + 1)) if lp <= cutoff)
+    return min(1.0, total)
+
+
+def _test_proportions(x1: int, n1: int, x2: int, n2: int) -> tuple[float, str]:
+    """Pick chi-square or Fisher depending on expected cell counts."""
+    a, b, c, d = x1, n1 - x1, x2, n2 - x2
+    n = n1 + n2
+    if n == 0:
+        return 1.0, "chi2"
+    hits, misses = a + c, b + d
+    min_expected = min(n1, n2) * min(hits, misses) / n
+    if min_expected < _MIN_EXPECTED:
+        return _fisher_2x2(a, b, c, d), "fisher"
+    return _chi2_2x2(a, b, c, d), "chi2"
+
+
+def _mark_significant(deltas: list[MetricDelta], alpha: float):
+    """Benjamini-Hochberg FDR control within each (level, metric) family."""
+    families: dict[tuple[str, str], list[MetricDelta]] = {}
+    for d in deltas:
+        families.setdefault((d.level, d.metric), []).append(d)
+
+    for family in families.values():
+        ranked = sorted(family, key=lambda d: d.p_value)
+        m = len(ranked)
+        cutoff_rank = 0
+        for i, d in enumerate(ranked, 1):
+            if d.p_value <= alpha * i / m:
+                cutoff_rank = i
+        for d in ranked[:cutoff_rank]:
+            d.significant = True
+
+
+# --- Rollups ---
+
+# Responses restricted to (prompt_id, provider) cells present in both runs
+_ALIGNED = """
+    WITH aligned AS (
+        SELECT prompt_id, provider FROM responses WHERE run_id = :base
+        INTERSECT
+        SELECT prompt_id, provider FROM responses WHERE run_id = :cur
+    ),
+    base AS (
+        SELECT r.response_id, r.run_id, r.prompt_id, r.provider
+        FROM responses r
+        JOIN aligned al ON al.prompt_id = r.prompt_id AND al.provider = r.provider
+        WHERE r.run_id IN (:base, :cur)
+    )
+"""
+
+# Response-level rate metrics (numerator column -> metric name)
+_RESPONSE_METRICS = {
+    "visible": "visibility",
+    "recommended": "recommendation",
+    "cited": "citation",
+    "coke_cited": "coke_citation",
+}
+
+
+def _response_rollup(conn: sqlite3.Connection, params: dict, key_expr: str) -> list[sqlite3.Row]:
+    return conn.execute(f"""
+        {_ALIGNED},
+        cite AS (
+            SELECT c.response_id, MAX(c.is_coke_domain) AS any_coke
+            FROM citations c JOIN base b ON b.response_id = c.response_id
+            GROUP BY c.response_id
+        )
+        SELECT b.run_id, {key_expr} AS key, COUNT(*) AS n,
+               SUM(CASE WHEN a.coke_brands_found IS NOT NULL AND a.coke_brands_found != '[]' THEN 1 ELSE 0 END) AS visible,
+               SUM(COALESCE(a.coke_is_primary_recommendation, 0)) AS recommended,
+               SUM(CASE WHEN ci.response_id IS NOT NULL THEN 1 ELSE 0 END) AS cited,
+               SUM(COALESCE(ci.any_coke, 0)) AS coke_cited
+        FROM base b
+        LEFT JOIN analyses a ON a.response_id = b.response_id
+        LEFT JOIN cite ci ON ci.response_id = b.response_id
+        GROUP BY b.run_id, key
+    """, params).fetchall()
+
+
+def _run_totals(conn: sqlite3.Connection, params: dict) -> dict[str, int]:
+    rows = conn.execute(f"{_ALIGNED} SELECT run_id, COUNT(*) AS n FROM base GROUP BY run_id", params).fetchall()
+    return {r["run_id"]: r["n"] for r in rows}
+
+
+def _brand_rollup(conn: sqlite3.Connection, params: dict) -> list[sqlite3.Row]:
+    """Responses mentioning each brand, per run."""
+    return conn.execute(f"""
+        {_ALIGNED}
+        SELECT b.run_id, COALESCE(ba.canonical, LOWER(TRIM(bm.brand))) AS key,
+               COUNT(DISTINCT bm.response_id) AS hits
+        FROM brand_mentions bm
+        JOIN base b ON b.response_id = bm.response_id
+        LEFT JOIN brand_aliases ba ON ba.alias = LOWER(TRIM(bm.brand))
+        GROUP BY b.run_id, key
+    """, params).fetchall()
+
+
+def _domain_rollup(conn: sqlite3.Connection, params: dict) -> list[sqlite3.Row]:
+    """Responses citing each domain, per run."""
+    return conn.execute(f"""
+        {_ALIGNED}
+        SELECT b.run_id, c.domain AS key, COUNT(DISTINCT c.response_id) AS hits
+        FROM citations c JOIN base b ON b.response_id = c.response_id
+        WHERE c.domain IS NOT NULL
+        GROUP BY b.run_id, key
+    """, params).fetchall()
+
+
+def _aligned_cells(conn: sqlite3.Connection, params: dict) -> int:
+    return conn.execute(
+        """SELECT COUNT(*) FROM (
+               SELECT prompt_id, provider FROM responses WHERE run_id = :base
+               INTERSECT
+               SELECT prompt_id, provider FROM responses WHERE run_id = :cur
+           )""",
+        params,
+    ).fetchone()[0]
+
+
+def _compare_pair(conn: sqlite3.Connection, base_run: str, cur_run: str, min_count: int) -> RunComparison:
+    params = {"base": base_run, "cur": cur_run}
+    comparison = RunComparison(base_run, cur_run, _aligned_cells(conn, params))
+    if not comparison.aligned_cells:
+        return comparison
+
+    # Engine and prompt levels: response-level rates keyed by provider / prompt_id
+    for level, key_expr in (("engine", "b.provider"), ("prompt", "b.prompt_id")):
+        cells: dict[str, dict[str, sqlite3.Row]] = {}
+        for row in _response_rollup(conn, params, key_expr):
+            cells.setdefault(row["key"], {})[row["run_id"]] = row
+        for key, by_run in cells.items():
+            base, cur = by_run.get(base_run), by_run.get(cur_run)
+            if base is None or cur is None:
+                continue
+            for col, metric in _RESPONSE_METRICS.items():
+                p, test = _test_proportions(base[col], base["n"], cur[col], cur["n"])
+                comparison.deltas.append(MetricDelta(
+                    level, key, metric, base[col], base["n"], cur[col], cur["n"], p, test,
+                ))
+
+    # Brand and domain levels: share of aligned responses that mention / cite the key
+    totals = _run_totals(conn, params)
+    n_base, n_cur = totals.get(base_run, 0), totals.get(cur_run, 0)
+    for level, metric, rows in (
+        ("brand", "mention", _brand_rollup(conn, params)),
+        ("domain", "cited_in", _domain_rollup(conn, params)),
+    ):
+        hits: dict[str, dict[str, int]] = {}
+        for row in rows:
+            hits.setdefault(row["key"], {})[row["run_id"]] = row["hits"]
+        for key, by_run in hits.items():
+            x1, x2 = by_run.get(base_run, 0), by_run.get(cur_run, 0)
+            if x1 + x2 < min_count:
+                continue
+            p, test = _test_proportions(x1, n_base, x2, n_cur)
+            comparison.deltas.append(MetricDelta(level, key, metric, x1, n_base, x2, n_cur, p, test))
+
+    return comparison
+
+
+def compare_runs(run_ids: list[str], alpha: float = 0.05, min_count: int = 3) -> list[RunComparison]:
+    """Compare each run against the first one (the baseline).
+
+    Runs are aligned on (prompt_id, provider) so only cells present in both
+    runs contribute. Brands and domains seen fewer than `min_count` times
+    across the pair are skipped. Significance is FDR-controlled per metric.
+    """
+    if len(run_ids) < 2:
+        raise ValueError("Need at least two run IDs to compare")
+
+    conn = _get_conn()
+    baseline = run_ids[0]
+    comparisons = [_compare_pair(conn, baseline, cur, min_count) for cur in run_ids[1:]]
+    conn.close()
+
+    for comp in comparisons:
+        _mark_significant(comp.deltas, alpha)
+    return comparisons
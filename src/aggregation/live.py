@@ -0,0 +1,192 @@
+"""Live aggregation — running counts fed one event at a time while a run is in progress."""
+
+from __future__ import annotations
+
+import sqlite3
+from collections import defaultdict
+from dataclasses import dataclass, field
+from pathlib import Path
+
+DB_PATH = Path(__file__).parent.parent.parent / "data" / "coke_geo.db"
+
+
+def _get_conn() -> sqlite3.Connection:
+    conn = sqlite3.connect(str(DB_PATH))
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+@dataclass
+class LiveCounts:
+    """Running response-level counts for one provider or prompt."""
+    responses: int = 0
+    analyzed: int = 0
+    visible: int = 0
+    recommended: int = 0
+    cited: int = 0
+    citations: int = 0
+    coke_citations: int = 0
+
+    @property
+    def visibility(self) -> float:
+        return round(self.visible / self.analyzed * 100, 1) if self.analyzed else 0.0
+
+    @property
+    def recommendation_rate(self) -> float:
+        return round(self.recommended / self.analyzed * 100, 1) if self.analyzed else 0.0
+
+    @property
+    def citation_rate(self) -> float:
+        return round(self.cited / self.responses * 100, 1) if self.responses else 0.0
+
+    @property
+    def coke_citation_rate(self) -> float:
+        return round(self.coke_citations / self.citations * 100, 1) if self.citations else 0.0
+
+
+@dataclass
+class LiveBrandCounts:
+    """Running counts for one brand."""
+    is_coke: bool = False
+    mentions: int = 0
+    recommended: int = 0
+    position_sum: int = 0
+    positioned: int = 0
+
+    @property
+    def avg_position(self) -> float | None:
+        return round(self.position_sum / self.positioned, 1) if self.positioned else None
+
+
+@dataclass
+class RunAccumulator:
+    """Streaming accumulator — every add_* call is O(1).
+
+    Responses must be added before their citations, analysis and mentions so
+    those events can be attributed to a provider and prompt.
+    """
+    by_provider: dict[str, LiveCounts] = field(default_factory=lambda: defaultdict(LiveCounts))
+    by_prompt: dict[str, LiveCounts] = field(default_factory=lambda: defaultdict(LiveCounts))
+    by_brand: dict[str, LiveBrandCounts] = field(default_factory=lambda: defaultdict(LiveBrandCounts))
+    _owners: dict[str, tuple[str, str]] = field(default_factory=dict)  # response_id -> (provider, prompt_id)
+    _cited: set[str] = field(default_factory=set)
+
+    @property
+    def total(self) -> LiveCounts:
+        """Run-wide counts (sums the per-provider rows, so O(providers))."""
+        out = LiveCounts()
+        for c in self.by_provider.values():
+            for name in vars(out):
+                setattr(out, name, getattr(out, name) + getattr(c, name))
+        return out
+
+    def _cells(self, response_id: str) -> tuple[LiveCounts, LiveCounts] | None:
+        owner = self._owners.get(response_id)
+        if owner is None:
+            return None
+        return self.by_provider[owner[0]], self.by_prompt[owner[1]]
+
+    def add_response(self, response_id: str, provider: str, prompt_id: str):
+        self._owners[response_id] = (provider, prompt_id)
+        self.by_provider[provider].responses += 1
+        self.by_prompt[prompt_id].responses += 1
+
+    def add_citation(self, response_id: str, is_coke_domain: bool):
+        cells = self._cells(response_id)
+        if cells is None:
+            return
+        first = response_id not in self._cited
+        self._cited.add(response_id)
+        for c in cells:
+            c.citations += 1
+            c.coke_citations += int(is_coke_domain)
+            c.cited += int(first)
+
+    def add_analysis(self, response_id: str, coke_visible: bool, coke_primary: bool):
+        cells = self._cells(response_id)
+        if cells is None:
+            return
+        for c in cells:
+            c.analyzed += 1
+            c.visible += int(coke_visible)
+            c.recommended += int(coke_primary)
+
+    def add_mention(self, brand: str, is_coke: bool, is_recommended: bool, position: int | None):
+        b = self.by_brand[brand.strip().lower()]
+        b.is_coke = b.is_coke or is_coke
+        b.mentions += 1
+        b.recommended += int(is_recommended)
+        if position:
+            b.position_sum += position
+            b.positioned += 1
+
+
+class RunFollower:
+    """Tails a run's rows in the database and feeds them into a RunAccumulator.
+
+    Each poll reads only rows added since the previous poll (rowid cursors),
+    inside one read transaction so all four tables are seen consistently.
+    """
+
+    def __init__(self, run_id: str):
+        self.run_id = run_id
+        self.acc = RunAccumulator()
+        self._last = {"responses": 0, "citations": 0, "analyses": 0, "brand_mentions": 0}
+
+    def run_info(self) -> dict | None:
+        conn = _get_conn()
+        row = conn.execute("SELECT * FROM runs WHERE run_id = ?", (self.run_id,)).fetchone()
+        conn.close()
+        return dict(row) if row else None
+
+    def poll(self) -> int:
+        """Consume new rows. Returns the number of events applied."""
+        conn = _get_conn()
+        conn.execute("BEGIN")
+        try:
+            resp_rows = conn.execute(
+                "SELECT rowid, response_id, provider, prompt_id FROM responses WHERE rowid > ? AND run_id = ? ORDER BY rowid",
+                (self._last["responses"], self.run_id),
+            ).fetchall()
+            cite_rows = conn.execute(
+                """SELECT c.citation_id AS rowid, c.response_id, c.is_coke_domain FROM citations c
+                   JOIN responses r ON r.response_id = c.response_id
+                   WHERE c.citation_id > ? AND r.run_id = ? ORDER BY c.citation_id""",
+                (self._last["citations"], self.run_id),
+            ).fetchall()
+            analysis_rows = conn.execute(
+                """SELECT a.analysis_id AS rowid, a.response_id,
+                          a.coke_brands_found != '[]' AS visible, a.coke_is_primary_recommendation AS primary_rec
+                   FROM analyses a JOIN responses r ON r.response_id = a.response_id
+                   WHERE a.analysis_id > ? AND r.run_id = ? ORDER BY a.analysis_id""",
+                (self._last["analyses"], self.run_id),
+            ).fetchall()
+            mention_rows = conn.execute(
+                """SELECT bm.mention_id AS rowid, COALESCE(ba.canonical, bm.brand) AS brand,
+                          bm.is_coke_brand, bm.is_recommended, bm.position
+                   FROM brand_mentions bm JOIN responses r ON r.response_id = bm.response_id
+                   LEFT JOIN brand_aliases ba ON ba.alias = LOWER(TRIM(bm.brand))
+                   WHERE bm.mention_id > ? AND r.run_id = ? ORDER BY bm.mention_id""",
+                (self._last["brand_mentions"], self.run_id),
+            ).fetchall()
+        finally:
+            conn.rollback()
+            conn.close()
+
+        for r in resp_rows:
+            self.acc.add_response(r["response_id"], r["provider"], r["prompt_id"])
+        for r in cite_rows:
+            self.acc.add_citation(r["response_id"], bool(r["is_coke_domain"]))
+        for r in analysis_rows:
+            self.acc.add_analysis(r["response_id"], bool(r["visible"]), bool(r["primary_rec"]))
+        for r in mention_rows:
+            self.acc.add_mention(r["brand"], bool(r["is_coke_brand"]), bool(r["is_recommended"]), r["position"])
+
+        for table, rows in (
+            ("responses", resp_rows), ("citations", cite_rows),
+            ("analyses", analysis_rows), ("brand_mentions", mention_rows),
+        ):
+            if rows:
+                self._last[table] = rows[-1]["rowid"]
+
+        return len(resp_rows) + len(cite_rows) + len(analysis_rows) + len(mention_rows)
@@ -0,0 +1,295 @@
+"""Prompt × provider and prompt × brand heatmap matrices, pivoted with NumPy."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import sqlite3
+from dataclasses import dataclass, fields
+from pathlib import Path
+
+import numpy as np
+
+DB_PATH = Path(__file__).parent.parent.parent / "data" / "coke_geo.db"
+CACHE_DIR = Path(__file__).parent.parent.parent / "data" / "matrices"
+
+
+def _get_conn() -> sqlite3.Connection:
+    conn = sqlite3.connect(str(DB_PATH))
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+@dataclass
+class PromptMatrix:
+    """Dense heatmap matrices. Rates are percentages, NaN where a cell has no data."""
+    prompt_ids: np.ndarray  # (P,)
+    prompt_texts: np.ndarray  # (P,)
+    providers: np.ndarray  # (E,)
+    brands: np.ndarray  # (B,)
+    # prompt × provider
+    responses: np.ndarray  # (P, E) response count
+    analyzed: np.ndarray  # (P, E) responses with an analysis
+    visibility: np.ndarray  # (P, E) % of analyzed responses mentioning a Coke brand
+    recommendation: np.ndarray  # (P, E) % of analyzed responses with Coke as primary rec
+    avg_position: np.ndarray  # (P, E) mean position of the first Coke mention
+    citation_rate: np.ndarray  # (P, E) % of responses with any citation
+    # prompt × brand
+    brand_responses: np.ndarray  # (P, B) responses mentioning the brand
+    brand_visibility: np.ndarray  # (P, B) % of analyzed responses mentioning the brand
+    brand_recommendation: np.ndarray  # (P, B) % of mentioning responses that recommend it
+    brand_avg_position: np.ndarray  # (P, B) mean first-mention position
+    fingerprint: str = ""
+
+    def save(self, path: Path):
+        """Write all arrays to a compressed .npz file."""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        arrays = {f.name: getattr(self, f.name) for f in fields(self)}
+        arrays["fingerprint"] = np.array(self.fingerprint)
+        np.savez_compressed(path, **arrays)
+
+    @classmethod
+    def load(cls, path: Path) -> PromptMatrix:
+        with np.load(path, allow_pickle=False) as data:
+            kwargs = {f.name: data[f.name] for f in fields(cls)}
+        kwargs["fingerprint"] = str(kwargs["fingerprint"])
+        return cls(**kwargs)
+
+    def cells(self) -> list[dict]:
+        """Long-format prompt × provider cells (the dashboard's PromptData shape).
+
+        Cells without any analyzed response are left out, as the dashboard's
+        live query (an inner join on analyses) does.
+        """
+        out = []
+        for i, pid in enumerate(self.prompt_ids):
+            for j, prov in enumerate(self.providers):
+                if not self.analyzed[i, j]:
+                    continue
+                out.append({
+                    "prompt_id": str(pid),
+                    "prompt_text": str(self.prompt_texts[i]),
+                    "provider": str(prov),
+                    "total": int(self.analyzed[i, j]),
+                    "visible": int(round(np.nan_to_num(self.visibility[i, j]) * self.analyzed[i, j] / 100)),
+                    "recommended": int(round(np.nan_to_num(self.recommendation[i, j]) * self.analyzed[i, j] / 100)),
+                    "visibility_pct": _pct(self.visibility[i, j]),
+                    "rec_pct": _pct(self.recommendation[i, j]),
+                    "avg_position": _round_or_none(self.avg_position[i, j]),
+                    "citation_pct": _pct(self.citation_rate[i, j]),
+                })
+        return out
+
+    def to_json(self, path: str | Path):
+        """Export prompt × provider cells and the prompt × brand matrix as JSON, with
+        the data fingerprint so readers can tell when it is stale."""
+        brand_cells = []
+        for i, j in zip(*np.nonzero(self.brand_responses)):
+            brand_cells.append({
+                "prompt_id": str(self.prompt_ids[i]),
+                "brand": str(self.brands[j]),
+                "responses": int(self.brand_responses[i, j]),
+                "visibility_pct": _pct(self.brand_visibility[i, j]),
+                "rec_pct": _pct(self.brand_recommendation[i, j]),
+                "avg_position": _round_or_none(self.brand_avg_position[i, j]),
+            })
+        with open(path, "w") as f:
+            json.dump({"fingerprint": self.fingerprint, "prompts": self.cells(), "brands": brand_cells}, f)
+
+    def to_csv(self, path: str | Path):
+        """Export prompt × provider cells in long format."""
+        import csv
+
+        cells = self.cells()
+        with open(path, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=list(cells[0].keys()) if cells else ["prompt_id"])
+            writer.writeheader()
+            writer.writerows(cells)
+
+
+def _pct(value: float) -> int:
+    return 0 if np.isnan(value) else int(round(value))
+
+
+def _round_or_none(value: float) -> float | None:
+    return None if np.isnan(value) else round(float(value), 1)
+
+
+def _ratio(num: np.ndarray, den: np.ndarray, scale: float = 100.0) -> np.ndarray:
+    """num / den * scale, NaN where den is zero."""
+    out = np.full(num.shape, np.nan)
+    np.divide(num * scale, den, out=out, where=den > 0)
+    return out
+
+
+def _fingerprint(conn: sqlite3.Connection, run_id: str | None) -> str:
+    """Cheap change detector so cached matrices are rebuilt when data changes.
+
+    analysis_id is AUTOINCREMENT, so re-analysis (delete + insert) always
+    raises the max. The dashboard computes the same string
+    (dashboard/src/lib/queries.ts) before trusting the JSON sidecar.
+    """
+    where = "WHERE r.run_id = ?" if run_id else ""
+    params = (run_id,) if run_id else ()
+    row = conn.execute(f"""
+        SELECT COUNT(*), COUNT(a.response_id), COALESCE(MAX(a.analysis_id), 0)
+        FROM responses r LEFT JOIN analyses a ON a.response_id = r.response_id
+        {where}
+    """, params).fetchone()
+    return f"{row[0]}:{row[1]}:{row[2]}"
+
+
+def _filtered_prompt_ids(category: str | None, persona: str | None, intent: str | None, prompts_file: str) -> set[str] | None:
+    """Prompt IDs matching the seed-prompt tags, or None when unfiltered."""
+    if not (category or persona or intent):
+        return None
+    from src.runner import load_prompts
+
+    return {
+        p.id for p in load_prompts(prompts_file, category=category)
+        if (persona is None or p.persona == persona) and (intent is None or p.intent == intent)
+    }
+
+
+def build_prompt_matrix(
+    run_id: str | None = None,
+    category: str | None = None,
+    persona: str | None = None,
+    intent: str | None = None,
+    prompts_file: str = "prompts/seed_prompts.yaml",
+) -> PromptMatrix:
+    """Build the matrices with two narrow queries and NumPy pivots."""
+    conn = _get_conn()
+    fingerprint = _fingerprint(conn, run_id)
+    where = "WHERE r.run_id = ?" if run_id else ""
+    params = (run_id,) if run_id else ()
+
+    # One row per response: only the columns the heatmaps need
+    resp_rows = conn.execute(f"""
+        SELECT r.prompt_id, r.prompt_text, r.provider,
+               a.response_id IS NOT NULL AS analyzed,
+               COALESCE(a.coke_brands_found != '[]', 0) AS visible,
+               COALESCE(a.coke_is_primary_recommendation, 0) AS recommended,
+               EXISTS (SELECT 1 FROM citations c WHERE c.response_id = r.response_id) AS cited,
+               (SELECT MIN(bm.position) FROM brand_mentions bm
+                WHERE bm.response_id = r.response_id AND bm.is_coke_brand = 1) AS coke_position
+        FROM responses r
+        LEFT JOIN analyses a ON a.response_id = r.response_id
+        {where}
+    """, params).fetchall()
+
+    # One row per (response, brand): first mention only
+    brand_rows = conn.execute(f"""
+        SELECT r.prompt_id, COALESCE(ba.canonical, LOWER(TRIM(bm.brand))) AS brand,
+               MIN(bm.position) AS position, MAX(bm.is_recommended) AS recommended
+        FROM brand_mentions bm
+        JOIN responses r ON r.response_id = bm.response_id
+        LEFT JOIN brand_aliases ba ON ba.alias = LOWER(TRIM(bm.brand))
+        {where}
+        GROUP BY bm.response_id, 2
+    """, params).fetchall()
+    conn.close()
+
+    keep = _filtered_prompt_ids(category, persona, intent, prompts_file)
+    if keep is not None:
+        resp_rows = [r for r in resp_rows if r["prompt_id"] in keep]
+        brand_rows = [r for r in brand_rows if r["prompt_id"] in keep]
+
+    prompt_text = {r["prompt_id"]: r["prompt_text"] for r in resp_rows}
+    prompt_ids = sorted(prompt_text)
+    providers = sorted({r["provider"] for r in resp_rows})
+    brands = sorted({r["brand"] for r in brand_rows})
+    p_index = {p: i for i, p in enumerate(prompt_ids)}
+    e_index = {e: i for i, e in enumerate(providers)}
+    b_index = {b: i for i, b in enumerate(brands)}
+    n_p, n_e, n_b = len(prompt_ids), len(providers), len(brands)
+
+    # prompt × provider: flatten cell coordinates once, then bincount every measure
+    cell = np.fromiter(
+        (p_index[r["prompt_id"]] * n_e + e_index[r["provider"]] for r in resp_rows),
+        dtype=np.int64, count=len(resp_rows),
+    )
+    cols = np.array(
+        [(r["analyzed"], r["visible"], r["recommended"], r["cited"], r["coke_position"] or 0) for r in resp_rows],
+        dtype=np.float64,
+    ).reshape(-1, 5)
+
+    def pivot(weights: np.ndarray | None = None) -> np.ndarray:
+        return np.bincount(cell, weights=weights, minlength=n_p * n_e).reshape(n_p, n_e)
+
+    responses = pivot()
+    analyzed = pivot(cols[:, 0])
+    has_pos = (cols[:, 4] > 0).astype(np.float64)
+
+    # prompt × brand
+    b_cell = np.fromiter(
+        (p_index[r["prompt_id"]] * n_b + b_index[r["brand"]] for r in brand_rows if r["prompt_id"] in p_index),
+        dtype=np.int64,
+    )
+    b_cols = np.array(
+        [(r["position"] or 0, r["recommended"] or 0) for r in brand_rows if r["prompt_id"] in p_index],
+        dtype=np.float64,
+    ).reshape(-1, 2)
+
+    def b_pivot(weights: np.ndarray | None = None) -> np.ndarray:
+        return np.bincount(b_cell, weights=weights, minlength=n_p * n_b).reshape(n_p, n_b)
+
+    brand_responses = b_pivot()
+    analyzed_per_prompt = analyzed.sum(axis=1, keepdims=True)
+
+    return PromptMatrix(
+        prompt_ids=np.array(prompt_ids, dtype=str),
+        prompt_texts=np.array([prompt_text[p] for p in prompt_ids], dtype=str),
+        providers=np.array(providers, dtype=str),
+        brands=np.array(brands, dtype=str),
+        responses=responses.astype(np.int32),
+        analyzed=analyzed.astype(np.int32),
+        visibility=_ratio(pivot(cols[:, 1]), analyzed),
+        recommendation=_ratio(pivot(cols[:, 2]), analyzed),
+        avg_position=_ratio(pivot(cols[:, 4]), pivot(has_pos), scale=1.0),
+        citation_rate=_ratio(pivot(cols[:, 3]), responses),
+        brand_responses=brand_responses.astype(np.int32),
+        brand_visibility=_ratio(brand_responses, np.broadcast_to(analyzed_per_prompt, brand_responses.shape)),
+        brand_recommendation=_ratio(b_pivot(b_cols[:, 1]), brand_responses),
+        brand_avg_position=_ratio(b_pivot(b_cols[:, 0]), brand_responses, scale=1.0),
+        fingerprint=fingerprint,
+    )
+
+
+def _cache_path(
+    run_id: str | None, category: str | None, persona: str | None, intent: str | None, prompts_file: str,
+) -> Path:
+    if not (category or persona or intent):
+        return CACHE_DIR / f"{run_id or 'all'}.npz"
+    # Filters select prompts by their tags in prompts_file, so it is part of the key
+    filters = json.dumps([category, persona, intent, str(Path(prompts_file).resolve())])
+    return CACHE_DIR / f"{run_id or 'all'}_{hashlib.sha1(filters.encode()).hexdigest()[:8]}.npz"
+
+
+def load_prompt_matrix(
+    run_id: str | None = None,
+    category: str | None = None,
+    persona: str | None = None,
+    intent: str | None = None,
+    prompts_file: str = "prompts/seed_prompts.yaml",
+    refresh: bool = False,
+) -> PromptMatrix:
+    """Return the cached matrix if the underlying data is unchanged, else rebuild and cache it.
+
+    Unfiltered matrices also get a JSON sidecar that the dashboard's prompt
+    heatmap reads instead of re-querying per cell.
+    """
+    path = _cache_path(run_id, category, persona, intent, prompts_file)
+    if not refresh and path.exists():
+        conn = _get_conn()
+        current = _fingerprint(conn, run_id)
+        conn.close()
+        cached = PromptMatrix.load(path)
+        if cached.fingerprint == current:
+            return cached
+
+    matrix = build_prompt_matrix(run_id, category, persona, intent, prompts_file)
+    matrix.save(path)
+    if not (category or persona or intent):
+        matrix.to_json(path.with_suffix(".json"))
+    return matrix
@@ -30,8 +30,10 @@ class EngineOverview:
     citation_rate: float = 0.0  # % of responses with any citations
     coke_citation_rate: float = 0.0  # % of citations from Coke domains
     avg_latency_ms: int = 0
+    avg_ttft_ms: int | None = None  # streamed responses only
     total_input_tokens: int = 0
     total_output_tokens: int = 0
+    model: str | None = None  # set when broken down by model
 
 
 @dataclass
@@ -53,15 +55,15 @@ class CompetitorInfo:
     recommendation_count: int
 
 
-def compute_engine_overview(run_id: str | None = None) -> list[EngineOverview]:
-    """Compute per-engine aggregated stats."""
+def compute_engine_overview(run_id: str | None = None, by_model: bool = False) -> list[EngineOverview]:
+    """Compute per-engine aggregated stats (per provider/model with `by_model`)."""
     conn = _get_conn()
 
     where = f"WHERE r.run_id = '{run_id}'" if run_id else ""
 
-    # Get responses grouped by provider
+    # Get responses grouped by provider (and model)
     providers = conn.execute(
-        f"SELECT DISTINCT provider FROM responses r {where}"
+        f"SELECT DISTINCT provider, {'model' if by_model else 'NULL AS model'} FROM responses r {where} ORDER BY 1, 2"
     ).fetchall()
 
     overviews = []
@@ -69,6 +71,8 @@ def compute_engine_overview(run_id: str | None = None) -> list[EngineOverview]:
     for prow in providers:
         prov = prow["provider"]
         prov_where = f"r.provider = '{prov}'" + (f" AND r.run_id = '{run_id}'" if run_id else "")
+        if by_model:
+            prov_where += " AND r.model = '{}'".format(prow["model"].replace("'", "''"))
 
         # Total responses
         total = conn.execute(f"SELECT COUNT(*) FROM responses r WHERE {prov_where}").fetchone()[0]
@@ -140,7 +144,7 @@ def compute_engine_overview(run_id: str | None = None) -> list[EngineOverview]:
 
         # Latency and tokens
         perf = conn.execute(f"""
-            SELECT AVG(r.latency_ms), SUM(r.input_tokens), SUM(r.output_tokens)
+            SELECT AVG(r.latency_ms), SUM(r.input_tokens), SUM(r.output_tokens), AVG(r.ttft_ms)
             FROM responses r WHERE {prov_where}
         """).fetchone()
 
@@ -157,6 +161,8 @@ def compute_engine_overview(run_id: str | None = None) -> list[EngineOverview]:
             avg_latency_ms=int(perf[0]) if perf[0] else 0,
             total_input_tokens=int(perf[1]) if perf[1] else 0,
             total_output_tokens=int(perf[2]) if perf[2] else 0,
+            avg_ttft_ms=int(perf[3]) if perf[3] is not None else None,
+            model=prow["model"],
         ))
 
     conn.close()
@@ -164,24 +170,55 @@ def compute_engine_overview(run_id: str | None = None) -> list[EngineOverview]:
 
 
 def get_top_competitors(run_id: str | None = None, limit: int = 10) -> list[CompetitorInfo]:
-    """Get most mentioned competitor brands."""
+    """Get most mentioned competitor brands, canonicalized through brand_aliases.
+
+    Mentions are grouped once by (brand, sentiment); window sums over each
+    brand give totals, and the top-ranked row per brand is its sentiment mode.
+    Brands are labelled with their registry display name; unknown brands with
+    the name as extracted.
+    """
     conn = _get_conn()
-    where = f"JOIN responses r ON bm.response_id = r.response_id WHERE r.run_id = '{run_id}' AND" if run_id else "WHERE"
+    join = "JOIN responses r ON bm.response_id = r.response_id" if run_id else ""
+    run_filter = "AND r.run_id = :run_id" if run_id else ""
 
     rows = conn.execute(f"""
-        SELECT bm.brand, COUNT(*) as cnt, AVG(bm.position) as avg_pos,
-               bm.sentiment, SUM(bm.is_recommended) as rec_cnt
-        FROM brand_mentions bm
-        {where} bm.is_coke_brand = 0
-        GROUP BY bm.brand
-        ORDER BY cnt DESC
-        LIMIT ?
-    """, (limit,)).fetchall()
+        WITH m AS (
+            SELECT COALESCE(ba.canonical, LOWER(TRIM(bm.brand))) AS brand,
+                   COALESCE(ba.display, TRIM(bm.brand)) AS display,
+                   bm.position, bm.sentiment, bm.is_recommended
+            FROM brand_mentions bm
+            {join}
+            LEFT JOIN brand_aliases ba ON ba.alias = LOWER(TRIM(bm.brand))
+            WHERE bm.is_coke_brand = 0 AND COALESCE(ba.is_coke, 0) = 0 {run_filter}
+        ),
+        grouped AS (
+            SELECT brand, sentiment, COUNT(*) AS n, MIN(display) AS display,
+                   SUM(position) AS pos_sum, COUNT(position) AS pos_n,
+                   SUM(is_recommended) AS rec
+            FROM m
+            GROUP BY brand, sentiment
+        ),
+        ranked AS (
+            SELECT brand, sentiment,
+                   MIN(display) OVER w AS display,
+                   SUM(n) OVER w AS cnt,
+                   SUM(pos_sum) OVER w * 1.0 / NULLIF(SUM(pos_n) OVER w, 0) AS avg_pos,
+                   SUM(rec) OVER w AS rec_cnt,
+                   ROW_NUMBER() OVER (PARTITION BY brand ORDER BY n DESC, sentiment) AS rk
+            FROM grouped
+            WINDOW w AS (PARTITION BY brand)
+        )
+        SELECT display, cnt, avg_pos, sentiment, rec_cnt
+        FROM ranked
+        WHERE rk = 1
+        ORDER BY cnt DESC, brand
+        LIMIT :limit
+    """, {"run_id": run_id, "limit": limit}).fetchall()
 
     conn.close()
     return [
         CompetitorInfo(
-            brand=r["brand"],
+            brand=r["display"],
             mention_count=r["cnt"],
             avg_position=round(r["avg_pos"], 1) if r["avg_pos"] else 0,
             sentiment_mode=r["sentiment"] or "neutral",
@@ -0,0 +1,21 @@
+"""Project configuration — config.yaml, found relative to the project and loaded once."""
+
+from __future__ import annotations
+
+import os
+from functools import lru_cache
+from pathlib import Path
+
+import yaml
+
+CONFIG_PATH = Path(__file__).parent.parent / "config.yaml"
+
+
+@lru_cache(maxsize=1)
+def load_config() -> dict:
+    """Load config.yaml (GEO_CONFIG points at another file); read once per process.
+
+    The returned dict is shared — callers must not modify it.
+    """
+    with open(os.environ.get("GEO_CONFIG") or CONFIG_PATH) as f:
+        return yaml.safe_load(f) or {}
@@ -5,42 +5,16 @@ from __future__ import annotations
 from enum import Enum
 from typing import Literal
 
-import instructor
-from openai import AsyncOpenAI
 from pydantic import BaseModel, Field
 
+from src.extraction.client import ExtractionUsage, get_extraction_client, track_usage
+from src.extraction.registry import get_registry
 
-# --- Brand dictionaries ---
-
-COKE_BRANDS = {
-    "coca_cola": ["coca-cola", "coca cola", "coke", "diet coke", "coke zero", "coca-cola zero sugar"],
-    "thums_up": ["thums up", "thumbs up", "thumps up"],
-    "sprite": ["sprite"],
-    "fanta": ["fanta"],
-    "limca": ["limca"],
-    "maaza": ["maaza"],
-    "minute_maid": ["minute maid"],
-    "kinley": ["kinley"],
-    "schweppes": ["schweppes"],
-    "georgia": ["georgia coffee"],
-}
-
-COMPETITORS = {
-    "pepsi": ["pepsi", "pepsico", "pepsi cola"],
-    "mountain_dew": ["mountain dew", "mtn dew"],
-    "mirinda": ["mirinda"],
-    "7up": ["7up", "seven up", "7 up"],
-    "slice": ["slice"],
-    "tropicana": ["tropicana"],
-    "sting": ["sting energy"],
-    "campa": ["campa cola", "campa"],
-    "bovonto": ["bovonto"],
-    "paper_boat": ["paper boat"],
-    "real": ["real juice", "real fruit"],
-    "frooti": ["frooti"],
-    "lahori": ["lahori", "lahori zeera"],
-    "brobond": ["brobond"],
-}
+
+# --- Brand dictionaries (loaded from brands.yaml via the registry) ---
+
+COKE_BRANDS = get_registry().coke_brands
+COMPETITORS = get_registry().competitors
 
 
 # --- Pydantic models ---
@@ -77,22 +51,28 @@ class ResponseAnalysis(BaseModel):
 
 # --- Analyzer ---
 
-ANALYSIS_PROMPT = """Analyze this LLM-generated response about beverages/drinks in the Indian market.
+# Bump whenever the prompt or response model changes: cached analyses are keyed on it
+ANALYZER_VERSION = "1"
 
-Extract ALL brand mentions (soft drinks, beverages, cola brands). For each brand, determine:
+# What to extract from a response; shared with the batched prompt (batcher.BATCH_PROMPT)
+ANALYSIS_INSTRUCTIONS = """Extract ALL brand mentions (soft drinks, beverages, cola brands). For each brand, determine:
 - Its position (order of first mention, 1 = first)
 - Sentiment (positive/neutral/negative/mixed)
 - Whether it's recommended or favored
 - Brief context
 
-Categorize brands into Coca-Cola portfolio (Coca-Cola, Thums Up, Sprite, Fanta, Limca, Maaza, Minute Maid, Kinley, Schweppes) vs competitors (Pepsi, Mountain Dew, Mirinda, 7Up, Campa, Bovonto, Paper Boat, Frooti, Lahori, etc.).
+Categorize brands into Coca-Cola portfolio (Coca-Cola, Thums Up, Sprite, Fanta, Limca, Maaza, Minute Maid, Kinley, Schweppes) vs competitors (Pepsi, Mountain Dew, Mirinda, 7Up, Campa, Bovonto, Paper Boat, Frooti, Lahori, etc.)."""
+
+ANALYSIS_PROMPT = f"""Analyze this LLM-generated response about beverages/drinks in the Indian market.
+
+{ANALYSIS_INSTRUCTIONS}
 
 Response to analyze:
 ---
-{response_text}
+{{response_text}}
 ---
 
-Citations found: {citation_domains}"""
+Citations found: {{citation_domains}}"""
 
 
 async def analyze_response(
@@ -101,23 +81,50 @@ async def analyze_response(
     model: str = "gpt-4o-mini",
 ) -> ResponseAnalysis:
     """Extract brand mentions and sentiment from an LLM response."""
-    client = instructor.from_openai(AsyncOpenAI())
+    analysis, _ = await analyze_response_with_usage(response_text, citation_domains, model)
+    return analysis
+
+
+async def analyze_response_with_usage(
+    response_text: str,
+    citation_domains: list[str] | None = None,
+    model: str = "gpt-4o-mini",
+    max_connections: int = 10,
+) -> tuple[ResponseAnalysis, ExtractionUsage]:
+    """analyze_response, plus the attempts, validation failures and tokens it took."""
+    client = get_extraction_client(max_connections)
 
     domains_str = ", ".join(citation_domains) if citation_domains else "none"
 
-    analysis = await client.chat.completions.create(
-        model=model,
-        response_model=ResponseAnalysis,
-        messages=[
-            {
-                "role": "user",
-                "content": ANALYSIS_PROMPT.format(
-                    response_text=response_text,
-                    citation_domains=domains_str,
-                ),
-            }
-        ],
-        max_retries=2,
+    with track_usage() as usage:
+        analysis = await client.chat.completions.create(
+            model=model,
+            response_model=ResponseAnalysis,
+            messages=[
+                {
+                    "role": "user",
+                    "content": ANALYSIS_PROMPT.format(
+                        response_text=response_text,
+                        citation_domains=domains_str,
+                    ),
+                }
+            ],
+            max_retries=2,
+        )
+    usage.model = model
+
+    return analysis, usage
+
+
+def empty_analysis(response_text: str, coke_domains: list[str] | None = None) -> ResponseAnalysis:
+    """Analysis for a response the local brand scan found no brands in — no LLM call needed."""
+    from src.extraction.local_analyzer import detect_response_type
+
+    return ResponseAnalysis(
+        coke_brands_found=[],
+        competitor_brands_found=[],
+        all_mentions=[],
+        coke_domains_cited=coke_domains or [],
+        response_type=detect_response_type(response_text, brand_count=0),
+        coke_is_primary_recommendation=False,
     )
-
-    return analysis
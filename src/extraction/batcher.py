@@ -0,0 +1,216 @@
+"""Batched extraction — packs several short responses into one structured-output call."""
+
+from __future__ import annotations
+
+import asyncio
+
+from pydantic import BaseModel, Field
+
+from src.extraction.analyzer import ANALYSIS_INSTRUCTIONS, ResponseAnalysis, analyze_response_with_usage
+from src.extraction.client import ExtractionUsage, close_extraction_clients, get_extraction_client, track_usage
+
+
+class KeyedAnalysis(BaseModel):
+    """Analysis of one response in a batch."""
+    response_id: str = Field(description="The ID from the response's header, copied exactly")
+    analysis: ResponseAnalysis
+
+
+class BatchAnalysis(BaseModel):
+    """Analyses for every response in the batch."""
+    results: list[KeyedAnalysis] = Field(description="One entry per response, in the order given")
+
+
+BATCH_PROMPT = f"""Analyze each of the following LLM-generated responses about beverages/drinks in the Indian market, independently of one another.
+
+{ANALYSIS_INSTRUCTIONS}
+
+Positions count from 1 within each response. Return exactly one result per response, with response_id copied from its header.
+
+{{responses}}"""
+
+_ITEM = """=== RESPONSE {response_id} ===
+Citations found: {citation_domains}
+---
+{response_text}
+---"""
+
+# Rough chars-per-token for budget estimates; exact counts are not needed to size batches
+_CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // _CHARS_PER_TOKEN + 1
+
+
+async def analyze_batch(
+    items: list[tuple[str, str, list[str] | None]],
+    model: str = "gpt-4o-mini",
+    max_connections: int = 10,
+) -> tuple[dict[str, ResponseAnalysis], ExtractionUsage]:
+    """Analyze (response_id, text, citation_domains) items in one call. Missing IDs are omitted."""
+    client = get_extraction_client(max_connections)
+    responses = "\n\n".join(
+        _ITEM.format(
+            response_id=rid,
+            citation_domains=", ".join(domains) if domains else "none",
+            response_text=text,
+        )
+        for rid, text, domains in items
+    )
+    with track_usage() as usage:
+        batch = await client.chat.completions.create(
+            model=model,
+            response_model=BatchAnalysis,
+            messages=[{"role": "user", "content": BATCH_PROMPT.format(responses=responses)}],
+            max_retries=1,
+        )
+    usage.model = model
+    wanted = {rid for rid, _, _ in items}
+    return {r.response_id: r.analysis for r in batch.results if r.response_id in wanted}, usage
+
+
+class ExtractionBatcher:
+    """Extraction pool that coalesces concurrent analysis requests into batched calls.
+
+    `submit()` queues a response and returns its analysis once the batch it
+    landed in completes. A batch is flushed when it reaches `max_batch_size`
+    responses or `max_batch_tokens` estimated tokens, or `max_delay` seconds
+    after its first response arrived. Responses too long to share a batch go
+    out as single calls. If a batched call fails validation or drops a
+    response, the affected responses are retried one by one. At most
+    `concurrency` extraction calls are in flight, independent of the
+    per-provider query limits, sharing one pooled client of that size.
+
+    `usage` totals every extraction call made, including retries and
+    batches that had to fall back. A batched call's usage is split over the
+    responses of the batch that end up with an analysis, so the stored rows
+    add up to what was spent even when the call failed or dropped responses.
+    """
+
+    def __init__(
+        self,
+        model: str = "gpt-4o-mini",
+        max_batch_size: int = 8,
+        max_batch_tokens: int = 6000,
+        max_delay: float = 0.5,
+        concurrency: int = 4,
+    ):
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_batch_tokens = max_batch_tokens
+        self.max_delay = max_delay
+        self.concurrency = concurrency
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.usage = ExtractionUsage()
+        self.calls = 0
+        self.batched_calls = 0
+        self.fallbacks = 0
+
+        self._pending: list[tuple[str, str, list[str] | None, asyncio.Future]] = []
+        self._pending_tokens = 0
+        self._timer: asyncio.TimerHandle | None = None
+        self._tasks: set[asyncio.Task] = set()
+
+    async def submit(
+        self, response_id: str, response_text: str, citation_domains: list[str] | None = None,
+    ) -> tuple[ResponseAnalysis, ExtractionUsage]:
+        """Analysis of one response and its share of the extraction call's usage."""
+        tokens = estimate_tokens(response_text)
+        if self.max_batch_size <= 1 or tokens * 2 > self.max_batch_tokens:
+            return await self._single(response_text, citation_domains)
+
+        if self._pending_tokens + tokens > self.max_batch_tokens:
+            self._flush()
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((response_id, response_text, citation_domains, future))
+        self._pending_tokens += tokens
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.max_delay, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+        batch, self._pending, self._pending_tokens = self._pending, [], 0
+        task = asyncio.create_task(self._run(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _single(
+        self, response_text: str, citation_domains: list[str] | None,
+    ) -> tuple[ResponseAnalysis, ExtractionUsage]:
+        async with self.semaphore:
+            self.calls += 1
+            try:
+                with track_usage() as usage:
+                    analysis, _ = await analyze_response_with_usage(
+                        response_text, citation_domains, self.model, self.concurrency,
+                    )
+            finally:
+                self.usage.add(usage)
+            return analysis, usage
+
+    async def _run(self, batch: list[tuple[str, str, list[str] | None, asyncio.Future]]):
+        results: dict[str, ResponseAnalysis] = {}
+        batch_usage = ExtractionUsage()
+        if len(batch) > 1:
+            try:
+                async with self.semaphore:
+                    self.calls += 1
+                    self.batched_calls += 1
+                    with track_usage() as batch_usage:
+                        results, _ = await analyze_batch(
+                            [(rid, text, domains) for rid, text, domains, _ in batch], self.model, self.concurrency,
+                        )
+            except Exception:
+                results = {}
+            finally:
+                batch_usage.model = self.model
+                self.usage.add(batch_usage)
+
+        async def resolve(rid, text, domains, future) -> tuple[ResponseAnalysis, ExtractionUsage | None] | Exception | None:
+            """The response's analysis and its own single-call usage (None if the batch answered it)."""
+            if future.done():  # submitter was cancelled
+                return None
+            if rid in results:
+                return results[rid], None
+            if len(batch) > 1:
+                self.fallbacks += 1
+            try:
+                return await self._single(text, domains)
+            except Exception as e:
+                return e
+
+        outcomes = await asyncio.gather(*(resolve(*item) for item in batch))
+        answered = [
+            (item, outcome) for item, outcome in zip(batch, outcomes)
+            if isinstance(outcome, tuple) and not item[3].done()
+        ]
+        for (_, _, _, future), outcome in zip(batch, outcomes):
+            if isinstance(outcome, Exception) and not future.done():
+                future.set_exception(outcome)
+        if len(batch) == 1:
+            for (_, _, _, future), (analysis, usage) in answered:
+                future.set_result((analysis, usage))
+            return
+
+        # Apportion the batched call's usage over the answered responses by share of the input
+        total_tokens = sum(estimate_tokens(text) for (_, text, _, _), _ in answered)
+        shares = batch_usage.split([estimate_tokens(text) / total_tokens for (_, text, _, _), _ in answered], len(batch))
+        for ((_, _, _, future), (analysis, own_usage)), usage in zip(answered, shares):
+            if own_usage is not None:  # fallback: its own call plus its share of the failed batch
+                usage.add(own_usage)
+            future.set_result((analysis, usage))
+
+    async def close(self):
+        """Flush anything still queued, wait for in-flight batches and close the extraction clients."""
+        self._flush()
+        while self._tasks:
+            await asyncio.gather(*list(self._tasks))
+        await close_extraction_clients()
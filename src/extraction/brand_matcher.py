@@ -0,0 +1,190 @@
+"""Local brand matcher — Aho-Corasick automaton over the brand alias dictionaries."""
+
+from __future__ import annotations
+
+from collections import deque
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class BrandMatch:
+    """One alias occurrence in the scanned text."""
+    canonical: str
+    alias: str
+    start: int
+    end: int
+    is_coke: bool
+
+
+class BrandMatcher:
+    """Multi-pattern matcher with case folding and word boundaries.
+
+    The automaton is compiled once; each scan is a single linear pass over the
+    text. Overlapping hits are resolved leftmost-longest, so "diet coke" wins
+    over "coke" and "coca-cola zero sugar" over "coca-cola".
+
+    Aliases in `ambiguous` are also everyday words ("slice", "real juice"):
+    they only match where the text capitalizes them ("Slice", not "a slice of").
+    """
+
+    def __init__(self, brands: dict[str, tuple[list[str], bool]], ambiguous: frozenset[str] = frozenset()):
+        """`brands` maps canonical name -> (aliases, is_coke)."""
+        self._goto: list[dict[str, int]] = [{}]
+        self._fail: list[int] = [0]
+        self._out: list[list[int]] = [[]]
+        self._patterns: list[tuple[str, str, bool]] = []  # (alias, canonical, is_coke)
+        self._ambiguous: set[int] = set()  # pattern ids
+        self._max_len = 0
+
+        ambiguous = {a.strip().lower() for a in ambiguous}
+        for canonical, (aliases, is_coke) in brands.items():
+            for alias in {a.strip().lower() for a in aliases if a.strip()}:
+                self._add(alias, canonical, is_coke, alias in ambiguous)
+        self._build_failure_links()
+
+    def _add(self, alias: str, canonical: str, is_coke: bool, ambiguous: bool = False):
+        state = 0
+        for ch in alias:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            state = nxt
+        self._max_len = max(self._max_len, len(alias))
+        self._out[state].append(len(self._patterns))
+        if ambiguous:
+            self._ambiguous.add(len(self._patterns))
+        self._patterns.append((alias, canonical, is_coke))
+
+    def _build_failure_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                f = self._fail[state]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                target = self._goto[f].get(ch, 0)
+                # Depth-1 states fail back to the root, never to themselves
+                self._fail[nxt] = target if target != nxt else 0
+                # Inherit outputs so every state reports all patterns ending here
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    @staticmethod
+    def _fold(text: str) -> str:
+        """Lowercase without changing string length, so offsets stay valid."""
+        lowered = text.lower()
+        if len(lowered) == len(text):
+            return lowered
+        return "".join(c if len(c.lower()) != 1 else c.lower() for c in text)
+
+    def scan(self, text: str) -> list[BrandMatch]:
+        """All non-overlapping whole-word alias matches, in text order."""
+        folded = self._fold(text)
+        n = len(folded)
+        goto, fail, out, patterns = self._goto, self._fail, self._out, self._patterns
+        hits: list[tuple[int, int, int]] = []  # (start, -length, pattern)
+        state = 0
+
+        for i, ch in enumerate(folded):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for pid in out[state]:
+                length = len(patterns[pid][0])
+                start, end = i - length + 1, i + 1
+                if start > 0 and folded[start - 1].isalnum():
+                    continue
+                if end < n and folded[end].isalnum():
+                    continue
+                if pid in self._ambiguous and not text[start].isupper():
+                    continue
+                hits.append((start, -length, pid))
+
+        hits.sort()
+        matches: list[BrandMatch] = []
+        last_end = -1
+        for start, neg_len, pid in hits:
+            if start < last_end:
+                continue
+            alias, canonical, is_coke = patterns[pid]
+            matches.append(BrandMatch(canonical, alias, start, start - neg_len, is_coke))
+            last_end = start - neg_len
+        return matches
+
+    def contains_any(self, text: str) -> bool:
+        """Whether any brand alias appears in the text."""
+        return bool(self.scan(text))
+
+    def stream(self) -> StreamScan:
+        """contains_any() for text that arrives in pieces, such as a streamed answer."""
+        return StreamScan(self)
+
+    def first_mentions(self, text: str) -> list[BrandMatch]:
+        """First match per canonical brand, ordered by position (position 1 = first)."""
+        seen: dict[str, BrandMatch] = {}
+        for m in self.scan(text):
+            seen.setdefault(m.canonical, m)
+        return list(seen.values())
+
+
+class StreamScan:
+    """Incremental BrandMatcher.contains_any: `feed()` each delta, then `finish()`.
+
+    The automaton state carries over between deltas, so an alias split across
+    two deltas is still found. Only the last few characters are kept (enough
+    for the longest alias and its left boundary); a match whose right boundary
+    is still unknown waits for the next character or the end of the text.
+    """
+
+    def __init__(self, matcher: BrandMatcher):
+        self._matcher = matcher
+        self._window = matcher._max_len + 1
+        self._state = 0
+        self._tail = ""  # last `_window` characters fed, as received
+        self._pending = False  # a match ends at the last character fed
+        self.found = False
+        self.chars = 0  # characters fed so far
+
+    def feed(self, delta: str):
+        if self.found:
+            self.chars += len(delta)
+            return
+        m = self._matcher
+        goto, fail, out, patterns = m._goto, m._fail, m._out, m._patterns
+        for ch in delta:
+            lowered = ch.lower()
+            folded = lowered if len(lowered) == 1 else ch
+            if self._pending and not folded.isalnum():
+                self.found = True
+                break
+            self._pending = False
+            self._tail = (self._tail + ch)[-self._window:]
+            state = self._state
+            while state and folded not in goto[state]:
+                state = fail[state]
+            self._state = state = goto[state].get(folded, 0)
+            for pid in out[state]:
+                length = len(patterns[pid][0])
+                # Character before the match, and the match's first character, from the tail
+                if len(self._tail) > length and self._tail[-length - 1].isalnum():
+                    continue
+                if pid in m._ambiguous and not self._tail[-length].isupper():
+                    continue
+                self._pending = True
+        self.chars += len(delta)
+
+    def finish(self) -> bool:
+        """Whether any brand alias appeared in the text fed."""
+        return self.found or self._pending
+
+
+def get_brand_matcher() -> BrandMatcher:
+    """Process-wide matcher compiled from the brand registry."""
+    from src.extraction.registry import get_registry
+
+    return get_registry().matcher
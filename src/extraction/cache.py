@@ -0,0 +1,142 @@
+"""On-disk analysis cache — keyed by a hash of the normalized response text."""
+
+from __future__ import annotations
+
+import hashlib
+import re
+import sqlite3
+import time
+import unicodedata
+from pathlib import Path
+
+from src.extraction.analyzer import ANALYZER_VERSION, ResponseAnalysis
+
+CACHE_PATH = Path(__file__).parent.parent.parent / "data" / "analysis_cache.db"
+
+_WS = re.compile(r"\s+")
+_CITATION_MARKER = re.compile(r"\[\d+(?:\s*,\s*\d+)*\]")
+
+
+def _normalize(text: str) -> str:
+    """NFC, casefolded, [n] citation markers dropped, whitespace collapsed."""
+    text = _CITATION_MARKER.sub(" ", unicodedata.normalize("NFC", text).casefold())
+    return _WS.sub(" ", text).strip()
+
+
+class AnalysisCache:
+    """Persistent LRU cache of ResponseAnalysis results.
+
+    Entries are keyed by (analyzer version, extraction model, extraction
+    config hash, normalized text hash, citation domain set), so a config
+    change (brands, chunking, ...) misses, and only responses that differ in whitespace,
+    casing or [n] citation markers share an analysis. Any other edit, however
+    small, can change which brand is named or recommended and is a miss.
+    """
+
+    def __init__(self, path: Path | None = None, max_entries: int = 50_000):
+        self.path = path or CACHE_PATH
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._init()
+
+    def _conn(self) -> sqlite3.Connection:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(self.path))
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def _init(self):
+        conn = self._conn()
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(analysis_cache)")}
+        if "simhash" in columns:
+            # Near-duplicate (SimHash) layout: its keys no longer match, start over
+            conn.execute("DROP TABLE analysis_cache")
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS analysis_cache (
+                cache_key TEXT PRIMARY KEY,
+                version TEXT NOT NULL,
+                model TEXT NOT NULL,
+                analysis_json TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_used REAL NOT NULL,
+                hit_count INTEGER DEFAULT 0
+            );
+            CREATE INDEX IF NOT EXISTS idx_cache_last_used ON analysis_cache(last_used);
+        """)
+        conn.commit()
+        conn.close()
+
+    @staticmethod
+    def _domains_key(citation_domains: list[str] | None) -> str:
+        return ",".join(sorted(set(citation_domains or [])))
+
+    @staticmethod
+    def key(response_text: str, citation_domains: list[str] | None, model: str, config_hash: str = "") -> str:
+        payload = "\0".join([
+            ANALYZER_VERSION, model, config_hash, _normalize(response_text), AnalysisCache._domains_key(citation_domains),
+        ])
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def get(
+        self, response_text: str, citation_domains: list[str] | None, model: str, config_hash: str = "",
+    ) -> ResponseAnalysis | None:
+        """Blocking (hashing + sqlite): call it via asyncio.to_thread from async code."""
+        conn = self._conn()
+        try:
+            cache_key = self.key(response_text, citation_domains, model, config_hash)
+            row = conn.execute(
+                "SELECT cache_key, analysis_json FROM analysis_cache WHERE cache_key = ?", (cache_key,),
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            conn.execute(
+                "UPDATE analysis_cache SET last_used = ?, hit_count = hit_count + 1 WHERE cache_key = ?",
+                (time.time(), row[0]),
+            )
+            conn.commit()
+            return ResponseAnalysis.model_validate_json(row[1])
+        finally:
+            conn.close()
+
+    def put(
+        self,
+        response_text: str,
+        citation_domains: list[str] | None,
+        model: str,
+        analysis: ResponseAnalysis,
+        config_hash: str = "",
+    ):
+        now = time.time()
+        conn = self._conn()
+        conn.execute(
+            """INSERT OR REPLACE INTO analysis_cache
+                (cache_key, version, model, analysis_json, created_at, last_used)
+                VALUES (?, ?, ?, ?, ?, ?)""",
+            (self.key(response_text, citation_domains, model, config_hash), ANALYZER_VERSION, model, analysis.model_dump_json(), now, now),
+        )
+        self._evict(conn)
+        conn.commit()
+        conn.close()
+
+    def _evict(self, conn: sqlite3.Connection):
+        """Drop least-recently-used entries once over capacity (10% headroom per sweep)."""
+        count = conn.execute("SELECT COUNT(*) FROM analysis_cache").fetchone()[0]
+        if count <= self.max_entries:
+            return
+        excess = count - int(self.max_entries * 0.9)
+        conn.execute(
+            """DELETE FROM analysis_cache WHERE cache_key IN (
+                   SELECT cache_key FROM analysis_cache ORDER BY last_used LIMIT ?
+               )""",
+            (excess,),
+        )
+
+    def stats(self) -> dict:
+        conn = self._conn()
+        entries = conn.execute("SELECT COUNT(*) FROM analysis_cache").fetchone()[0]
+        conn.close()
+        return {"entries": entries, "hits": self.hits, "misses": self.misses}
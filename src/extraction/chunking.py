@@ -0,0 +1,204 @@
+"""Chunked extraction — split long responses, analyze brand-bearing chunks, merge deterministically."""
+
+from __future__ import annotations
+
+import asyncio
+import re
+from dataclasses import dataclass
+
+from src.extraction.analyzer import BrandMention, ResponseAnalysis, Sentiment
+from src.extraction.batcher import ExtractionBatcher
+from src.extraction.brand_matcher import get_brand_matcher
+from src.extraction.client import ExtractionUsage
+from src.extraction.registry import get_registry
+
+# Paragraph breaks and markdown headings start a new segment
+_SEGMENT_BREAK = re.compile(r"\n\s*\n|\n(?=#{1,6}\s)")
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+# Most specific first when chunks disagree on the response type
+_TYPE_PRECEDENCE = ["list", "comparison", "direct_answer", "narrative", "refusal"]
+
+
+@dataclass
+class Chunk:
+    text: str
+    start: int  # offset of text[0] in the full response
+
+
+@dataclass
+class ChunkPolicy:
+    """Responses longer than `min_chars` are analyzed in chunks of at most ~`max_chars`."""
+    min_chars: int = 6000
+    max_chars: int = 2500
+
+    def applies(self, text: str) -> bool:
+        return len(text) > self.min_chars
+
+
+def _segments(text: str) -> list[tuple[int, int]]:
+    """(start, end) spans of paragraphs/sections, whitespace-only spans dropped."""
+    spans, pos = [], 0
+    for m in _SEGMENT_BREAK.finditer(text):
+        spans.append((pos, m.start()))
+        pos = m.end()
+    spans.append((pos, len(text)))
+    return [(s, e) for s, e in spans if text[s:e].strip()]
+
+
+def _split_long(text: str, start: int, end: int, max_chars: int) -> list[tuple[int, int]]:
+    """Split an oversized segment at sentence boundaries (hard cut as a last resort)."""
+    bounds = [m.end() for m in _SENTENCE_END.finditer(text, start, end)] + [end]
+    pieces, seg_start, prev = [], start, start
+    for b in bounds:
+        if b - seg_start > max_chars and prev > seg_start:
+            pieces.append((seg_start, prev))
+            seg_start = prev
+        prev = b
+    pieces.append((seg_start, end))
+
+    out = []
+    for s, e in pieces:
+        while e - s > max_chars:
+            out.append((s, s + max_chars))
+            s += max_chars
+        out.append((s, e))
+    return out
+
+
+def split_chunks(text: str, max_chars: int = 2500) -> list[Chunk]:
+    """Pack consecutive paragraphs into chunks of at most ~max_chars, keeping offsets."""
+    spans: list[tuple[int, int]] = []
+    for s, e in _segments(text):
+        spans.extend(_split_long(text, s, e, max_chars) if e - s > max_chars else [(s, e)])
+
+    chunks: list[Chunk] = []
+    cur_start = cur_end = None
+    for s, e in spans:
+        if cur_start is not None and e - cur_start > max_chars:
+            chunks.append(Chunk(text[cur_start:cur_end], cur_start))
+            cur_start = None
+        if cur_start is None:
+            cur_start = s
+        cur_end = e
+    if cur_start is not None:
+        chunks.append(Chunk(text[cur_start:cur_end], cur_start))
+    return chunks
+
+
+def _brand_key(brand: str) -> str:
+    return get_registry().canonical(brand) or " ".join(brand.lower().split())
+
+
+def _reconcile_sentiment(sentiments: list[Sentiment]) -> Sentiment:
+    """One polarity wins; conflicting polarities (or any 'mixed') become mixed; otherwise neutral."""
+    polar = {s for s in sentiments if s != Sentiment.neutral}
+    if not polar:
+        return Sentiment.neutral
+    if len(polar) == 1:
+        return polar.pop()
+    return Sentiment.mixed
+
+
+def _locate(chunk: Chunk, key: str, mention: BrandMention, located: dict[str, int]) -> tuple[int, int, int]:
+    """Sort key (global offset, unlocated flag, chunk-local position) for a brand in a chunk."""
+    if key in located:
+        return located[key], 0, mention.position
+    name = mention.brand.strip()
+    found = name and re.search(rf"(?<!\w){re.escape(name)}(?!\w)", chunk.text, re.IGNORECASE)
+    if found:
+        return chunk.start + found.start(), 0, mention.position
+    # Nowhere in the text: after everything located in this chunk, before the next chunk
+    return chunk.start + max(len(chunk.text) - 1, 0), 1, mention.position
+
+
+def merge_analyses(chunks: list[Chunk], analyses: list[ResponseAnalysis]) -> ResponseAnalysis:
+    """Merge per-chunk analyses into one, independent of completion order.
+
+    Each brand is placed at its first global offset: the local matcher's hit
+    in the chunk, else where the brand name as reported occurs in the chunk
+    text, else after the chunk's located brands in chunk-local position order.
+    Positions are re-ranked 1..n from that. Sentiment is reconciled per
+    brand, a brand is recommended if any chunk recommends it, and Coke is the
+    primary recommendation if the first recommended brand is a Coke brand.
+    """
+    matcher = get_brand_matcher()
+    registry = get_registry()
+    merged: dict[str, dict] = {}
+
+    for chunk, analysis in zip(chunks, analyses):
+        located = {m.canonical: chunk.start + m.start for m in matcher.first_mentions(chunk.text)}
+        for m in analysis.all_mentions:
+            key = _brand_key(m.brand)
+            offset = _locate(chunk, key, m, located)
+            entry = merged.get(key)
+            if entry is None:
+                merged[key] = entry = {"first": m, "offset": offset, "sentiments": [], "recommended": False}
+            elif offset < entry["offset"]:
+                entry["first"], entry["offset"] = m, offset
+            entry["sentiments"].append(m.sentiment)
+            entry["recommended"] = entry["recommended"] or m.is_recommended
+
+    ordered = sorted(merged.items(), key=lambda kv: (kv[1]["offset"], kv[0]))
+    mentions = [
+        BrandMention(
+            brand=entry["first"].brand,
+            position=i,
+            sentiment=_reconcile_sentiment(entry["sentiments"]),
+            is_recommended=entry["recommended"],
+            context=entry["first"].context,
+        )
+        for i, (_, entry) in enumerate(ordered, start=1)
+    ]
+
+    def union(lists: list[list[str]]) -> list[str]:
+        return list(dict.fromkeys(x for lst in lists for x in lst))
+
+    first_recommended = next((m for m in mentions if m.is_recommended), None)
+    coke_found = union([a.coke_brands_found for a in analyses])
+    types = {a.response_type for a in analyses}
+
+    return ResponseAnalysis(
+        coke_brands_found=coke_found,
+        competitor_brands_found=union([a.competitor_brands_found for a in analyses]),
+        all_mentions=mentions,
+        coke_domains_cited=union([a.coke_domains_cited for a in analyses]),
+        response_type=next(t for t in _TYPE_PRECEDENCE if t in types),
+        coke_is_primary_recommendation=bool(first_recommended) and (
+            registry.is_coke_brand(first_recommended.brand)
+            or _brand_key(first_recommended.brand) in coke_found
+        ),
+    )
+
+
+async def analyze_chunked(
+    batcher: ExtractionBatcher,
+    response_id: str,
+    response_text: str,
+    citation_domains: list[str] | None = None,
+    max_chars: int = 2500,
+) -> tuple[ResponseAnalysis, ExtractionUsage]:
+    """Analyze a long response chunk by chunk through an ExtractionBatcher.
+
+    Only chunks in which the local brand matcher finds a brand are sent (all
+    chunks if none are flagged). Tokens are summed across chunks; attempts,
+    validation failures and latency are the worst chunk's, since chunks run
+    concurrently and may share a batched call.
+    """
+    chunks = split_chunks(response_text, max_chars)
+    matcher = get_brand_matcher()
+    flagged = [c for c in chunks if matcher.contains_any(c.text)] or chunks
+
+    results = await asyncio.gather(*(
+        batcher.submit(f"{response_id}#{i}", c.text, citation_domains) for i, c in enumerate(flagged)
+    ))
+    usages = [u for _, u in results]
+    usage = ExtractionUsage(
+        model=usages[0].model,
+        attempts=max(u.attempts for u in usages),
+        validation_failures=max(u.validation_failures for u in usages),
+        input_tokens=sum(u.input_tokens for u in usages),
+        output_tokens=sum(u.output_tokens for u in usages),
+        latency_ms=max(u.latency_ms for u in usages),
+    )
+    return merge_analyses(flagged, [a for a, _ in results]), usage
@@ -0,0 +1,138 @@
+"""Shared extraction client — one pooled instructor client per event loop, with per-call usage tracking."""
+
+from __future__ import annotations
+
+import asyncio
+import time
+import weakref
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+
+import httpx
+import instructor
+from openai import AsyncOpenAI
+
+
+@dataclass
+class ExtractionUsage:
+    """What one extraction cost: every attempt instructor made, not just the one that validated."""
+    model: str = ""
+    attempts: int = 0
+    validation_failures: int = 0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    latency_ms: int = 0
+    batch_size: int = 1
+
+    @property
+    def retries(self) -> int:
+        return max(self.attempts - 1, 0)
+
+    def add(self, other: ExtractionUsage):
+        self.attempts += other.attempts
+        self.validation_failures += other.validation_failures
+        self.input_tokens += other.input_tokens
+        self.output_tokens += other.output_tokens
+        self.latency_ms += other.latency_ms
+
+    def share(self, fraction: float, batch_size: int) -> ExtractionUsage:
+        """This batched call's usage apportioned to one of its responses."""
+        return ExtractionUsage(
+            model=self.model,
+            attempts=self.attempts,
+            validation_failures=self.validation_failures,
+            input_tokens=round(self.input_tokens * fraction),
+            output_tokens=round(self.output_tokens * fraction),
+            latency_ms=self.latency_ms,
+            batch_size=batch_size,
+        )
+
+    def split(self, fractions: list[float], batch_size: int) -> list[ExtractionUsage]:
+        """Shares for several responses that add up to this usage: the last takes the
+        token rounding remainder, and attempts / validation failures go to the first
+        only, so summing rows doesn't count one call's retries once per response."""
+        shares = [self.share(f, batch_size) for f in fractions]
+        if shares:
+            shares[-1].input_tokens = self.input_tokens - sum(s.input_tokens for s in shares[:-1])
+            shares[-1].output_tokens = self.output_tokens - sum(s.output_tokens for s in shares[:-1])
+            for s in shares[1:]:
+                s.attempts = s.validation_failures = 0
+        return shares
+
+
+# Usage record of the extraction call running in the current task
+_current_usage: ContextVar[ExtractionUsage | None] = ContextVar("extraction_usage", default=None)
+
+
+def _on_completion(response):
+    usage = _current_usage.get()
+    if usage is None:
+        return
+    usage.attempts += 1
+    tokens = getattr(response, "usage", None)
+    if tokens is not None:
+        usage.input_tokens += getattr(tokens, "prompt_tokens", 0) or 0
+        usage.output_tokens += getattr(tokens, "completion_tokens", 0) or 0
+
+
+def _on_parse_error(error, **kwargs):
+    usage = _current_usage.get()
+    if usage is not None:
+        usage.validation_failures += 1
+
+
+@contextmanager
+def track_usage():
+    """Collect attempts, validation failures and tokens for extraction calls made inside the block.
+
+    Nested blocks share the outermost record, so a caller can account for
+    calls that end up raising.
+    """
+    outer = _current_usage.get()
+    if outer is not None:
+        yield outer
+        return
+    usage = ExtractionUsage()
+    token = _current_usage.set(usage)
+    start = time.monotonic()
+    try:
+        yield usage
+    finally:
+        usage.latency_ms = int((time.monotonic() - start) * 1000)
+        _current_usage.reset(token)
+
+
+# Event loop -> {max_connections: client}; entries go away with their loop
+_clients: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict[int, instructor.AsyncInstructor]] = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def _pooled_client(max_connections: int) -> instructor.AsyncInstructor:
+    http_client = httpx.AsyncClient(
+        limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+        timeout=httpx.Timeout(60.0, connect=10.0),
+    )
+    client = instructor.from_openai(AsyncOpenAI(http_client=http_client))
+    client.on("completion:response", _on_completion)
+    client.on("parse:error", _on_parse_error)
+    return client
+
+
+def get_extraction_client(max_connections: int = 10) -> instructor.AsyncInstructor:
+    """Process-wide instructor client with a keep-alive pool sized to the extraction concurrency.
+
+    httpx pools are bound to the loop that opened them, so there is one client
+    per running event loop; close_extraction_clients() shuts them down.
+    """
+    clients = _clients.setdefault(asyncio.get_running_loop(), {})
+    if max_connections not in clients:
+        clients[max_connections] = _pooled_client(max_connections)
+    return clients[max_connections]
+
+
+async def close_extraction_clients():
+    """Close the running loop's extraction clients (and their connection pools)."""
+    for client in _clients.pop(asyncio.get_running_loop(), {}).values():
+        await client.client.close()
@@ -0,0 +1,169 @@
+"""Local rule-based analyzer — brand matcher + structural and lexical heuristics, no network."""
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+
+from src.extraction.analyzer import BrandMention, ResponseAnalysis, Sentiment
+from src.extraction.brand_matcher import BrandMatch, get_brand_matcher
+
+REFUSAL_CUES = (
+    "i can't help", "i cannot help", "i can't assist", "i cannot assist", "i'm unable to", "i am unable to",
+    "i can't provide", "i cannot provide", "i'm not able to", "i won't be able to",
+)
+RECOMMENDATION_CUES = (
+    "recommend", "best", "top pick", "top choice", "go for", "go with", "opt for", "try", "ideal",
+    "perfect", "first choice", "favourite", "favorite", "must-try", "winner", "suggest", "pick",
+    "stands out", "can't go wrong", "great choice", "good choice", "number one", "#1",
+)
+POSITIVE_WORDS = frozenset("""
+    refreshing iconic popular beloved loved great excellent good best delicious tasty crisp bold strong
+    classic favourite favorite authentic natural healthy healthier perfect ideal smooth satisfying
+    reliable trusted premium unique affordable fresh fizzy zesty tangy rich enjoyable leading
+    recommended quality flavourful flavorful nostalgic cult widely
+""".split())
+NEGATIVE_WORDS = frozenset("""
+    unhealthy sugary bad worst poor bland flat artificial expensive overpriced harmful controversy
+    controversial decline declining weak avoid excessive cloying boring inferior criticized criticised
+    concerns concern risk risky problem problems negative disappointing lacks lacking pesticide
+    pesticides boycott obesity diabetes
+""".split())
+NEGATIONS = frozenset("not no never n't isn't aren't wasn't don't doesn't hardly without".split())
+
+_SENTENCE = re.compile(r"[^.!?\n]+(?:[.!?]+|$)", re.M)
+_WORD = re.compile(r"[a-z']+")
+_LIST_ITEM = re.compile(r"^\s*(?:\d+[.)]|[-*•])\s+", re.M)
+_HEADING = re.compile(r"^\s*#{1,6}\s", re.M)
+_TABLE_ROW = re.compile(r"^\s*\|.*\|\s*$", re.M)
+_CUE = re.compile(r"(?<!\w)(?:" + "|".join(map(re.escape, RECOMMENDATION_CUES)) + r")(?!\w)")
+_COMPARISON = re.compile(r"\b(?:vs\.?|versus|compared (?:to|with)|better than|whereas|difference between)\b", re.I)
+
+
+@dataclass
+class LocalAnalysis:
+    analysis: ResponseAnalysis
+    confidence: float  # 0..1; below the escalation threshold, hybrid mode asks the LLM
+
+
+def detect_response_type(text: str, brand_count: int | None = None) -> str:
+    """list / comparison / direct_answer / narrative / refusal from markdown structure and cue phrases."""
+    head = text[:300].lower()
+    if any(cue in head for cue in REFUSAL_CUES):
+        return "refusal"
+    list_items = len(_LIST_ITEM.findall(text))
+    if _TABLE_ROW.search(text) or (len(_COMPARISON.findall(text)) >= 2 and list_items < 5):
+        return "comparison"
+    if list_items >= 3:
+        return "list"
+    if len(text) < 800 and (brand_count is None or brand_count <= 2) and not _HEADING.search(text):
+        return "direct_answer"
+    return "narrative"
+
+
+def _sentences(text: str) -> list[tuple[int, int]]:
+    return [(m.start(), m.end()) for m in _SENTENCE.finditer(text) if m.group().strip()]
+
+
+def _sentiment_score(sentence: str) -> tuple[int, int]:
+    """(positive, negative) hits, with a negation in the preceding three words flipping polarity."""
+    words = _WORD.findall(sentence.lower())
+    pos = neg = 0
+    for i, w in enumerate(words):
+        polarity = 1 if w in POSITIVE_WORDS else -1 if w in NEGATIVE_WORDS else 0
+        if not polarity:
+            continue
+        if any(p in NEGATIONS or p.endswith("n't") for p in words[max(0, i - 3):i]):
+            polarity = -polarity
+        if polarity > 0:
+            pos += 1
+        else:
+            neg += 1
+    return pos, neg
+
+
+def analyze_local(response_text: str, coke_domains: list[str] | None = None) -> LocalAnalysis:
+    """Rule-based ResponseAnalysis with a confidence score."""
+    matches = get_brand_matcher().scan(response_text)
+    first: dict[str, BrandMatch] = {}
+    for m in matches:
+        first.setdefault(m.canonical, m)
+    response_type = detect_response_type(response_text, len(first))
+
+    sentences = _sentences(response_text)
+    per_brand: dict[str, dict] = {c: {"pos": 0, "neg": 0, "rec": False, "context": None} for c in first}
+    ambiguous = 0
+
+    si = 0
+    by_sentence: dict[int, list[BrandMatch]] = {}
+    for m in matches:
+        while si < len(sentences) - 1 and m.start >= sentences[si][1]:
+            si += 1
+        by_sentence.setdefault(si, []).append(m)
+
+    for idx, brand_hits in by_sentence.items():
+        start, end = sentences[idx]
+        sentence = response_text[start:end]
+        pos, neg = _sentiment_score(sentence)
+        canon = list(dict.fromkeys(m.canonical for m in brand_hits))
+        if len(canon) > 1 and (pos or neg):
+            ambiguous += 1
+        for c in canon:
+            entry = per_brand[c]
+            entry["pos"] += pos
+            entry["neg"] += neg
+            entry["context"] = entry["context"] or sentence.strip()[:200]
+        # A cue recommends the first brand after it, else the nearest one before it
+        for cue in _CUE.finditer(sentence.lower()):
+            after = [m for m in brand_hits if m.start - start >= cue.start()]
+            target = after[0] if after else brand_hits[-1]
+            per_brand[target.canonical]["rec"] = True
+
+    # In a ranked list, the first-ranked brand counts as recommended
+    if response_type == "list" and first and not any(e["rec"] for e in per_brand.values()):
+        per_brand[next(iter(first))]["rec"] = True
+
+    mentions = []
+    for position, (canonical, m) in enumerate(first.items(), start=1):
+        e = per_brand[canonical]
+        if e["pos"] and e["neg"]:
+            sentiment = Sentiment.mixed
+        elif e["pos"]:
+            sentiment = Sentiment.positive
+        elif e["neg"]:
+            sentiment = Sentiment.negative
+        else:
+            sentiment = Sentiment.neutral
+        mentions.append(BrandMention(
+            brand=response_text[m.start:m.end],
+            position=position,
+            sentiment=sentiment,
+            is_recommended=e["rec"],
+            context=e["context"] or "",
+        ))
+
+    coke = [c for c, m in first.items() if m.is_coke]
+    first_rec = next((c for c in first if per_brand[c]["rec"]), None)
+    primary = first[first_rec].is_coke if first_rec else (
+        response_type == "direct_answer" and bool(first) and next(iter(first.values())).is_coke
+    )
+
+    analysis = ResponseAnalysis(
+        coke_brands_found=coke,
+        competitor_brands_found=[c for c, m in first.items() if not m.is_coke],
+        all_mentions=mentions,
+        coke_domains_cited=coke_domains or [],
+        response_type=response_type,
+        coke_is_primary_recommendation=primary,
+    )
+
+    # Confidence drops when sentiment or recommendations can't be pinned on one brand
+    n = max(len(first), 1)
+    mixed = sum(1 for m in mentions if m.sentiment == Sentiment.mixed)
+    recommended = sum(1 for m in mentions if m.is_recommended)
+    confidence = 1.0
+    confidence -= 0.4 * min(ambiguous / n, 1.0)
+    confidence -= 0.2 * (mixed / n)
+    confidence -= 0.2 if recommended > 2 else 0.0
+    confidence -= 0.1 if response_type in ("narrative", "comparison") and len(first) > 3 else 0.0
+    return LocalAnalysis(analysis, round(max(confidence, 0.0), 2))
@@ -2,13 +2,52 @@
 
 from __future__ import annotations
 
+import ipaddress
+import re
 from dataclasses import dataclass
-from urllib.parse import urlparse
+from functools import lru_cache
+from urllib.parse import urlsplit, urlunsplit
 
+from src.extraction.registry import get_registry
 from src.providers.base import ProviderResponse, RawCitation
 
-
-@dataclass
+# Query parameters that only identify the click, never the page
+_TRACKING_PARAMS = frozenset({
+    "fbclid", "gclid", "dclid", "gbraid", "wbraid", "msclkid", "yclid", "twclid", "igshid", "srsltid",
+    "mc_cid", "mc_eid", "_ga", "_gl", "_hsenc", "_hsmi", "mkt_tok", "ref_src", "ref_url", "spm", "si",
+})
+_TRACKING_PREFIXES = ("utm_", "pk_", "hsa_", "oly_")
+
+# Offline public-suffix table: multi-label suffixes under which registrations
+# happen one level down (example.co.uk). Any other host registers directly
+# under its last label (example.com, example.in).
+_PUBLIC_SUFFIXES = frozenset("""
+    co.uk org.uk ac.uk gov.uk ltd.uk plc.uk me.uk net.uk nhs.uk
+    co.in net.in org.in firm.in gen.in ind.in ac.in edu.in res.in gov.in nic.in
+    com.au net.au org.au edu.au gov.au asn.au id.au
+    co.nz org.nz net.nz govt.nz ac.nz
+    co.za org.za gov.za ac.za
+    co.jp ne.jp or.jp ac.jp go.jp
+    co.kr or.kr go.kr ac.kr
+    com.br net.br org.br gov.br
+    com.mx org.mx gob.mx
+    com.ar com.co com.pe com.tr com.eg com.sa com.pk com.bd com.np com.lk com.my com.ph com.vn com.ng
+    com.sg edu.sg gov.sg com.hk org.hk com.tw org.tw com.cn net.cn org.cn gov.cn
+    co.id or.id ac.id go.id co.th ac.th in.th co.il org.il ac.il co.ke or.ke
+    ac.ae co.ae gov.ae org.ae
+    github.io gitlab.io blogspot.com wordpress.com medium.com substack.com netlify.app vercel.app
+    herokuapp.com pages.dev web.app firebaseapp.com azurewebsites.net cloudfront.net s3.amazonaws.com
+""".split())
+
+
+# Perplexity `[n]` reference markers, and the sentence breaks that precede them. A break
+# swallows markers right after the terminator, so "Claim.[1] Next" cites "Claim."
+_REF_MARKER = re.compile(r"\[(\d{1,3})\]")
+_SENTENCE_BREAK = re.compile(r"[.!?](?:\s*\[\d{1,3}\])*\s+|\n+")
+_MAX_CITED_CHARS = 500
+
+
+@dataclass(slots=True)
 class NormalizedCitation:
     """Unified citation across all providers."""
     url: str
@@ -20,116 +59,141 @@ class NormalizedCitation:
 
     @property
     def is_coke_domain(self) -> bool:
-        """Check if the citation is from a Coca-Cola owned domain."""
-        coke_domains = {
-            "coca-cola.com", "coca-colaindia.com", "coca-colacompany.com",
-            "coke.com", "thumsup.com", "sprite.com", "fanta.com",
-            "maaza.com", "limca.com", "minutemaid.in",
-        }
-        return any(d in self.domain for d in coke_domains)
+        """Check if the citation is from a Coca-Cola owned domain (or a subdomain of one)."""
+        return get_registry().is_coke_domain(self.domain)
 
 
-def normalize_citations(response: ProviderResponse) -> list[NormalizedCitation]:
-    """Normalize provider-specific citations to unified format."""
-    normalizer = _NORMALIZERS.get(response.provider, _normalize_generic)
-    return normalizer(response)
+@lru_cache(maxsize=65536)
+def registrable_domain(host: str) -> str:
+    """Registrable domain of a host: m.coca-cola.com -> coca-cola.com, news.bbc.co.uk -> bbc.co.uk."""
+    host = host.strip().lower().rstrip(".")
+    if not host or "." not in host:
+        return host
+    try:
+        ipaddress.ip_address(host.strip("[]"))
+        return host
+    except ValueError:
+        pass
+    labels = host.split(".")
+    # The longest matching public suffix decides how many labels to keep
+    for i in range(1, len(labels)):
+        if ".".join(labels[i:]) in _PUBLIC_SUFFIXES:
+            return ".".join(labels[i - 1:])
+    return ".".join(labels[-2:])
+
+
+@lru_cache(maxsize=65536)
+def canonicalize_url(url: str) -> tuple[str, str]:
+    """(canonical URL, registrable domain).
+
+    Scheme and host are lowercased, `www.`, default ports, fragments and
+    tracking parameters (utm_*, gclid, fbclid, ...) are dropped, as is a
+    trailing slash. Unparseable input is returned as-is for both parts.
+    """
+    url = url.strip()
+    try:
+        parts = urlsplit(url if "://" in url else f"https://{url}")
+        host = (parts.hostname or "").rstrip(".")
+        port = parts.port
+    except ValueError:
+        return url, url
+    if not host:
+        return url, url
+    if host.startswith("www."):
+        host = host[4:]
+    scheme = parts.scheme.lower()
+    netloc = host if port is None or (scheme, port) in (("http", 80), ("https", 443)) else f"{host}:{port}"
+
+    query = "&".join(
+        pair for pair in parts.query.split("&")
+        if pair and not _is_tracking(pair.split("=", 1)[0].lower())
+    )
+    path = parts.path.rstrip("/") if parts.path not in ("", "/") else ""
+    return urlunsplit((scheme, netloc, path, query, "")), registrable_domain(host)
+
+
+def _is_tracking(param: str) -> bool:
+    return param in _TRACKING_PARAMS or param.startswith(_TRACKING_PREFIXES)
 
 
 def _extract_domain(url: str) -> str:
-    """Extract clean domain from URL."""
-    try:
-        parsed = urlparse(url)
-        domain = parsed.netloc or parsed.path
-        # Strip www. prefix
-        if domain.startswith("www."):
-            domain = domain[4:]
-        return domain
-    except Exception:
-        return url
-
-
-def _normalize_openai(response: ProviderResponse) -> list[NormalizedCitation]:
-    """OpenAI: url_citation annotations with start/end indices."""
-    results = []
-    seen_urls = set()
-
-    for c in response.raw_citations:
-        if c.url in seen_urls:
+    """Registrable domain of a URL (or of a bare host name)."""
+    return canonicalize_url(url)[1]
+
+
+def _gemini_domain(c: RawCitation, url: str, domain: str) -> str:
+    # Gemini URLs go through the vertexaisearch proxy; the title carries the source host
+    if "vertexaisearch" in url and c.title:
+        return _extract_domain(c.title) if "." in c.title and " " not in c.title.strip() else c.title
+    return domain
+
+
+def align_reference_markers(text: str) -> dict[int, tuple[int, str]]:
+    """First `[n]` marker per reference number -> (char offset, cited sentence).
+
+    One pass over the markers and sentence breaks together (both in text
+    order), so the cost is linear in the text length. The cited sentence runs
+    from the start of the sentence holding the marker up to the marker, with
+    other markers removed.
+    """
+    aligned: dict[int, tuple[int, str]] = {}
+    breaks = _SENTENCE_BREAK.finditer(text)
+    next_break = next(breaks, None)
+    sentence_start = 0
+    for m in _REF_MARKER.finditer(text):
+        while next_break is not None and next_break.end() <= m.start():
+            sentence_start = next_break.end()
+            next_break = next(breaks, None)
+        n = int(m.group(1))
+        if n in aligned:
             continue
-        seen_urls.add(c.url)
+        cited = _REF_MARKER.sub("", text[sentence_start:m.start()]).strip().lstrip("-*•#> ").strip()
+        aligned[n] = (m.start(), cited[:_MAX_CITED_CHARS] or None)
+    return aligned
 
-        results.append(NormalizedCitation(
-            url=c.url,
-            domain=_extract_domain(c.url),
-            title=c.title,
-            cited_text=c.text,
-            char_offset=c.start_index,
-            confidence=1.0,  # OpenAI doesn't provide confidence scores
-        ))
-    return results
-
-
-def _normalize_gemini(response: ProviderResponse) -> list[NormalizedCitation]:
-    """Gemini: groundingChunks with confidence scores from groundingSupports."""
-    results = []
-    seen_urls = set()
-
-    for c in response.raw_citations:
-        # Gemini URLs go through vertexaisearch proxy — extract the title as domain hint
-        url = c.url
-        if url in seen_urls:
-            continue
-        seen_urls.add(url)
-
-        results.append(NormalizedCitation(
-            url=url,
-            domain=_extract_domain(url) if "vertexaisearch" not in url else (c.title or _extract_domain(url)),
-            title=c.title,
-            cited_text=c.text,
-            char_offset=c.start_index,
-            confidence=c.confidence if c.confidence != 1.0 else 0.9,  # Gemini provides real scores
-        ))
-    return results
 
+# Per provider: (use cited text/offsets from the citation, confidence for a citation)
+_PROVIDER_FIELDS = {
+    "openai": (True, lambda c: 1.0),  # OpenAI doesn't provide confidence scores
+    "gemini": (True, lambda c: c.confidence if c.confidence != 1.0 else 0.9),  # Gemini provides real scores
+    "perplexity": (False, lambda c: 1.0),  # Perplexity: flat URL array; offsets come from [n] markers
+}
 
-def _normalize_perplexity(response: ProviderResponse) -> list[NormalizedCitation]:
-    """Perplexity: flat URL array with [n] bracket refs in text."""
-    results = []
-    seen_urls = set()
 
-    for c in response.raw_citations:
-        if c.url in seen_urls:
+def normalize_citations(response: ProviderResponse) -> list[NormalizedCitation]:
+    """Normalize provider-specific citations to the unified format in one pass.
+
+    URLs are canonicalized (see canonicalize_url) and deduplicated on the
+    canonical form, so tracking-parameter and `www.` variants collapse.
+    Perplexity citations get their offset and cited sentence from the `[n]`
+    markers in the response text (citation n is the n-th URL).
+    """
+    with_text, confidence = _PROVIDER_FIELDS.get(response.provider, (True, lambda c: c.confidence))
+    markers = align_reference_markers(response.raw_text) if response.provider == "perplexity" else {}
+    results: dict[str, NormalizedCitation] = {}
+
+    for n, c in enumerate(response.raw_citations, start=1):
+        url, domain = canonicalize_url(c.url)
+        if with_text:
+            char_offset, cited_text = c.start_index, c.cited_text(response.raw_text)
+        else:
+            char_offset, cited_text = markers.get(n, (None, None))
+
+        seen = results.get(url)
+        if seen is not None:
+            # Duplicate URL under another reference number: keep the earliest citing position
+            if char_offset is not None and (seen.char_offset is None or char_offset < seen.char_offset):
+                seen.char_offset, seen.cited_text = char_offset, cited_text
             continue
-        seen_urls.add(c.url)
+        if response.provider == "gemini":
+            domain = _gemini_domain(c, url, domain)
 
-        results.append(NormalizedCitation(
-            url=c.url,
-            domain=_extract_domain(c.url),
-            title=c.title,
-            cited_text=None,  # Perplexity doesn't provide cited text snippets
-            char_offset=None,
-            confidence=1.0,  # Perplexity doesn't provide confidence scores
-        ))
-    return results
-
-
-def _normalize_generic(response: ProviderResponse) -> list[NormalizedCitation]:
-    """Fallback normalizer for unknown providers."""
-    results = []
-    for c in response.raw_citations:
-        results.append(NormalizedCitation(
-            url=c.url,
-            domain=_extract_domain(c.url),
+        results[url] = NormalizedCitation(
+            url=url,
+            domain=domain,
             title=c.title,
-            cited_text=c.text,
-            char_offset=c.start_index,
-            confidence=c.confidence,
-        ))
-    return results
-
-
-_NORMALIZERS = {
-    "openai": _normalize_openai,
-    "gemini": _normalize_gemini,
-    "perplexity": _normalize_perplexity,
-}
+            cited_text=cited_text,
+            char_offset=char_offset,
+            confidence=confidence(c),
+        )
+    return list(results.values())
@@ -0,0 +1,205 @@
+"""Extraction pipeline — prescan, analysis cache, chunking and batched LLM extraction in one place."""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+from dataclasses import dataclass
+from functools import cached_property
+
+from src.extraction.analyzer import ResponseAnalysis, empty_analysis
+from src.extraction.batcher import ExtractionBatcher
+from src.extraction.brand_matcher import get_brand_matcher
+from src.extraction.cache import AnalysisCache
+from src.extraction.chunking import ChunkPolicy, analyze_chunked
+from src.extraction.client import ExtractionUsage
+from src.extraction.local_analyzer import analyze_local
+from src.extraction.registry import get_registry
+
+ANALYZERS = ("llm", "local", "hybrid")
+
+
+@dataclass
+class ExtractionResult:
+    analysis: ResponseAnalysis
+    cached: bool = False
+    usage: ExtractionUsage | None = None  # None when no LLM call was made
+    config_hash: str | None = None  # settings that produced it (ExtractionPipeline.config_hash_for)
+
+
+class ExtractionPipeline:
+    """How a stored response becomes a ResponseAnalysis.
+
+    With `prescan`, responses with no known brand get an empty analysis
+    without an LLM call. Otherwise the analysis cache is consulted, then long
+    responses go through chunked extraction and the rest through the batcher.
+
+    `analyzer` picks who does the extraction: "llm" (default), "local" (the
+    rule-based analyzer, no network) or "hybrid" (local first, escalating to
+    the LLM when its confidence is below `min_confidence`).
+    """
+
+    def __init__(
+        self,
+        batcher: ExtractionBatcher,
+        cache: AnalysisCache | None = None,
+        chunk_policy: ChunkPolicy | None = None,
+        prescan: bool = True,
+        analyzer: str = "llm",
+        min_confidence: float = 0.7,
+    ):
+        if analyzer not in ANALYZERS:
+            raise ValueError(f"Unknown analyzer {analyzer!r} (expected one of {', '.join(ANALYZERS)})")
+        self.batcher = batcher
+        self.cache = cache
+        self.chunk_policy = chunk_policy
+        self.prescan = prescan
+        self.analyzer = analyzer
+        self.min_confidence = min_confidence
+        self.local_results = 0
+        self.escalations = 0
+
+    @classmethod
+    def from_config(
+        cls,
+        cfg: dict,
+        prescan: bool = True,
+        use_cache: bool = True,
+        batch: bool = True,
+        chunk: bool = True,
+        analyzer: str | None = None,
+    ) -> ExtractionPipeline:
+        """Build from the `extraction` section of config.yaml; flags switch features off.
+
+        `analyzer` overrides extraction.analyzer from the config.
+        """
+        extraction_cfg = cfg.get("extraction", {})
+        batch_cfg = extraction_cfg.get("batch", {})
+        cache_cfg = extraction_cfg.get("cache", {})
+        chunk_cfg = extraction_cfg.get("chunking", {})
+
+        batcher = ExtractionBatcher(
+            model=extraction_cfg.get("model", "gpt-4o-mini"),
+            max_batch_size=batch_cfg.get("max_size", 8) if batch and batch_cfg.get("enabled", True) else 1,
+            max_batch_tokens=batch_cfg.get("max_tokens", 6000),
+            max_delay=batch_cfg.get("max_delay_seconds", 0.5),
+            concurrency=batch_cfg.get("concurrency", 4),
+        )
+        cache = AnalysisCache(
+            max_entries=cache_cfg.get("max_entries", 50_000),
+        ) if use_cache and cache_cfg.get("enabled", True) else None
+        chunk_policy = ChunkPolicy(
+            min_chars=chunk_cfg.get("min_chars", 6000),
+            max_chars=chunk_cfg.get("max_chunk_chars", 2500),
+        ) if chunk and chunk_cfg.get("enabled", True) else None
+        return cls(
+            batcher, cache, chunk_policy, prescan,
+            analyzer=analyzer or extraction_cfg.get("analyzer", "llm"),
+            min_confidence=extraction_cfg.get("hybrid_min_confidence", 0.7),
+        )
+
+    @property
+    def model(self) -> str:
+        return self.batcher.model
+
+    def _fingerprint(self, chunk_policy: ChunkPolicy | None) -> str:
+        registry = get_registry()
+        payload = {
+            "model": self.model,
+            "chunking": [chunk_policy.min_chars, chunk_policy.max_chars] if chunk_policy else None,
+            "brands": sorted(registry.alias_rows()),
+            "coke_domains": sorted(registry.coke_domains),
+        }
+        if self.analyzer != "llm":
+            # Only non-default modes enter the hash, so existing LLM analyses stay current
+            payload["analyzer"] = [self.analyzer, self.min_confidence if self.analyzer == "hybrid" else None]
+            payload["ambiguous_aliases"] = sorted(registry.ambiguous_aliases)
+        return hashlib.sha256(json.dumps(payload).encode()).hexdigest()[:16]
+
+    @cached_property
+    def config_hash(self) -> str:
+        """Fingerprint of the extraction settings that change stored analyses (besides
+        ANALYZER_VERSION), for responses the chunk policy does not apply to."""
+        return self._fingerprint(None)
+
+    @cached_property
+    def chunked_config_hash(self) -> str | None:
+        """Fingerprint for responses long enough to be chunked (None without chunking)."""
+        return self._fingerprint(self.chunk_policy) if self.chunk_policy else None
+
+    def config_hash_for(self, response_text: str) -> str:
+        """Fingerprint of the settings this response is analyzed with — the chunk
+        policy only counts where it applies, so `--no-chunk` leaves short responses current."""
+        if self.chunk_policy and self.chunk_policy.applies(response_text):
+            return self.chunked_config_hash
+        return self.config_hash
+
+    @property
+    def stale_filter(self) -> tuple[str, tuple[int, str] | None]:
+        """(config_hash, (min_chars, chunked hash) or None) for the storage stale-analysis queries."""
+        if self.chunk_policy is None:
+            return self.config_hash, None
+        return self.config_hash, (self.chunk_policy.min_chars, self.chunked_config_hash)
+
+    async def analyze(
+        self,
+        response_id: str,
+        response_text: str,
+        citation_domains: list[str],
+        coke_domains: list[str] | None = None,
+        has_brands: bool | None = None,
+    ) -> ExtractionResult:
+        """`has_brands` is the prescan's answer when the caller already has it
+        (e.g. from scanning a streamed answer as it arrived)."""
+        config_hash = self.config_hash_for(response_text)
+        if has_brands is None and self.prescan:
+            has_brands = get_brand_matcher().contains_any(response_text)
+        if self.prescan and not has_brands:
+            # No known beverage brand in the text: skip the paid extraction call
+            return ExtractionResult(empty_analysis(response_text, coke_domains), config_hash=config_hash)
+
+        if self.analyzer != "llm":
+            local = analyze_local(response_text, coke_domains)
+            if self.analyzer == "local" or local.confidence >= self.min_confidence:
+                self.local_results += 1
+                return ExtractionResult(local.analysis, config_hash=config_hash)
+            self.escalations += 1
+
+        if self.cache:
+            hit = await asyncio.to_thread(self.cache.get, response_text, citation_domains, self.model, config_hash)
+            if hit is not None:
+                return ExtractionResult(hit, cached=True, config_hash=config_hash)
+
+        if self.chunk_policy and self.chunk_policy.applies(response_text):
+            analysis, usage = await analyze_chunked(
+                self.batcher, response_id, response_text, citation_domains, self.chunk_policy.max_chars,
+            )
+        else:
+            analysis, usage = await self.batcher.submit(response_id, response_text, citation_domains)
+        if self.cache:
+            await asyncio.to_thread(self.cache.put, response_text, citation_domains, self.model, analysis, config_hash)
+        return ExtractionResult(analysis, usage=usage, config_hash=config_hash)
+
+    async def close(self):
+        await self.batcher.close()
+
+    def summary(self) -> list[str]:
+        """Human-readable cache/extraction counters for end-of-run output."""
+        lines = []
+        cache, batcher = self.cache, self.batcher
+        if self.analyzer != "llm":
+            lines.append(
+                f"Local analyzer: {self.local_results} analyses"
+                + (f", {self.escalations} escalated to the LLM" if self.analyzer == "hybrid" else "")
+            )
+        if cache and (cache.hits or cache.misses):
+            lines.append(f"Analysis cache: {cache.hits} hits, {cache.misses} misses")
+        if batcher.calls:
+            u = batcher.usage
+            lines.append(
+                f"Extraction: {batcher.calls} calls ({batcher.batched_calls} batched, {batcher.fallbacks} single-call fallbacks), "
+                f"{u.attempts} attempts ({u.validation_failures} validation failures), "
+                f"{u.input_tokens:,} in / {u.output_tokens:,} out tokens"
+            )
+        return lines
@@ -0,0 +1,108 @@
+"""Redirect resolver — maps proxied citation URLs (Gemini vertexaisearch) to their real source."""
+
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass
+from urllib.parse import urljoin, urlsplit
+
+import httpx
+
+from src.extraction.normalizer import canonicalize_url
+from src.storage.db import apply_redirects, get_redirects, get_unresolved_proxy_urls, store_redirects
+
+PROXY_HOST = "vertexaisearch.cloud.google.com"
+
+
+def is_proxy_url(url: str) -> bool:
+    try:
+        return urlsplit(url).hostname == PROXY_HOST
+    except ValueError:
+        return False
+
+
+@dataclass
+class RedirectStats:
+    known: int = 0      # answered from the redirects table
+    resolved: int = 0   # new redirects found
+    not_redirects: int = 0
+    failed: int = 0     # timeouts / 4xx / 5xx, retried next time
+    updated: int = 0    # citations re-pointed at the real domain
+
+
+class RedirectResolver:
+    """Resolve proxy URLs with HEAD requests (redirects not followed), at most once each.
+
+    Only definitive answers are persisted in the `redirects` table — a
+    redirect, or a 2xx/3xx that isn't one — so a proxy URL seen in an earlier
+    run is answered without a request. Timeouts, 4xx (429, 408, ...) and 5xx
+    responses are not stored and get retried next time; a server that refuses
+    HEAD (405) is asked again with GET. Pass `transport` to point the resolver
+    at a stand-in server (e.g. httpx.MockTransport).
+    """
+
+    def __init__(self, concurrency: int = 8, timeout: float = 5.0, transport: httpx.AsyncBaseTransport | None = None):
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.transport = transport
+        self.stats = RedirectStats()
+
+    @classmethod
+    def from_config(cls, cfg: dict) -> RedirectResolver:
+        redirect_cfg = cfg.get("citations", {}).get("redirects", {})
+        return cls(
+            concurrency=redirect_cfg.get("concurrency", 8),
+            timeout=redirect_cfg.get("timeout_seconds", 5.0),
+        )
+
+    async def _head(
+        self, client: httpx.AsyncClient, semaphore: asyncio.Semaphore, url: str,
+    ) -> tuple[str, str | None, str | None, int] | None:
+        async with semaphore:
+            try:
+                resp = await client.head(url)
+                if resp.status_code == 405:
+                    # Body is never read: only the status line and headers matter
+                    async with client.stream("GET", url) as resp:
+                        pass
+            except httpx.HTTPError:
+                self.stats.failed += 1
+                return None
+        location = resp.headers.get("location")
+        if resp.is_redirect and location:
+            target, domain = canonicalize_url(urljoin(url, location))
+            self.stats.resolved += 1
+            return url, target, domain, resp.status_code
+        if not 200 <= resp.status_code < 400:
+            self.stats.failed += 1
+            return None
+        self.stats.not_redirects += 1
+        return url, None, None, resp.status_code
+
+    async def resolve(self, urls: list[str]) -> dict[str, str | None]:
+        """proxy URL -> target URL (None if it doesn't redirect or couldn't be resolved)."""
+        urls = list(dict.fromkeys(urls))
+        known = get_redirects(urls)
+        self.stats.known += len(known)
+        pending = [u for u in urls if u not in known]
+        if not pending:
+            return known
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+        async with httpx.AsyncClient(
+            transport=self.transport, timeout=self.timeout, follow_redirects=False,
+        ) as client:
+            results = await asyncio.gather(*(self._head(client, semaphore, u) for u in pending))
+        rows = [r for r in results if r is not None]
+        if rows:
+            store_redirects(rows)
+        return {**known, **{url: target for url, target, _, _ in rows}}
+
+
+async def resolve_citation_redirects(resolver: RedirectResolver, run_id: str | None = None) -> RedirectStats:
+    """Resolve every unresolved proxy citation (of one run, or all) and re-point the citations."""
+    urls = get_unresolved_proxy_urls(f"%{PROXY_HOST}%", run_id)
+    if urls:
+        await resolver.resolve(urls)
+    resolver.stats.updated += apply_redirects(run_id)
+    return resolver.stats
@@ -0,0 +1,134 @@
+"""Brand & domain registry — compiled once from brands.yaml into O(1) lookups."""
+
+from __future__ import annotations
+
+import re
+from functools import cached_property, lru_cache
+from pathlib import Path
+
+import yaml
+
+REGISTRY_PATH = Path(__file__).parent / "brands.yaml"
+
+_WS = re.compile(r"\s+")
+_TERMINAL = ""  # trie key marking the end of a registered domain
+
+
+def _norm_brand(name: str) -> str:
+    return _WS.sub(" ", name.strip().lower())
+
+
+def _norm_domain(domain: str) -> str:
+    domain = domain.strip().lower().rstrip(".")
+    domain = domain.split(":", 1)[0]
+    return domain[4:] if domain.startswith("www.") else domain
+
+
+class BrandRegistry:
+    """Coke / competitor brands and Coke-owned domains.
+
+    Brand classification is a single dict lookup on the normalized name (every
+    alias, canonical key and "key with spaces" form is indexed). Domain
+    classification walks a trie of reversed labels, so a domain matches if it
+    is a registered domain or any subdomain of one — in O(labels), with no
+    substring false positives like "notcoke.com".
+    """
+
+    def __init__(
+        self,
+        coke_brands: dict[str, list[str]],
+        competitors: dict[str, list[str]],
+        coke_domains: list[str],
+        ambiguous_aliases: list[str] | None = None,
+        display_names: dict[str, str] | None = None,
+    ):
+        self.coke_brands = coke_brands
+        self.competitors = competitors
+        self.coke_domains = [_norm_domain(d) for d in coke_domains]
+        self.ambiguous_aliases = frozenset(_norm_brand(a) for a in ambiguous_aliases or [])
+        self.display_names = display_names or {}
+
+        self._aliases: dict[str, tuple[str, bool]] = {}
+        # Competitors first so a Coke alias wins if a name is listed under both
+        for is_coke, brands in ((False, competitors), (True, coke_brands)):
+            for canonical, aliases in brands.items():
+                for alias in [canonical, canonical.replace("_", " "), *aliases]:
+                    self._aliases[_norm_brand(alias)] = (canonical, is_coke)
+
+        self._domain_trie: dict = {}
+        for domain in self.coke_domains:
+            node = self._domain_trie
+            for label in reversed(domain.split(".")):
+                node = node.setdefault(label, {})
+            node[_TERMINAL] = True
+
+    @classmethod
+    def from_file(cls, path: Path = REGISTRY_PATH) -> BrandRegistry:
+        with open(path) as f:
+            data = yaml.safe_load(f) or {}
+        return cls(
+            coke_brands={str(k): list(v) for k, v in (data.get("coke_brands") or {}).items()},
+            competitors={str(k): list(v) for k, v in (data.get("competitors") or {}).items()},
+            coke_domains=list(data.get("coke_domains") or []),
+            ambiguous_aliases=list(data.get("ambiguous_aliases") or []),
+            display_names={str(k): str(v) for k, v in (data.get("display_names") or {}).items()},
+        )
+
+    # --- Brands ---
+
+    def lookup(self, brand: str) -> tuple[str, bool] | None:
+        """(canonical, is_coke) for a brand name or alias, or None if unknown."""
+        return self._aliases.get(_norm_brand(brand))
+
+    def canonical(self, brand: str) -> str | None:
+        hit = self.lookup(brand)
+        return hit[0] if hit else None
+
+    def is_coke_brand(self, brand: str) -> bool:
+        hit = self.lookup(brand)
+        return bool(hit and hit[1])
+
+    def display_name(self, canonical: str) -> str:
+        """Report label for a canonical key ("mountain_dew" -> "Mountain Dew")."""
+        return self.display_names.get(canonical) or canonical.replace("_", " ").title()
+
+    def alias_rows(self) -> list[tuple[str, str, int]]:
+        """(alias, canonical, is_coke) rows for the brand_aliases table."""
+        return [(alias, canonical, int(is_coke)) for alias, (canonical, is_coke) in self._aliases.items()]
+
+    @cached_property
+    def matcher(self):
+        """Aho-Corasick matcher over the listed aliases (compiled on first use).
+
+        Canonical keys are not patterns: "georgia" or "real" alone would match
+        ordinary prose, which is why brands.yaml lists "georgia coffee" and
+        "real juice".
+        """
+        from src.extraction.brand_matcher import BrandMatcher
+
+        brands: dict[str, tuple[list[str], bool]] = {}
+        for is_coke, source in ((False, self.competitors), (True, self.coke_brands)):
+            for canonical, aliases in source.items():
+                brands[canonical] = (aliases, is_coke)
+        return BrandMatcher(brands, self.ambiguous_aliases)
+
+    # --- Domains ---
+
+    def is_coke_domain(self, domain: str | None) -> bool:
+        """Whether `domain` is a Coke-owned domain or a subdomain of one."""
+        if not domain:
+            return False
+        node = self._domain_trie
+        for label in reversed(_norm_domain(domain).split(".")):
+            node = node.get(label)
+            if node is None:
+                return False
+            if _TERMINAL in node:
+                return True
+        return False
+
+
+@lru_cache(maxsize=1)
+def get_registry() -> BrandRegistry:
+    """Process-wide registry loaded from brands.yaml."""
+    return BrandRegistry.from_file()
@@ -4,25 +4,41 @@ from __future__ import annotations
 
 import time
 from abc import ABC, abstractmethod
+from collections.abc import Callable
 from dataclasses import dataclass, field
 from datetime import datetime
 
 
-@dataclass
+@dataclass(slots=True)
 class RawCitation:
-    """Provider-native citation before normalization."""
+    """Provider-native citation before normalization.
+
+    When the cited span is part of the response text, providers leave `text`
+    unset and record only the offsets; cited_text() slices the shared text.
+    """
     url: str
     title: str | None = None
     text: str | None = None
     start_index: int | None = None
     end_index: int | None = None
     confidence: float = 1.0
-    extra: dict = field(default_factory=dict)
+    extra: dict | None = None
+
+    def cited_text(self, raw_text: str) -> str | None:
+        if self.text is not None:
+            return self.text
+        if self.start_index is not None and self.end_index:
+            return raw_text[self.start_index:self.end_index] or None
+        return None
 
 
-@dataclass
+@dataclass(slots=True)
 class ProviderResponse:
-    """Unified response from any LLM provider."""
+    """Unified response from any LLM provider.
+
+    `raw_response` is only needed until the response is stored; the runner
+    drops it right after persisting (see release_payload).
+    """
     provider: str
     model: str
     raw_text: str
@@ -31,20 +47,74 @@ class ProviderResponse:
     latency_ms: int
     input_tokens: int
     output_tokens: int
+    ttft_ms: int | None = None  # time to first text token; only set by streaming queries
+    api_key_id: str | None = None  # pool key that served the request (see providers.keys)
     timestamp: datetime = field(default_factory=datetime.utcnow)
 
+    def release_payload(self):
+        """Drop the raw provider payload once it has been persisted."""
+        self.raw_response = {}
+
+    @property
+    def tokens_per_second(self) -> float | None:
+        """Output tokens per second of generation (after the first token), for streamed responses."""
+        if self.ttft_ms is None or not self.output_tokens or self.latency_ms <= self.ttft_ms:
+            return None
+        return self.output_tokens / ((self.latency_ms - self.ttft_ms) / 1000)
+
+
+# Streaming callback: receives each text delta as it arrives
+DeltaCallback = Callable[[str], None]
+
+# How much of the provider payload goes into ProviderResponse.raw_response
+CAPTURE_POLICIES = ("off", "minimal", "full")
+
+
+def resolve_capture(policy: str | None, debug: bool = False) -> str:
+    """Effective capture policy: full SDK dumps only while debugging, minimal by default."""
+    policy = policy or "minimal"
+    if policy not in CAPTURE_POLICIES:
+        raise ValueError(f"Unknown capture policy {policy!r} (expected one of {', '.join(CAPTURE_POLICIES)})")
+    return "minimal" if policy == "full" and not debug else policy
+
 
 class BaseProvider(ABC):
     """Abstract base class for LLM providers."""
 
     name: str
+    capture: str = "minimal"
+
+    # Scheduling/pricing defaults for the provider registry (config.yaml overrides them)
+    default_model: str | None = None
+    concurrency: int | None = None
+    requests_per_minute: float | None = None
+    pricing: dict[str, dict] = {}  # model -> {input, output per 1M tokens, request per query}
 
     @abstractmethod
     async def query(self, prompt: str) -> ProviderResponse:
         """Send a prompt with web search enabled, return response + citations."""
         ...
 
+    async def query_stream(self, prompt: str, on_delta: DeltaCallback | None = None) -> ProviderResponse:
+        """Like query(), but streamed: records time-to-first-token and calls `on_delta`
+        with each text delta. Providers without streaming fall back to query()."""
+        resp = await self.query(prompt)
+        if on_delta and resp.raw_text:
+            on_delta(resp.raw_text)
+        return resp
+
+    def _capture_raw(self, minimal: Callable[[], dict], full: Callable[[], dict]) -> dict:
+        """raw_response under the capture policy; the payload builders only run when needed."""
+        if self.capture == "off":
+            return {}
+        return full() if self.capture == "full" else minimal()
+
+    @staticmethod
+    def _clock() -> float:
+        """Monotonic start time for _measure_latency."""
+        return time.perf_counter()
+
     @staticmethod
     def _measure_latency(start: float) -> int:
-        """Return elapsed time in milliseconds."""
-        return int((time.time() - start) * 1000)
+        """Return elapsed time in milliseconds since a _clock() reading."""
+        return int((time.perf_counter() - start) * 1000)
@@ -2,40 +2,73 @@
 
 from __future__ import annotations
 
-import time
-
 from google import genai
 from google.genai import types
 
-from .base import BaseProvider, ProviderResponse, RawCitation
+from .base import BaseProvider, DeltaCallback, ProviderResponse, RawCitation
 
 
 class GeminiProvider(BaseProvider):
     name = "gemini"
 
-    def __init__(self, model: str = "gemini-3-flash-preview"):
+    def __init__(self, model: str = "gemini-3-flash-preview", api_key: str | None = None, capture: str = "minimal"):
         self.model = model
-        self.client = genai.Client()
+        self.capture = capture
+        self.client = genai.Client(api_key=api_key)
+
+    def _config(self) -> types.GenerateContentConfig:
+        return types.GenerateContentConfig(
+            tools=[types.Tool(google_search=types.GoogleSearch())],
+        )
 
     async def query(self, prompt: str) -> ProviderResponse:
-        start = time.time()
+        start = self._clock()
 
         response = await self.client.aio.models.generate_content(
             model=self.model,
             contents=prompt,
-            config=types.GenerateContentConfig(
-                tools=[types.Tool(google_search=types.GoogleSearch())],
-            ),
+            config=self._config(),
         )
 
         latency_ms = self._measure_latency(start)
+        metadata = getattr(response.candidates[0], "grounding_metadata", None) if response.candidates else None
+        return self._to_response(response, response.text or "", metadata, latency_ms)
 
-        # Extract text
-        raw_text = response.text or ""
+    async def query_stream(self, prompt: str, on_delta: DeltaCallback | None = None) -> ProviderResponse:
+        """generate_content_stream; grounding metadata and usage arrive on the later chunks."""
+        start = self._clock()
+        ttft_ms = None
+        parts: list[str] = []
+        last = metadata = None
 
+        stream = await self.client.aio.models.generate_content_stream(
+            model=self.model,
+            contents=prompt,
+            config=self._config(),
+        )
+        async for chunk in stream:
+            last = chunk
+            text = chunk.text if chunk.candidates else None
+            if text:
+                if ttft_ms is None:
+                    ttft_ms = self._measure_latency(start)
+                parts.append(text)
+                if on_delta:
+                    on_delta(text)
+            chunk_metadata = getattr(chunk.candidates[0], "grounding_metadata", None) if chunk.candidates else None
+            if chunk_metadata:
+                metadata = chunk_metadata
+
+        if last is None:
+            raise RuntimeError("Gemini stream returned no chunks")
+        return self._to_response(last, "".join(parts), metadata, self._measure_latency(start), ttft_ms)
+
+    def _to_response(
+        self, response, raw_text: str, metadata, latency_ms: int, ttft_ms: int | None = None,
+    ) -> ProviderResponse:
+        """Build a ProviderResponse from the final response (or last stream chunk) and its grounding metadata."""
         # Extract citations from grounding metadata
         citations: list[RawCitation] = []
-        metadata = getattr(response.candidates[0], "grounding_metadata", None) if response.candidates else None
 
         if metadata:
             # groundingChunks contain the source URLs
@@ -81,11 +114,25 @@ class GeminiProvider(BaseProvider):
         input_tokens = getattr(usage, "prompt_token_count", 0) or 0 if usage else 0
         output_tokens = getattr(usage, "candidates_token_count", 0) or 0 if usage else 0
 
-        # Build raw response dict safely
-        try:
-            raw_response = response.model_dump() if hasattr(response, "model_dump") else {}
-        except Exception:
-            raw_response = {"model": self.model, "text_length": len(raw_text)}
+        def minimal() -> dict:
+            candidate = response.candidates[0] if response.candidates else None
+            finish_reason = getattr(candidate, "finish_reason", None)
+            return {
+                "model_version": getattr(response, "model_version", None) or self.model,
+                "response_id": getattr(response, "response_id", None),
+                "finish_reason": str(finish_reason) if finish_reason is not None else None,
+                "usage": {"prompt_token_count": input_tokens, "candidates_token_count": output_tokens},
+                "grounding_chunks": len(citations),
+            }
+
+        def full() -> dict:
+            # Build raw response dict safely
+            try:
+                return response.model_dump() if hasattr(response, "model_dump") else {}
+            except Exception:
+                return {"model": self.model, "text_length": len(raw_text)}
+
+        raw_response = self._capture_raw(minimal, full)
 
         return ProviderResponse(
             provider=self.name,
@@ -96,4 +143,5 @@ class GeminiProvider(BaseProvider):
             latency_ms=latency_ms,
             input_tokens=input_tokens,
             output_tokens=output_tokens,
+            ttft_ms=ttft_ms,
         )
@@ -0,0 +1,155 @@
+"""API key pools — spread a provider's requests over several keys, with per-key accounting."""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from functools import lru_cache
+
+# Environment variable prefix per provider: <PREFIX>_API_KEYS (comma-separated) or <PREFIX>_API_KEY
+ENV_PREFIXES = {
+    "openai": "OPENAI",
+    "gemini": "GOOGLE",
+    "perplexity": "PERPLEXITY",
+}
+
+DEFAULT_COOLDOWN_SECONDS = 30.0
+
+
+class NoHealthyKeyError(RuntimeError):
+    """Every key of a pool has been revoked or exhausted."""
+
+
+@dataclass
+class ApiKey:
+    """One key and its running usage."""
+    key_id: str  # safe to log/store: provider, index and last 4 characters
+    secret: str
+    in_flight: int = 0
+    requests: int = 0
+    rate_limited: int = 0
+    failures: int = 0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cooldown_until: float = 0.0
+    revoked: str | None = None  # reason, once taken out of rotation
+
+    def available(self, now: float) -> bool:
+        return self.revoked is None and self.cooldown_until <= now
+
+
+def status_of(exc: BaseException) -> int | None:
+    """HTTP status of a provider SDK / httpx error, if it carries one."""
+    for candidate in (
+        getattr(exc, "status_code", None),
+        getattr(getattr(exc, "response", None), "status_code", None),
+        getattr(exc, "code", None),
+    ):
+        if isinstance(candidate, int):
+            return candidate
+    return None
+
+
+def _retry_after(exc: BaseException) -> float | None:
+    headers = getattr(getattr(exc, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class KeyPool:
+    """Least-loaded dispatch over a provider's healthy keys.
+
+    A 429 puts the key on cooldown (Retry-After, else `cooldown`); a 401/403,
+    a 402 or an exhausted quota takes it out of rotation for the rest of the
+    process. When every remaining key is cooling down, `lease()` waits for the
+    first one to come back; when none remain it raises NoHealthyKeyError.
+    """
+
+    def __init__(self, provider: str, secrets: list[str], cooldown: float = DEFAULT_COOLDOWN_SECONDS):
+        self.provider = provider
+        self.cooldown = cooldown
+        self.keys = [
+            ApiKey(f"{provider}#{i}…{secret[-4:]}", secret) for i, secret in enumerate(dict.fromkeys(secrets), start=1)
+        ]
+
+    @classmethod
+    def from_env(
+        cls, provider: str, env_vars: tuple[str, ...] = (), cooldown: float = DEFAULT_COOLDOWN_SECONDS,
+    ) -> KeyPool | None:
+        """Pool from the named `env_vars`, else <PREFIX>_API_KEYS, else the single
+        <PREFIX>_API_KEY; None if none of them is set."""
+        prefix = ENV_PREFIXES.get(provider, provider.upper())
+        secrets = [os.environ[v].strip() for v in env_vars if os.environ.get(v, "").strip()]
+        if not secrets:
+            secrets = [k.strip() for k in os.environ.get(f"{prefix}_API_KEYS", "").split(",") if k.strip()]
+        if not secrets and os.environ.get(f"{prefix}_API_KEY"):
+            secrets = [os.environ[f"{prefix}_API_KEY"]]
+        return cls(provider, secrets, cooldown) if secrets else None
+
+    def _pick(self) -> ApiKey | None:
+        now = time.monotonic()
+        healthy = [k for k in self.keys if k.available(now)]
+        return min(healthy, key=lambda k: (k.in_flight, k.requests)) if healthy else None
+
+    async def acquire(self) -> ApiKey:
+        while True:
+            key = self._pick()
+            if key is not None:
+                key.in_flight += 1
+                key.requests += 1
+                return key
+            cooling = [k.cooldown_until for k in self.keys if k.revoked is None]
+            if not cooling:
+                raise NoHealthyKeyError(f"No usable {self.provider} API key left: {self.describe()}")
+            await asyncio.sleep(max(min(cooling) - time.monotonic(), 0.05))
+
+    def release(self, key: ApiKey, exc: BaseException | None = None):
+        """Return a key, classifying the request's error (if any) for the key's health."""
+        key.in_flight -= 1
+        if exc is None:
+            return
+        key.failures += 1
+        status = status_of(exc)
+        if status in (401, 403):
+            key.revoked = f"HTTP {status}"
+        elif status == 402 or "insufficient_quota" in str(exc):
+            key.revoked = "quota exhausted"
+        elif status == 429:
+            key.rate_limited += 1
+            key.cooldown_until = time.monotonic() + (_retry_after(exc) or self.cooldown)
+
+    @asynccontextmanager
+    async def lease(self):
+        """`async with pool.lease() as key:` — acquire, then release with the block's error."""
+        key = await self.acquire()
+        try:
+            yield key
+        except BaseException as e:
+            self.release(key, e)
+            raise
+        else:
+            self.release(key)
+
+    def is_retryable(self, exc: BaseException) -> bool:
+        """Whether another key might succeed where this one failed."""
+        return status_of(exc) in (401, 402, 403, 429) and any(k.revoked is None for k in self.keys)
+
+    def describe(self) -> str:
+        return ", ".join(
+            f"{k.key_id}: {k.requests} req, {k.rate_limited}×429"
+            + (f", revoked ({k.revoked})" if k.revoked else "")
+            for k in self.keys
+        )
+
+
+@lru_cache(maxsize=None)
+def get_key_pool(
+    provider: str, env_vars: tuple[str, ...] = (), cooldown: float = DEFAULT_COOLDOWN_SECONDS,
+) -> KeyPool | None:
+    """Process-wide pool for a provider (None when no key is configured in the environment)."""
+    return KeyPool.from_env(provider, env_vars, cooldown)
@@ -2,11 +2,9 @@
 
 from __future__ import annotations
 
-import time
-
 from openai import AsyncOpenAI
 
-from .base import BaseProvider, ProviderResponse, RawCitation
+from .base import BaseProvider, DeltaCallback, ProviderResponse, RawCitation
 
 
 class OpenAIProvider(BaseProvider):
@@ -15,24 +13,47 @@ class OpenAIProvider(BaseProvider):
     # Models that use "web_search" vs legacy "web_search_preview"
     _WEB_SEARCH_MODELS = {"gpt-5", "gpt-5.2-chat-latest", "gpt-5.2"}
 
-    def __init__(self, model: str = "gpt-5.2-chat-latest"):
+    def __init__(self, model: str = "gpt-5.2-chat-latest", api_key: str | None = None, capture: str = "minimal"):
         self.model = model
-        self.client = AsyncOpenAI()
-
-    async def query(self, prompt: str) -> ProviderResponse:
-        start = time.time()
+        self.capture = capture
+        self.client = AsyncOpenAI(api_key=api_key)
 
+    def _request(self, prompt: str) -> dict:
         # GPT-5+ uses "web_search", older models use "web_search_preview"
         tool_type = "web_search" if any(self.model.startswith(m) for m in self._WEB_SEARCH_MODELS) else "web_search_preview"
+        return {"model": self.model, "tools": [{"type": tool_type}], "input": prompt}
 
-        response = await self.client.responses.create(
-            model=self.model,
-            tools=[{"type": tool_type}],
-            input=prompt,
-        )
-
-        latency_ms = self._measure_latency(start)
-
+    async def query(self, prompt: str) -> ProviderResponse:
+        start = self._clock()
+        response = await self.client.responses.create(**self._request(prompt))
+        return self._to_response(response, self._measure_latency(start))
+
+    async def query_stream(self, prompt: str, on_delta: DeltaCallback | None = None) -> ProviderResponse:
+        """Responses API streaming; text deltas arrive as response.output_text.delta events."""
+        start = self._clock()
+        ttft_ms = None
+        response = None
+
+        stream = await self.client.responses.create(**self._request(prompt), stream=True)
+        async for event in stream:
+            if event.type == "response.output_text.delta":
+                if ttft_ms is None:
+                    ttft_ms = self._measure_latency(start)
+                if on_delta:
+                    on_delta(event.delta)
+            elif event.type in ("response.completed", "response.incomplete"):
+                response = event.response
+            elif event.type == "response.failed":
+                error = event.response.error
+                raise RuntimeError(f"OpenAI stream failed: {error.message if error else 'unknown error'}")
+            elif event.type == "error":
+                raise RuntimeError(f"OpenAI stream error: {event.message}")
+
+        if response is None:
+            raise RuntimeError("OpenAI stream ended without a final response")
+        return self._to_response(response, self._measure_latency(start), ttft_ms)
+
+    def _to_response(self, response, latency_ms: int, ttft_ms: int | None = None) -> ProviderResponse:
         # Extract text and citations from the response output
         raw_text = ""
         citations: list[RawCitation] = []
@@ -46,10 +67,10 @@ class OpenAIProvider(BaseProvider):
                         # Extract url_citation annotations
                         for ann in getattr(content_block, "annotations", []) or []:
                             if ann.type == "url_citation":
+                                # Offsets only; the cited span is sliced from raw_text when normalized
                                 citations.append(RawCitation(
                                     url=ann.url,
                                     title=ann.title,
-                                    text=raw_text[ann.start_index:ann.end_index] if ann.start_index and ann.end_index else None,
                                     start_index=ann.start_index,
                                     end_index=ann.end_index,
                                 ))
@@ -64,8 +85,17 @@ class OpenAIProvider(BaseProvider):
             model=self.model,
             raw_text=raw_text,
             raw_citations=citations,
-            raw_response=response.model_dump(),
+            raw_response=self._capture_raw(
+                lambda: {
+                    "id": response.id,
+                    "model": response.model,
+                    "status": response.status,
+                    "usage": usage.model_dump() if usage else None,
+                },
+                response.model_dump,
+            ),
             latency_ms=latency_ms,
             input_tokens=input_tokens,
             output_tokens=output_tokens,
+            ttft_ms=ttft_ms,
         )
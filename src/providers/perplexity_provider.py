@@ -2,12 +2,12 @@
 
 from __future__ import annotations
 
+import json
 import os
-import time
 
 import httpx
 
-from .base import BaseProvider, ProviderResponse, RawCitation
+from .base import BaseProvider, DeltaCallback, ProviderResponse, RawCitation
 
 
 class PerplexityProvider(BaseProvider):
@@ -15,32 +15,71 @@ class PerplexityProvider(BaseProvider):
 
     BASE_URL = "https://api.perplexity.ai/chat/completions"
 
-    def __init__(self, model: str = "sonar"):  # "sonar" (free) or "sonar-pro" (paid)
+    def __init__(self, model: str = "sonar", api_key: str | None = None, capture: str = "minimal"):  # "sonar" (free) or "sonar-pro" (paid)
         self.model = model
-        self.api_key = os.environ.get("PERPLEXITY_API_KEY", "")
+        self.capture = capture
+        self.api_key = api_key or os.environ.get("PERPLEXITY_API_KEY", "")
 
-    async def query(self, prompt: str) -> ProviderResponse:
-        start = time.time()
-
-        headers = {
+    def _headers(self) -> dict:
+        return {
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json",
         }
 
+    def _payload(self, prompt: str, stream: bool = False) -> dict:
         payload = {
             "model": self.model,
             "messages": [
                 {"role": "user", "content": prompt},
             ],
         }
+        if stream:
+            payload["stream"] = True
+        return payload
+
+    async def query(self, prompt: str) -> ProviderResponse:
+        start = self._clock()
 
         async with httpx.AsyncClient(timeout=60.0) as client:
-            resp = await client.post(self.BASE_URL, headers=headers, json=payload)
+            resp = await client.post(self.BASE_URL, headers=self._headers(), json=self._payload(prompt))
             resp.raise_for_status()
             data = resp.json()
 
-        latency_ms = self._measure_latency(start)
+        return self._to_response(data, self._measure_latency(start))
+
+    async def query_stream(self, prompt: str, on_delta: DeltaCallback | None = None) -> ProviderResponse:
+        """Server-sent events; every chunk repeats the citation list, the last one carries usage."""
+        start = self._clock()
+        ttft_ms = None
+        parts: list[str] = []
+        data: dict = {}
 
+        async with httpx.AsyncClient(timeout=60.0) as client:
+            async with client.stream(
+                "POST", self.BASE_URL, headers=self._headers(), json=self._payload(prompt, stream=True),
+            ) as resp:
+                resp.raise_for_status()
+                async for line in resp.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    body = line[5:].strip()
+                    if body == "[DONE]":
+                        break
+                    chunk = json.loads(body)
+                    delta = (chunk.get("choices") or [{}])[0].get("delta", {}).get("content") or ""
+                    if delta:
+                        if ttft_ms is None:
+                            ttft_ms = self._measure_latency(start)
+                        parts.append(delta)
+                        if on_delta:
+                            on_delta(delta)
+                    # Keep the latest envelope (citations, usage) from the stream
+                    data = {**data, **{k: v for k, v in chunk.items() if k != "choices"}}
+
+        data["choices"] = [{"message": {"role": "assistant", "content": "".join(parts)}}]
+        return self._to_response(data, self._measure_latency(start), ttft_ms)
+
+    def _to_response(self, data: dict, latency_ms: int, ttft_ms: int | None = None) -> ProviderResponse:
         # Extract text from choices
         raw_text = ""
         if data.get("choices"):
@@ -65,8 +104,12 @@ class PerplexityProvider(BaseProvider):
             model=self.model,
             raw_text=raw_text,
             raw_citations=citations,
-            raw_response=data,
+            raw_response=self._capture_raw(
+                lambda: {k: data[k] for k in ("id", "model", "created", "usage") if k in data},
+                lambda: data,
+            ),
             latency_ms=latency_ms,
             input_tokens=input_tokens,
             output_tokens=output_tokens,
+            ttft_ms=ttft_ms,
         )
@@ -0,0 +1,129 @@
+"""Provider registry — engines discovered by name, their SDKs imported only when used.
+
+Built-in engines are listed here; third-party engines register under the
+`geo.providers` entry-point group, pointing either at a ProviderSpec or at a
+BaseProvider subclass (whose `default_model`, `concurrency`,
+`requests_per_minute` and `pricing` class attributes become the spec).
+Provider classes are built with `model=`, `api_key=` and `capture=` keywords:
+
+    [project.entry-points."geo.providers"]
+    claude = "geo_claude.spec:CLAUDE"
+"""
+
+from __future__ import annotations
+
+import importlib
+from dataclasses import dataclass, field
+from functools import lru_cache
+from importlib.metadata import entry_points
+
+from src.providers.base import BaseProvider
+
+ENTRY_POINT_GROUP = "geo.providers"
+
+
+@dataclass(frozen=True)
+class ProviderSpec:
+    """How to build a provider, plus its scheduling and pricing defaults."""
+    name: str
+    target: str | type[BaseProvider]  # "module:Class", imported on first use
+    default_model: str | None = None
+    concurrency: int | None = None
+    requests_per_minute: float | None = None
+    pricing: dict[str, dict] = field(default_factory=dict, hash=False)  # model -> {input, output, request}
+
+    def load(self) -> type[BaseProvider]:
+        if not isinstance(self.target, str):
+            return self.target
+        return _import_class(self.target)
+
+    @classmethod
+    def from_class(cls, name: str, provider_cls: type[BaseProvider]) -> ProviderSpec:
+        return cls(
+            name=name,
+            target=provider_cls,
+            default_model=getattr(provider_cls, "default_model", None),
+            concurrency=getattr(provider_cls, "concurrency", None),
+            requests_per_minute=getattr(provider_cls, "requests_per_minute", None),
+            pricing=dict(getattr(provider_cls, "pricing", None) or {}),
+        )
+
+
+@lru_cache(maxsize=None)
+def _import_class(target: str) -> type[BaseProvider]:
+    module, _, attr = target.partition(":")
+    return getattr(importlib.import_module(module), attr)
+
+
+BUILTIN_PROVIDERS = {
+    spec.name: spec for spec in (
+        ProviderSpec("openai", "src.providers.openai_provider:OpenAIProvider", "gpt-5.2-chat-latest"),
+        ProviderSpec("gemini", "src.providers.gemini_provider:GeminiProvider", "gemini-3-flash-preview"),
+        ProviderSpec("perplexity", "src.providers.perplexity_provider:PerplexityProvider", "sonar"),
+    )
+}
+
+# Registered at runtime (register_provider), e.g. local stand-ins
+_registered: dict[str, ProviderSpec] = {}
+
+
+def register_provider(name: str, provider: ProviderSpec | type[BaseProvider] | str):
+    """Register (or replace) a provider for this process."""
+    if isinstance(provider, ProviderSpec):
+        spec = provider
+    elif isinstance(provider, str):
+        spec = ProviderSpec(name, provider)
+    else:
+        spec = ProviderSpec.from_class(name, provider)
+    _registered[name] = spec
+    available_providers.cache_clear()
+    get_provider_spec.cache_clear()
+
+
+class _EntryPointSpec:
+    """Entry point resolved to a ProviderSpec on first access (importing the plugin module)."""
+
+    def __init__(self, ep):
+        self.ep = ep
+
+    @property
+    def spec(self) -> ProviderSpec:
+        obj = self.ep.load()
+        return obj if isinstance(obj, ProviderSpec) else ProviderSpec.from_class(self.ep.name, obj)
+
+
+@lru_cache(maxsize=1)
+def _entry_points() -> dict[str, _EntryPointSpec]:
+    return {ep.name: _EntryPointSpec(ep) for ep in entry_points(group=ENTRY_POINT_GROUP)}
+
+
+@lru_cache(maxsize=1)
+def available_providers() -> tuple[str, ...]:
+    """Names of every known provider; nothing is imported."""
+    return tuple(dict.fromkeys([*BUILTIN_PROVIDERS, *_entry_points(), *_registered]))
+
+
+@lru_cache(maxsize=None)
+def get_provider_spec(name: str) -> ProviderSpec:
+    """Spec for a provider name; runtime registrations win over entry points over built-ins."""
+    if name in _registered:
+        return _registered[name]
+    if name in _entry_points():
+        return _entry_points()[name].spec
+    if name in BUILTIN_PROVIDERS:
+        return BUILTIN_PROVIDERS[name]
+    raise KeyError(f"Unknown provider {name!r} (available: {', '.join(available_providers())})")
+
+
+def get_provider_class(name: str) -> type[BaseProvider]:
+    """Provider class for a name — imports its module (and SDK) on first use."""
+    return get_provider_spec(name).load()
+
+
+def declared_pricing(names) -> dict[str, dict]:
+    """model -> pricing declared by the given providers' specs."""
+    pricing: dict[str, dict] = {}
+    for name in names:
+        if name in available_providers():
+            pricing.update(get_provider_spec(name).pricing)
+    return pricing
@@ -0,0 +1,102 @@
+"""Run targets — (provider, model) pairs with their own concurrency, rate limit and pricing."""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from collections.abc import Collection
+from dataclasses import dataclass, field
+
+from src.providers.registry import available_providers, declared_pricing, get_provider_spec
+
+
+@dataclass(frozen=True)
+class Target:
+    """One provider/model to query in a run."""
+    provider: str
+    model: str | None = None  # None = the provider class default
+    concurrency: int = 5
+    requests_per_minute: float | None = None
+    pricing: dict = field(default_factory=dict, compare=False, hash=False)  # {input, output, request} overrides
+
+    @property
+    def label(self) -> str:
+        return f"{self.provider}/{self.model}" if self.model else self.provider
+
+
+class RateLimiter:
+    """Spaces request starts at least 60/rpm seconds apart (no limit when rpm is None)."""
+
+    def __init__(self, requests_per_minute: float | None = None):
+        self.interval = 60.0 / requests_per_minute if requests_per_minute else 0.0
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        if not self.interval:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            wait = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+def _provider_targets(name: str, provider_cfg: dict, concurrency: int) -> list[Target]:
+    """Targets for one provider: its `models` list, else its single `model`.
+
+    Settings missing from config fall back to the provider's registry spec.
+    """
+    spec = get_provider_spec(name)
+    entries = provider_cfg.get("models") or [{"model": provider_cfg.get("model", spec.default_model)}]
+    targets = []
+    for entry in entries:
+        entry = {"model": entry} if isinstance(entry, str) else entry
+        model = entry.get("model")
+        targets.append(Target(
+            provider=name,
+            model=model,
+            concurrency=entry.get("concurrency", provider_cfg.get("concurrency", spec.concurrency or concurrency)),
+            requests_per_minute=entry.get(
+                "requests_per_minute", provider_cfg.get("requests_per_minute", spec.requests_per_minute),
+            ),
+            pricing=entry.get("pricing") or spec.pricing.get(model, {}),
+        ))
+    return targets
+
+
+def resolve_targets(cfg: dict, specs: list[str], known_providers: Collection[str], concurrency: int = 5) -> list[Target]:
+    """Expand CLI provider specs into targets.
+
+    A spec is a provider name (all of its configured models) or
+    `provider:model` (that model only, with the settings configured for it if
+    any). Duplicate targets are dropped; providers not in `known_providers`
+    are skipped.
+    """
+    providers_cfg = cfg.get("providers", {})
+    targets: dict[tuple[str, str | None], Target] = {}
+    for spec in specs:
+        name, _, model = spec.strip().partition(":")
+        if name not in known_providers:
+            continue
+        configured = _provider_targets(name, providers_cfg.get(name, {}), concurrency)
+        if model:
+            match = next((t for t in configured if t.model == model), None)
+            configured = [match or Target(name, model, configured[0].concurrency, configured[0].requests_per_minute)]
+        for t in configured:
+            targets.setdefault((t.provider, t.model), t)
+    return list(targets.values())
+
+
+def target_pricing(cfg: dict) -> dict[str, dict]:
+    """model -> pricing overrides ({input, output} per 1M tokens, request per query) from
+    provider specs and config (config wins)."""
+    pricing = declared_pricing(cfg.get("providers", {}))
+    for name, provider_cfg in cfg.get("providers", {}).items():
+        if name not in available_providers():
+            continue
+        for t in _provider_targets(name, provider_cfg or {}, 1):
+            if t.model and t.pricing:
+                pricing[t.model] = t.pricing
+    return pricing
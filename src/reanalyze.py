@@ -0,0 +1,87 @@
+"""Incremental re-analysis — re-extract stored responses whose analysis is stale."""
+
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass
+from typing import Callable
+
+from src.extraction.pipeline import ExtractionPipeline
+from src.storage.db import get_stale_responses, replace_analyses
+
+_SEP = "\x1f"  # GROUP_CONCAT separator used by get_stale_responses
+
+
+@dataclass
+class ReanalysisStats:
+    reanalyzed: int = 0
+    cached: int = 0
+    failed: int = 0
+    commits: int = 0
+
+
+async def reanalyze(
+    pipeline: ExtractionPipeline,
+    run_id: str | None = None,
+    workers: int = 16,
+    commit_every: int = 50,
+    limit: int | None = None,
+    on_progress: Callable[[ReanalysisStats], None] | None = None,
+) -> ReanalysisStats:
+    """Re-run extraction on responses analyzed with another ANALYZER_VERSION or config hash.
+
+    Stale responses are streamed from the DB page by page (rowid keyset), fed
+    through a bounded queue to `workers` tasks, and written back in
+    transactions of `commit_every` results that replace the old analysis and
+    mentions. Fresh rows carry the current stamps, so an interrupted job
+    resumes where it left off; failures stay stale for the next pass.
+    """
+    config_hash, chunked = pipeline.stale_filter
+    stats = ReanalysisStats()
+    queue: asyncio.Queue = asyncio.Queue(maxsize=workers * 2)
+    pending: list = []
+
+    def flush():
+        if pending:
+            replace_analyses(pending)
+            stats.commits += 1
+            pending.clear()
+
+    async def produce():
+        after, sent = 0, 0
+        while limit is None or sent < limit:
+            page = get_stale_responses(
+                config_hash, run_id, after, 500 if limit is None else min(500, limit - sent), chunked,
+            )
+            if not page:
+                break
+            for row in page:
+                await queue.put(row)
+            sent += len(page)
+            after = page[-1]["rowid"]
+        for _ in range(workers):
+            await queue.put(None)
+
+    async def work():
+        while (row := await queue.get()) is not None:
+            domains = row["domains"].split(_SEP) if row["domains"] else []
+            coke_domains = row["coke_domains"].split(_SEP) if row["coke_domains"] else []
+            try:
+                result = await pipeline.analyze(row["response_id"], row["raw_text"], domains, coke_domains)
+            except Exception:
+                stats.failed += 1
+            else:
+                stats.reanalyzed += 1
+                stats.cached += result.cached
+                pending.append((row["response_id"], result.analysis, result.cached, result.usage, result.config_hash))
+                if len(pending) >= commit_every:
+                    flush()
+            if on_progress:
+                on_progress(stats)
+
+    try:
+        await asyncio.gather(produce(), *(work() for _ in range(workers)))
+    finally:
+        flush()
+        await pipeline.close()
+    return stats
@@ -45,61 +45,207 @@ def _get_conn() -> sqlite3.Connection:
     return conn
 
 
-def compute_costs(run_id: str | None = None) -> list[ProviderCost]:
-    """Compute costs per provider/model."""
+def _cost(
+    provider: str, model: str, queries: int, input_tokens: int, output_tokens: int,
+    overrides: dict[str, dict] | None = None,
+) -> ProviderCost:
+    """Cost at list prices, or at the per-target `overrides` ({model: {input, output, request}}) from config."""
+    override = (overrides or {}).get(model, {})
+    pricing = {**PRICING.get(model, {"input": 0, "output": 0}), **override}
+    input_cost = input_tokens / 1_000_000 * pricing["input"]
+    output_cost = output_tokens / 1_000_000 * pricing["output"]
+    request_cost = queries * override.get("request", REQUEST_FEES.get(model, 0))
+    return ProviderCost(
+        provider=provider,
+        model=model,
+        queries=queries,
+        input_tokens=input_tokens,
+        output_tokens=output_tokens,
+        input_cost=round(input_cost, 4),
+        output_cost=round(output_cost, 4),
+        request_cost=round(request_cost, 4),
+        total_cost=round(input_cost + output_cost + request_cost, 4),
+    )
+
+
+@dataclass
+class ExtractionTokenModel:
+    """Extraction tokens per response as a linear function of response length (chars)."""
+    input_base: float
+    input_per_char: float
+    output_base: float
+    output_per_char: float
+    samples: int
+
+    def predict(self, chars: int) -> tuple[int, int]:
+        return (
+            round(self.input_base + self.input_per_char * chars),
+            round(self.output_base + self.output_per_char * chars),
+        )
+
+
+# Prior used until enough analyses have recorded usage: prompt boilerplate + ~4 chars/token
+DEFAULT_TOKEN_MODEL = ExtractionTokenModel(330, 0.25, 200, 0.02, 0)
+_MIN_SAMPLES = 20
+
+
+def _fit(xs: list[float], ys: list[float]) -> tuple[float, float]:
+    """Ordinary least squares y = a + b·x, with b clamped at 0."""
+    n = len(xs)
+    mean_x, mean_y = sum(xs) / n, sum(ys) / n
+    var = sum((x - mean_x) ** 2 for x in xs)
+    slope = sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / var if var else 0.0
+    slope = max(slope, 0.0)
+    return mean_y - slope * mean_x, slope
+
+
+def fit_extraction_model(conn: sqlite3.Connection | None = None) -> ExtractionTokenModel:
+    """Fit the token model on analyses with recorded usage (all attempts included)."""
+    own = conn is None
+    conn = conn or _get_conn()
+    rows = conn.execute("""
+        SELECT LENGTH(r.raw_text) AS chars, a.extraction_input_tokens AS inp, a.extraction_output_tokens AS out
+        FROM analyses a JOIN responses r ON r.response_id = a.response_id
+        WHERE a.extraction_model IS NOT NULL AND a.extraction_input_tokens > 0
+    """).fetchall()
+    if own:
+        conn.close()
+    if len(rows) < _MIN_SAMPLES:
+        return DEFAULT_TOKEN_MODEL
+    chars = [r["chars"] for r in rows]
+    in_base, in_slope = _fit(chars, [r["inp"] for r in rows])
+    out_base, out_slope = _fit(chars, [r["out"] for r in rows])
+    return ExtractionTokenModel(in_base, in_slope, out_base, out_slope, len(rows))
+
+
+def compute_costs(
+    run_id: str | None = None, pricing: dict[str, dict] | None = None, by_key: bool = False,
+) -> list[ProviderCost]:
+    """Compute costs per provider/model, with extraction costs from recorded usage.
+
+    `pricing` overrides list prices per model (see targets.target_pricing).
+    With `by_key`, query costs are split per API key of the provider's key pool.
+    """
     conn = _get_conn()
-    where = f"WHERE run_id = '{run_id}'" if run_id else ""
+    where = "WHERE r.run_id = ?" if run_id else ""
+    params = (run_id,) if run_id else ()
 
     rows = conn.execute(f"""
-        SELECT provider, model, COUNT(*) as queries,
+        SELECT provider, model, {"api_key_id" if by_key else "NULL"} AS api_key_id, COUNT(*) as queries,
                SUM(input_tokens) as total_input,
                SUM(output_tokens) as total_output
-        FROM responses {where}
-        GROUP BY provider, model
-    """).fetchall()
+        FROM responses r {where}
+        GROUP BY provider, model, 3
+    """, params).fetchall()
+
+    costs = [
+        _cost(
+            f"{r['provider']} [{r['api_key_id']}]" if r["api_key_id"] else r["provider"],
+            r["model"], r["queries"], r["total_input"] or 0, r["total_output"] or 0, pricing,
+        )
+        for r in rows
+    ]
+
+    # Extraction: real tokens (retries included) recorded per analysis
+    extraction = conn.execute(f"""
+        SELECT a.extraction_model AS model, COUNT(*) AS analyses,
+               SUM(a.extraction_input_tokens) AS total_input,
+               SUM(a.extraction_output_tokens) AS total_output
+        FROM analyses a JOIN responses r ON r.response_id = a.response_id
+        {where} {"AND" if where else "WHERE"} a.extraction_model IS NOT NULL
+        GROUP BY a.extraction_model
+    """, params).fetchall()
+    for r in extraction:
+        costs.append(_cost("extraction", r["model"], r["analyses"], r["total_input"] or 0, r["total_output"] or 0))
+
+    # Analyses stored before usage was recorded: estimate from response length.
+    # Only those with brand mentions are known to have gone through the LLM.
+    legacy = conn.execute(f"""
+        SELECT LENGTH(r.raw_text) AS chars
+        FROM analyses a JOIN responses r ON r.response_id = a.response_id
+        {where} {"AND" if where else "WHERE"} a.extraction_model IS NULL AND a.is_cached = 0
+        AND EXISTS (SELECT 1 FROM brand_mentions bm WHERE bm.response_id = a.response_id)
+    """, params).fetchall()
+    if legacy:
+        model = fit_extraction_model(conn)
+        predicted = [model.predict(r["chars"]) for r in legacy]
+        costs.append(_cost(
+            "extraction (est.)", "gpt-4o-mini", len(legacy),
+            sum(p[0] for p in predicted), sum(p[1] for p in predicted),
+        ))
 
     conn.close()
+    return costs
+
+
+def project_costs(
+    prompt_ids: list[str],
+    providers: list[tuple[str, str]],
+    repeats: int = 1,
+    extraction_model: str = "gpt-4o-mini",
+    pricing: dict[str, dict] | None = None,
+) -> list[ProviderCost]:
+    """Projected cost of a run before it starts.
+
+    `providers` lists the run's (provider, model) targets. Response length and
+    query tokens come from history (per prompt/provider/model, falling back to
+    per provider/model, then per provider);
+    extraction tokens from the fitted length model, scaled by the share of
+    past responses that actually reached the LLM extractor (the rest were
+    prescan skips or cache hits).
+    """
+    conn = _get_conn()
+    token_model = fit_extraction_model(conn)
+
+    by_prompt = {
+        (r["prompt_id"], r["provider"]): r["chars"]
+        for r in conn.execute(f"""
+            SELECT prompt_id, provider, AVG(LENGTH(raw_text)) AS chars FROM responses
+            WHERE prompt_id IN ({",".join("?" * len(prompt_ids))}) GROUP BY prompt_id, provider
+        """, prompt_ids)
+    } if prompt_ids else {}
+    by_model = {
+        (r["provider"], r["model"]): r for r in conn.execute("""
+            SELECT provider, model, AVG(LENGTH(raw_text)) AS chars,
+                   AVG(input_tokens) AS inp, AVG(output_tokens) AS out
+            FROM responses GROUP BY provider, model
+        """)
+    }
+    by_provider = {
+        r["provider"]: r for r in conn.execute("""
+            SELECT provider, AVG(LENGTH(raw_text)) AS chars,
+                   AVG(input_tokens) AS inp, AVG(output_tokens) AS out
+            FROM responses GROUP BY provider
+        """)
+    }
+    # LLM share among analyses since usage tracking started
+    row = conn.execute("""
+        SELECT COUNT(*) AS total, COUNT(extraction_model) AS llm FROM analyses
+        WHERE analysis_id >= (SELECT MIN(analysis_id) FROM analyses WHERE extraction_model IS NOT NULL)
+    """).fetchone()
+    conn.close()
+    llm_share = row["llm"] / row["total"] if row["total"] else 1.0
 
     costs = []
-    for r in rows:
-        model = r["model"]
-        pricing = PRICING.get(model, {"input": 0, "output": 0})
-
-        input_cost = (r["total_input"] or 0) / 1_000_000 * pricing["input"]
-        output_cost = (r["total_output"] or 0) / 1_000_000 * pricing["output"]
-        request_cost = r["queries"] * REQUEST_FEES.get(model, 0)
-
-        costs.append(ProviderCost(
-            provider=r["provider"],
-            model=model,
-            queries=r["queries"],
-            input_tokens=r["total_input"] or 0,
-            output_tokens=r["total_output"] or 0,
-            input_cost=round(input_cost, 4),
-            output_cost=round(output_cost, 4),
-            request_cost=round(request_cost, 4),
-            total_cost=round(input_cost + output_cost + request_cost, 4),
+    ext_queries = ext_input = ext_output = 0.0
+    for provider, model in providers:
+        hist = by_model.get((provider, model)) or by_provider.get(provider)
+        default_chars = hist["chars"] if hist else 2000
+        queries = len(prompt_ids) * repeats
+        costs.append(_cost(
+            provider, model, queries,
+            round((hist["inp"] or 0) * queries) if hist else 0,
+            round((hist["out"] or 0) * queries) if hist else 0,
+            pricing,
         ))
-
-    # Add extraction cost estimate (GPT-4o-mini for analysis)
-    # Rough estimate: ~500 tokens input + ~200 tokens output per analysis
-    total_analyses = sum(r["queries"] for r in rows)
-    if total_analyses > 0:
-        ext_pricing = PRICING["gpt-4o-mini"]
-        ext_input = total_analyses * 500
-        ext_output = total_analyses * 200
-        ext_input_cost = ext_input / 1_000_000 * ext_pricing["input"]
-        ext_output_cost = ext_output / 1_000_000 * ext_pricing["output"]
-        costs.append(ProviderCost(
-            provider="extraction",
-            model="gpt-4o-mini",
-            queries=total_analyses,
-            input_tokens=ext_input,
-            output_tokens=ext_output,
-            input_cost=round(ext_input_cost, 4),
-            output_cost=round(ext_output_cost, 4),
-            request_cost=0,
-            total_cost=round(ext_input_cost + ext_output_cost, 4),
+        for pid in prompt_ids:
+            inp, out = token_model.predict(by_prompt.get((pid, provider), default_chars))
+            ext_queries += repeats * llm_share
+            ext_input += inp * repeats * llm_share
+            ext_output += out * repeats * llm_share
+
+    if ext_queries:
+        costs.append(_cost(
+            "extraction", extraction_model, round(ext_queries), round(ext_input), round(ext_output), pricing,
         ))
-
     return costs
@@ -23,7 +23,7 @@ def export_run(run_id: str | None, output_path: str):
 
     rows = conn.execute(f"""
         SELECT r.run_id, r.prompt_id, r.prompt_text, r.provider, r.model,
-               r.latency_ms, r.input_tokens, r.output_tokens, r.repeat_num,
+               r.latency_ms, r.ttft_ms, r.input_tokens, r.output_tokens, r.repeat_num,
                a.coke_brands_found, a.competitor_brands_found, a.response_type,
                a.coke_is_primary_recommendation,
                (SELECT COUNT(*) FROM citations c WHERE c.response_id = r.response_id) as citation_count,
@@ -40,14 +40,14 @@ def export_run(run_id: str | None, output_path: str):
         writer = csv.writer(f)
         writer.writerow([
             "run_id", "prompt_id", "prompt_text", "provider", "model",
-            "latency_ms", "input_tokens", "output_tokens", "repeat_num",
+            "latency_ms", "ttft_ms", "input_tokens", "output_tokens", "repeat_num",
             "coke_brands_found", "competitor_brands_found", "response_type",
             "coke_is_primary_recommendation", "citation_count", "coke_citation_count",
         ])
         for r in rows:
             writer.writerow([dict(r)[k] for k in [
                 "run_id", "prompt_id", "prompt_text", "provider", "model",
-                "latency_ms", "input_tokens", "output_tokens", "repeat_num",
+                "latency_ms", "ttft_ms", "input_tokens", "output_tokens", "repeat_num",
                 "coke_brands_found", "competitor_brands_found", "response_type",
                 "coke_is_primary_recommendation", "citation_count", "coke_citation_count",
             ]])
@@ -3,6 +3,7 @@
 from __future__ import annotations
 
 import asyncio
+import os
 import random
 import time
 from dataclasses import dataclass
@@ -11,12 +12,16 @@ import yaml
 from rich.console import Console
 from rich.progress import Progress, SpinnerColumn, TextColumn, BarColumn, TaskProgressColumn
 
-from src.extraction.analyzer import analyze_response
+from src.aggregation.live import RunAccumulator
+from src.config import load_config as _load_config
+from src.extraction.brand_matcher import get_brand_matcher
 from src.extraction.normalizer import normalize_citations
-from src.providers.base import BaseProvider
-from src.providers.gemini_provider import GeminiProvider
-from src.providers.openai_provider import OpenAIProvider
-from src.providers.perplexity_provider import PerplexityProvider
+from src.extraction.pipeline import ExtractionPipeline
+from src.extraction.redirects import RedirectResolver, resolve_citation_redirects
+from src.providers.base import BaseProvider, DeltaCallback, ProviderResponse, resolve_capture
+from src.providers.keys import DEFAULT_COOLDOWN_SECONDS, KeyPool, get_key_pool
+from src.providers.registry import available_providers, get_provider_spec
+from src.providers.targets import RateLimiter, Target, resolve_targets
 from src.storage.db import (
     create_run, finish_run, init_db,
     store_analysis, store_citations, store_response,
@@ -24,26 +29,73 @@ from src.storage.db import (
 
 console = Console()
 
-PROVIDER_CLASSES: dict[str, type[BaseProvider]] = {
-    "openai": OpenAIProvider,
-    "gemini": GeminiProvider,
-    "perplexity": PerplexityProvider,
-}
 
+def _debug_enabled(cfg: dict) -> bool:
+    return bool(cfg.get("debug")) or os.environ.get("GEO_DEBUG", "") not in ("", "0")
 
-def _load_config() -> dict:
-    """Load config.yaml."""
-    with open("config.yaml") as f:
-        return yaml.safe_load(f)
 
+def _create_provider(name: str, model: str | None = None, api_key: str | None = None) -> BaseProvider:
+    """Create a provider instance for `model`, defaulting to the model from config.yaml,
+    then the provider's registered default. Its module (and SDK) is imported here.
 
-def _create_provider(name: str) -> BaseProvider:
-    """Create a provider instance using the model from config.yaml."""
+    The raw-response capture policy comes from providers.<name>.capture
+    (off / minimal / full; full only when debugging).
+    """
     cfg = _load_config()
     provider_cfg = cfg.get("providers", {}).get(name, {})
-    model = provider_cfg.get("model")
-    cls = PROVIDER_CLASSES[name]
-    return cls(model=model) if model else cls()
+    spec = get_provider_spec(name)
+    if model is None:
+        model = provider_cfg.get("model", spec.default_model)
+    capture = resolve_capture(provider_cfg.get("capture"), _debug_enabled(cfg))
+    cls = spec.load()
+    if model:
+        return cls(model=model, api_key=api_key, capture=capture)
+    return cls(api_key=api_key, capture=capture)
+
+
+def _key_pool(name: str) -> KeyPool | None:
+    """The provider's process-wide key pool, or None to let the SDK pick up its default key."""
+    provider_cfg = _load_config().get("providers", {}).get(name, {})
+    return get_key_pool(
+        name,
+        tuple(provider_cfg.get("api_key_envs", ())),
+        provider_cfg.get("key_cooldown_seconds", DEFAULT_COOLDOWN_SECONDS),
+    )
+
+
+def _usable_keys(name: str) -> int:
+    """Keys a provider's requests are spread over (not revoked; at least 1)."""
+    pool = _key_pool(name)
+    return max(sum(k.revoked is None for k in pool.keys), 1) if pool else 1
+
+
+async def _query(
+    target: Target, text: str, stream: bool = False, on_delta: DeltaCallback | None = None,
+) -> ProviderResponse:
+    """Query a target through its provider's key pool (least-loaded healthy key).
+
+    A request that fails on a rate-limited, revoked or exhausted key is retried
+    on another key while the pool has one left. With `stream`, `on_delta` gets
+    each text delta (of every attempt).
+    """
+    pool = _key_pool(target.provider)
+    if pool is None:
+        provider = _create_provider(target.provider, target.model)
+        return await (provider.query_stream(text, on_delta) if stream else provider.query(text))
+
+    for attempt in range(len(pool.keys)):
+        try:
+            async with pool.lease() as key:
+                provider = _create_provider(target.provider, target.model, key.secret)
+                resp = await (provider.query_stream(text, on_delta) if stream else provider.query(text))
+        except Exception as e:
+            if attempt + 1 < len(pool.keys) and pool.is_retryable(e):
+                continue
+            raise
+        key.input_tokens += resp.input_tokens
+        key.output_tokens += resp.output_tokens
+        resp.api_key_id = key.key_id
+        return resp
 
 
 @dataclass
@@ -80,42 +132,78 @@ def load_prompts(path: str = "prompts/seed_prompts.yaml", category: str | None =
 async def _process_single(
     run_id: str,
     prompt: Prompt,
-    provider_name: str,
+    target: Target,
     repeat: int,
     analyze: bool,
     semaphore: asyncio.Semaphore,
+    acc: RunAccumulator | None = None,
+    pipeline: ExtractionPipeline | None = None,
+    stream: bool = False,
+    limiter: RateLimiter | None = None,
+    acc_key: str | None = None,
 ) -> tuple[bool, str | None]:
-    """Process a single prompt/provider/repeat. Returns (success, error_msg)."""
-    async with semaphore:
-        provider = _create_provider(provider_name)
-        try:
+    """Process a single prompt/target/repeat. Returns (success, error_msg).
+
+    Only the provider query holds the target's semaphore (and rate limiter);
+    extraction runs through the pipeline's own pool so slow analyses don't
+    block queries. `acc_key` is the accumulator row (default: provider name).
+    When streaming, the brand prescan runs over the answer as it arrives.
+    """
+    if analyze and pipeline is None:
+        pipeline = ExtractionPipeline.from_config(_load_config(), batch=False)
+    scan = get_brand_matcher().stream() if stream and analyze and pipeline.prescan else None
+    try:
+        async with semaphore:
             # Add small jitter to avoid bursts to the same provider
             jitter = random.uniform(0.2, 1.0)
             await asyncio.sleep(jitter)
-
-            resp = await provider.query(prompt.text)
-
-            # Store response
-            response_id = store_response(run_id, prompt.id, prompt.text, resp, repeat)
-
-            # Normalize and store citations
-            normalized = normalize_citations(resp)
-            if normalized:
-                store_citations(response_id, normalized)
-
-            # Run brand extraction
-            if analyze and resp.raw_text:
-                try:
-                    domains = [c.domain for c in normalized]
-                    analysis = await analyze_response(resp.raw_text, domains)
-                    store_analysis(response_id, analysis)
-                except Exception as e:
-                    return True, f"[yellow]Analysis warning {prompt.id}/{provider_name}/r{repeat}: {e}[/yellow]"
-
-            return True, None
-
-        except Exception as e:
-            return False, f"[red]Error: {prompt.id}/{provider_name}/r{repeat}: {e}[/red]"
+            if limiter:
+                await limiter.acquire()
+
+            resp = await _query(target, prompt.text, stream, scan.feed if scan else None)
+
+        # Store response
+        # Payload serialization and the write happen off the event loop
+        response_id = await asyncio.to_thread(store_response, run_id, prompt.id, prompt.text, resp, repeat)
+        resp.release_payload()
+        if acc is not None:
+            acc.add_response(response_id, acc_key or target.provider, prompt.id)
+
+        # Normalize and store citations
+        normalized = normalize_citations(resp)
+        if normalized:
+            store_citations(response_id, normalized)
+            if acc is not None:
+                for c in normalized:
+                    acc.add_citation(response_id, c.is_coke_domain)
+
+        # Run brand extraction
+        if analyze and resp.raw_text:
+            try:
+                # A retried attempt's partial deltas (or a provider whose final text
+                # differs from its deltas) leave a mismatch: rescan the stored text then
+                has_brands = scan.finish() if scan and scan.chars == len(resp.raw_text) else None
+                result = await pipeline.analyze(
+                    response_id, resp.raw_text,
+                    [c.domain for c in normalized], [c.domain for c in normalized if c.is_coke_domain],
+                    has_brands,
+                )
+                analysis = result.analysis
+                store_analysis(
+                    response_id, analysis, cached=result.cached, usage=result.usage,
+                    config_hash=result.config_hash,
+                )
+                if acc is not None:
+                    acc.add_analysis(
+                        response_id, bool(analysis.coke_brands_found), analysis.coke_is_primary_recommendation,
+                    )
+            except Exception as e:
+                return True, f"[yellow]Analysis warning {prompt.id}/{target.label}/r{repeat}: {e}[/yellow]"
+
+        return True, None
+
+    except Exception as e:
+        return False, f"[red]Error: {prompt.id}/{target.label}/r{repeat}: {e}[/red]"
 
 
 async def run_batch(
@@ -126,24 +214,68 @@ async def run_batch(
     jitter_max: float = 3.0,
     analyze: bool = True,
     concurrency: int = 5,
+    prescan: bool = True,
+    use_cache: bool = True,
+    batch: bool = True,
+    chunk: bool = True,
+    analyzer: str | None = None,
+    stream: bool = False,
 ) -> str:
-    """Run a full batch with parallel execution. Returns run_id."""
+    """Run a full batch with parallel execution. Returns run_id.
+
+    `providers` are provider names (every model configured for them) or
+    `provider:model` specs; each resulting target gets its own concurrency
+    limit (`concurrency` unless configured) and optional rate limit, and all
+    targets are queried concurrently. Both limits are per API key: a provider
+    with a pool of N usable keys gets N times the in-flight requests and rate.
+
+    With `prescan`, responses in which the local brand matcher finds no known
+    brand are stored with an empty analysis instead of calling the extractor.
+    With `use_cache`, responses whose normalized text (case, whitespace and
+    [n] citation markers aside) exactly matches one seen before reuse its
+    cached analysis. With `batch`, short responses are analyzed several
+    to a call (see extraction.batch in config.yaml). With `chunk`, long
+    responses are analyzed paragraph-chunk by chunk and merged. `analyzer`
+    overrides extraction.analyzer (llm / local / hybrid). With `stream`,
+    providers are queried in streaming mode, which records time-to-first-token.
+    """
     init_db()
 
-    active_providers = [p for p in providers if p in PROVIDER_CLASSES]
-    if not active_providers:
+    targets = resolve_targets(_load_config(), providers, available_providers(), concurrency)
+    if not targets:
         raise ValueError(f"No valid providers: {providers}")
+    active_providers = list(dict.fromkeys(t.provider for t in targets))
+    # Several models of one provider are tracked separately in the live view
+    multi_model = len(targets) > len(active_providers)
 
-    total_tasks = len(prompts) * len(active_providers) * repeats
-    run_id = create_run(len(prompts), len(active_providers), repeats)
+    total_tasks = len(prompts) * len(targets) * repeats
+    run_id = create_run(len(prompts), len(targets), repeats)
 
-    console.print(f"\n[bold cyan]Run {run_id}[/bold cyan] — {len(prompts)} prompts × {len(active_providers)} providers × {repeats} repeats = {total_tasks} queries (concurrency={concurrency})")
+    # Per-target semaphores and rate limiters to respect provider limits, scaled by the key pool
+    keys = {t: _usable_keys(t.provider) for t in targets}
+    semaphores = {t: asyncio.Semaphore(t.concurrency * keys[t]) for t in targets}
+    limiters = {t: RateLimiter(t.requests_per_minute and t.requests_per_minute * keys[t]) for t in targets}
 
-    # Per-provider semaphores to respect rate limits
-    provider_semaphores = {p: asyncio.Semaphore(concurrency) for p in active_providers}
+    console.print(
+        f"\n[bold cyan]Run {run_id}[/bold cyan] — {len(prompts)} prompts × {len(targets)} targets × {repeats} repeats "
+        f"= {total_tasks} queries ({', '.join(f'{t.label} ×{t.concurrency * keys[t]}' for t in targets)})"
+    )
+    console.print(f"[dim]Follow with: geo report --follow {run_id}[/dim]")
 
     completed = 0
     errors = 0
+    # Running aggregates for the progress line; `geo report --follow` tails the DB for the full view
+    acc = RunAccumulator()
+    pipeline = ExtractionPipeline.from_config(
+        _load_config(), prescan=prescan, use_cache=use_cache, batch=batch, chunk=chunk, analyzer=analyzer,
+    ) if analyze else None
+
+    def live_summary() -> str:
+        parts = [
+            f"{name} {c.visibility:.0f}%"
+            for name, c in sorted(acc.by_provider.items()) if c.analyzed
+        ]
+        return f"Running {total_tasks} queries" + (f" — visibility {' | '.join(parts)}" if parts else "")
 
     with Progress(
         SpinnerColumn(),
@@ -155,11 +287,12 @@ async def run_batch(
         task = progress.add_task("Running queries...", total=total_tasks)
 
         # Build all tasks
-        async def run_and_track(prompt, provider_name, repeat):
+        async def run_and_track(prompt, target, repeat):
             nonlocal completed, errors
             result = await _process_single(
-                run_id, prompt, provider_name, repeat, analyze,
-                provider_semaphores[provider_name],
+                run_id, prompt, target, repeat, analyze,
+                semaphores[target], acc, pipeline, stream, limiters[target],
+                target.label if multi_model else target.provider,
             )
             success, msg = result
             if success:
@@ -168,18 +301,36 @@ async def run_batch(
                 errors += 1
             if msg:
                 console.print(f"  {msg}")
-            progress.advance(task)
+            progress.update(task, advance=1, description=live_summary())
 
         # Launch all queries as concurrent tasks
         tasks = []
         for prompt in prompts:
-            for provider_name in active_providers:
+            for target in targets:
                 for repeat in range(1, repeats + 1):
-                    tasks.append(run_and_track(prompt, provider_name, repeat))
+                    tasks.append(run_and_track(prompt, target, repeat))
 
         progress.update(task, description=f"Running {total_tasks} queries in parallel...")
         await asyncio.gather(*tasks)
+        if pipeline:
+            await pipeline.close()
+
+    # Proxied Gemini citations are resolved after the queries, so they never hold up the run
+    redirect_stats = None
+    if "gemini" in active_providers and _load_config().get("citations", {}).get("redirects", {}).get("enabled", True):
+        redirect_stats = await resolve_citation_redirects(RedirectResolver.from_config(_load_config()), run_id)
 
     finish_run(run_id)
     console.print(f"\n[bold green]Run {run_id} complete.[/bold green] {completed} succeeded, {errors} failed.")
+    for line in pipeline.summary() if pipeline else []:
+        console.print(f"[dim]{line}[/dim]")
+    for name in active_providers:
+        pool = _key_pool(name)
+        if pool and (len(pool.keys) > 1 or any(k.rate_limited or k.revoked for k in pool.keys)):
+            console.print(f"[dim]Keys: {pool.describe()}[/dim]")
+    if redirect_stats and redirect_stats.updated:
+        console.print(
+            f"[dim]Redirects: {redirect_stats.updated} Gemini citations re-pointed "
+            f"({redirect_stats.known} known, {redirect_stats.resolved} resolved, {redirect_stats.failed} failed)[/dim]"
+        )
     return run_id
@@ -7,14 +7,34 @@ import sqlite3
 import uuid
 from datetime import datetime
 from pathlib import Path
+from typing import TYPE_CHECKING
 
-from src.extraction.analyzer import ResponseAnalysis
-from src.extraction.normalizer import NormalizedCitation
-from src.providers.base import ProviderResponse
+from src.extraction.registry import get_registry
+
+if TYPE_CHECKING:  # the extraction modules pull in instructor/openai; read-only commands don't need them
+    from src.extraction.analyzer import ResponseAnalysis
+    from src.extraction.client import ExtractionUsage
+    from src.extraction.normalizer import NormalizedCitation
+    from src.providers.base import ProviderResponse
+
+try:
+    import orjson
+except ImportError:  # optional speed-up (pip install orjson)
+    orjson = None
 
 DB_PATH = Path(__file__).parent.parent.parent / "data" / "coke_geo.db"
 
 
+def _dumps(obj) -> str:
+    """JSON for stored payloads — orjson when installed, else the stdlib encoder."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, default=str, option=orjson.OPT_NON_STR_KEYS).decode()
+        except TypeError:  # e.g. integers beyond 64 bits
+            pass
+    return json.dumps(obj, default=str)
+
+
 def _get_conn() -> sqlite3.Connection:
     DB_PATH.parent.mkdir(parents=True, exist_ok=True)
     conn = sqlite3.connect(str(DB_PATH))
@@ -50,6 +70,8 @@ def init_db():
             latency_ms INTEGER,
             input_tokens INTEGER,
             output_tokens INTEGER,
+            ttft_ms INTEGER,
+            api_key_id TEXT,
             repeat_num INTEGER DEFAULT 1,
             timestamp TEXT NOT NULL
         );
@@ -84,13 +106,92 @@ def init_db():
             competitor_brands_found TEXT,
             response_type TEXT,
             coke_is_primary_recommendation INTEGER DEFAULT 0,
-            coke_domains_cited TEXT
+            coke_domains_cited TEXT,
+            is_cached INTEGER DEFAULT 0,
+            extraction_model TEXT,
+            extraction_attempts INTEGER,
+            validation_failures INTEGER,
+            extraction_input_tokens INTEGER,
+            extraction_output_tokens INTEGER,
+            extraction_latency_ms INTEGER,
+            extraction_batch_size INTEGER,
+            analyzer_version TEXT,
+            config_hash TEXT
         );
+
+        -- alias -> canonical brand index, synced from the brand dictionaries on init
+        CREATE TABLE IF NOT EXISTS brand_aliases (
+            alias TEXT PRIMARY KEY,
+            canonical TEXT NOT NULL,
+            is_coke INTEGER NOT NULL DEFAULT 0,
+            display TEXT
+        );
+
+        -- proxy citation URL (Gemini vertexaisearch) -> where it redirects; target NULL = not a redirect
+        CREATE TABLE IF NOT EXISTS redirects (
+            proxy_url TEXT PRIMARY KEY,
+            target_url TEXT,
+            domain TEXT,
+            status INTEGER,
+            resolved_at TEXT NOT NULL
+        );
+
+        CREATE INDEX IF NOT EXISTS idx_responses_run ON responses(run_id, prompt_id, provider);
+        CREATE INDEX IF NOT EXISTS idx_citations_response ON citations(response_id);
+        CREATE INDEX IF NOT EXISTS idx_mentions_response ON brand_mentions(response_id);
+        CREATE INDEX IF NOT EXISTS idx_analyses_response ON analyses(response_id);
     """)
+    _migrate(conn)
+    _sync_brand_aliases(conn)
     conn.commit()
     conn.close()
 
 
+# Columns added after the initial schema: (table, column, declaration)
+_ADDED_COLUMNS = [
+    ("analyses", "is_cached", "INTEGER DEFAULT 0"),
+    ("analyses", "extraction_model", "TEXT"),
+    ("analyses", "extraction_attempts", "INTEGER"),
+    ("analyses", "validation_failures", "INTEGER"),
+    ("analyses", "extraction_input_tokens", "INTEGER"),
+    ("analyses", "extraction_output_tokens", "INTEGER"),
+    ("analyses", "extraction_latency_ms", "INTEGER"),
+    ("analyses", "extraction_batch_size", "INTEGER"),
+    ("analyses", "analyzer_version", "TEXT"),
+    ("analyses", "config_hash", "TEXT"),
+    ("responses", "ttft_ms", "INTEGER"),
+    ("responses", "api_key_id", "TEXT"),
+    ("brand_aliases", "display", "TEXT"),
+]
+
+
+def _migrate(conn: sqlite3.Connection):
+    """Add columns that older databases are missing."""
+    for table, column, decl in _ADDED_COLUMNS:
+        existing = {r["name"] for r in conn.execute(f"PRAGMA table_info({table})")}
+        if column not in existing:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {decl}")
+
+
+def _sync_brand_aliases(conn: sqlite3.Connection):
+    """Keep brand_aliases in step with brands.yaml so SQL aggregations can
+    canonicalize mentions with a join.
+
+    Only rewritten when the registry changed, so read-only commands (report,
+    matrix) that call init_db don't write to the database.
+    """
+    registry = get_registry()
+    rows = {
+        (alias, canonical, is_coke, registry.display_name(canonical))
+        for alias, canonical, is_coke in registry.alias_rows()
+    }
+    current = {tuple(r) for r in conn.execute("SELECT alias, canonical, is_coke, display FROM brand_aliases")}
+    if current == rows:
+        return
+    conn.execute("DELETE FROM brand_aliases")
+    conn.executemany("INSERT INTO brand_aliases (alias, canonical, is_coke, display) VALUES (?, ?, ?, ?)", rows)
+
+
 def create_run(prompt_count: int, provider_count: int, repeats: int) -> str:
     """Create a new run and return its ID."""
     run_id = str(uuid.uuid4())[:8]
@@ -122,21 +223,26 @@ def store_response(
     response: ProviderResponse,
     repeat_num: int = 1,
 ) -> str:
-    """Store a provider response and return response_id."""
+    """Store a provider response and return response_id.
+
+    The raw payload is serialized here, so callers on the event loop should run
+    this in a worker thread (asyncio.to_thread). An empty payload (capture
+    policy "off") is stored as NULL.
+    """
     response_id = str(uuid.uuid4())[:12]
     conn = _get_conn()
     conn.execute(
         """INSERT INTO responses
            (response_id, run_id, prompt_id, prompt_text, provider, model,
             raw_text, raw_response, latency_ms, input_tokens, output_tokens,
-            repeat_num, timestamp)
-           VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+            ttft_ms, api_key_id, repeat_num, timestamp)
+           VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
         (
             response_id, run_id, prompt_id, prompt_text,
             response.provider, response.model, response.raw_text,
-            json.dumps(response.raw_response, default=str),
+            _dumps(response.raw_response) if response.raw_response else None,
             response.latency_ms, response.input_tokens, response.output_tokens,
-            repeat_num, response.timestamp.isoformat(),
+            response.ttft_ms, response.api_key_id, repeat_num, response.timestamp.isoformat(),
         ),
     )
     conn.commit()
@@ -158,16 +264,59 @@ def store_citations(response_id: str, citations: list[NormalizedCitation]):
     conn.close()
 
 
-def store_analysis(response_id: str, analysis: ResponseAnalysis):
-    """Store brand extraction analysis for a response."""
+def store_analysis(
+    response_id: str,
+    analysis: ResponseAnalysis,
+    cached: bool = False,
+    usage: ExtractionUsage | None = None,
+    config_hash: str | None = None,
+):
+    """Store brand extraction analysis for a response.
+
+    `cached` marks an analysis-cache hit; `usage` records what the extraction
+    call cost (left NULL when no LLM call was made). Rows are stamped with
+    ANALYZER_VERSION and `config_hash` so `geo reanalyze` can find stale ones.
+    """
+    conn = _get_conn()
+    _insert_analysis(conn, response_id, analysis, cached, usage, config_hash)
+    conn.commit()
+    conn.close()
+
+
+def replace_analyses(results: list[tuple[str, ResponseAnalysis, bool, ExtractionUsage | None, str | None]]):
+    """Swap in new (response_id, analysis, cached, usage, config_hash) results in one transaction."""
     conn = _get_conn()
+    ids = [r[0] for r in results]
+    for i in range(0, len(ids), 500):
+        chunk = ids[i:i + 500]
+        placeholders = ",".join("?" * len(chunk))
+        conn.execute(f"DELETE FROM brand_mentions WHERE response_id IN ({placeholders})", chunk)
+        conn.execute(f"DELETE FROM analyses WHERE response_id IN ({placeholders})", chunk)
+    for response_id, analysis, cached, usage, config_hash in results:
+        _insert_analysis(conn, response_id, analysis, cached, usage, config_hash)
+    conn.commit()
+    conn.close()
+
+
+def _insert_analysis(
+    conn: sqlite3.Connection,
+    response_id: str,
+    analysis: ResponseAnalysis,
+    cached: bool,
+    usage: ExtractionUsage | None,
+    config_hash: str | None,
+):
+    from src.extraction.analyzer import ANALYZER_VERSION
 
     # Store analysis summary
     conn.execute(
         """INSERT INTO analyses
            (response_id, coke_brands_found, competitor_brands_found, response_type,
-            coke_is_primary_recommendation, coke_domains_cited)
-           VALUES (?, ?, ?, ?, ?, ?)""",
+            coke_is_primary_recommendation, coke_domains_cited, is_cached,
+            extraction_model, extraction_attempts, validation_failures,
+            extraction_input_tokens, extraction_output_tokens, extraction_latency_ms, extraction_batch_size,
+            analyzer_version, config_hash)
+           VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
         (
             response_id,
             json.dumps(analysis.coke_brands_found),
@@ -175,26 +324,21 @@ def store_analysis(response_id: str, analysis: ResponseAnalysis):
             analysis.response_type,
             int(analysis.coke_is_primary_recommendation),
             json.dumps(analysis.coke_domains_cited),
+            int(cached),
+            *((usage.model, usage.attempts, usage.validation_failures, usage.input_tokens,
+               usage.output_tokens, usage.latency_ms, usage.batch_size) if usage else (None,) * 7),
+            ANALYZER_VERSION,
+            config_hash,
         ),
     )
 
     # Store individual brand mentions
-    coke_canonical = set()
-    for brands in [analysis.coke_brands_found]:
-        coke_canonical.update(brands)
+    registry = get_registry()
+    coke_canonical = set(analysis.coke_brands_found)
 
     for m in analysis.all_mentions:
-        # Determine if this is a coke brand
-        brand_lower = m.brand.lower()
-        is_coke = any(
-            brand_lower in [alias.lower() for alias in aliases] or brand_lower == key
-            for key, aliases in {
-                "coca_cola": ["coca-cola", "coca cola", "coke", "diet coke", "coke zero"],
-                "thums_up": ["thums up", "thumbs up"],
-                "sprite": ["sprite"], "fanta": ["fanta"], "limca": ["limca"],
-                "maaza": ["maaza"], "minute_maid": ["minute maid"],
-            }.items()
-        ) or brand_lower.replace(" ", "_") in coke_canonical
+        # Registry lookup, falling back to the extractor's own Coke classification
+        is_coke = registry.is_coke_brand(m.brand) or m.brand.lower().replace(" ", "_") in coke_canonical
 
         conn.execute(
             """INSERT INTO brand_mentions
@@ -203,8 +347,133 @@ def store_analysis(response_id: str, analysis: ResponseAnalysis):
             (response_id, m.brand, m.position, m.sentiment.value, int(m.is_recommended), m.context, int(is_coke)),
         )
 
+
+def _stale_condition(config_hash: str, chunked: tuple[int, str] | None) -> tuple[str, tuple]:
+    """SQL (and params) for an analysis missing or made with another version/config.
+
+    With `chunked` = (min_chars, hash), responses longer than min_chars are
+    expected to carry the chunked-extraction hash instead.
+    """
+    from src.extraction.analyzer import ANALYZER_VERSION
+
+    expected, params = "?", (config_hash,)
+    if chunked:
+        expected, params = "(CASE WHEN LENGTH(r.raw_text) > ? THEN ? ELSE ? END)", (*chunked, config_hash)
+    return (
+        f"(a.analysis_id IS NULL OR a.analyzer_version IS NOT ? OR a.config_hash IS NOT {expected})",
+        (ANALYZER_VERSION, *params),
+    )
+
+
+def count_stale_responses(
+    config_hash: str, chunked: tuple[int, str] | None = None, run_id: str | None = None,
+) -> int:
+    """Responses get_stale_responses would return across all pages."""
+    conn = _get_conn()
+    run_filter = "AND r.run_id = ?" if run_id else ""
+    stale, stale_params = _stale_condition(config_hash, chunked)
+    count = conn.execute(
+        f"""SELECT COUNT(DISTINCT r.response_id)
+            FROM responses r
+            LEFT JOIN analyses a ON a.response_id = r.response_id
+            WHERE r.raw_text != '' {run_filter}
+              AND {stale}""",
+        (*((run_id,) if run_id else ()), *stale_params),
+    ).fetchone()[0]
+    conn.close()
+    return count
+
+
+def get_stale_responses(
+    config_hash: str,
+    run_id: str | None = None,
+    after_rowid: int = 0,
+    limit: int = 500,
+    chunked: tuple[int, str] | None = None,
+) -> list[dict]:
+    """Next page (by rowid) of responses whose analysis is missing or was made with another version/config."""
+    conn = _get_conn()
+    run_filter = "AND r.run_id = ?" if run_id else ""
+    stale, stale_params = _stale_condition(config_hash, chunked)
+    rows = conn.execute(
+        f"""SELECT r.rowid AS rowid, r.response_id, r.raw_text,
+                   (SELECT GROUP_CONCAT(c.domain, '\x1f') FROM citations c WHERE c.response_id = r.response_id) AS domains,
+                   (SELECT GROUP_CONCAT(c.domain, '\x1f') FROM citations c
+                    WHERE c.response_id = r.response_id AND c.is_coke_domain = 1) AS coke_domains
+            FROM responses r
+            LEFT JOIN analyses a ON a.response_id = r.response_id
+            WHERE r.rowid > ? {run_filter} AND r.raw_text != ''
+              AND {stale}
+            GROUP BY r.rowid
+            ORDER BY r.rowid
+            LIMIT ?""",
+        (after_rowid, *((run_id,) if run_id else ()), *stale_params, limit),
+    ).fetchall()
+    conn.close()
+    return [dict(r) for r in rows]
+
+
+def get_redirects(proxy_urls: list[str]) -> dict[str, str | None]:
+    """Known proxy URL -> target URL (None for proxies that turned out not to redirect)."""
+    conn = _get_conn()
+    found: dict[str, str | None] = {}
+    for i in range(0, len(proxy_urls), 500):
+        chunk = proxy_urls[i:i + 500]
+        rows = conn.execute(
+            f"SELECT proxy_url, target_url FROM redirects WHERE proxy_url IN ({','.join('?' * len(chunk))})",
+            chunk,
+        ).fetchall()
+        found.update({r["proxy_url"]: r["target_url"] for r in rows})
+    conn.close()
+    return found
+
+
+def store_redirects(rows: list[tuple[str, str | None, str | None, int]]):
+    """Persist (proxy_url, target_url, domain, status) resolutions."""
+    conn = _get_conn()
+    now = datetime.utcnow().isoformat()
+    conn.executemany(
+        """INSERT OR REPLACE INTO redirects (proxy_url, target_url, domain, status, resolved_at)
+           VALUES (?, ?, ?, ?, ?)""",
+        [(*row, now) for row in rows],
+    )
+    conn.commit()
+    conn.close()
+
+
+def get_unresolved_proxy_urls(url_pattern: str, run_id: str | None = None) -> list[str]:
+    """Distinct citation URLs matching a LIKE pattern that have no redirects row yet."""
+    conn = _get_conn()
+    run_filter = "AND r.run_id = ?" if run_id else ""
+    rows = conn.execute(
+        f"""SELECT DISTINCT c.url FROM citations c
+            JOIN responses r ON r.response_id = c.response_id
+            LEFT JOIN redirects d ON d.proxy_url = c.url
+            WHERE c.url LIKE ? AND d.proxy_url IS NULL {run_filter}""",
+        (url_pattern, *((run_id,) if run_id else ())),
+    ).fetchall()
+    conn.close()
+    return [r["url"] for r in rows]
+
+
+def apply_redirects(run_id: str | None = None) -> int:
+    """Point proxied citations at their resolved source domain. Returns citations updated."""
+    registry = get_registry()
+    conn = _get_conn()
+    run_filter = "AND c.response_id IN (SELECT response_id FROM responses WHERE run_id = ?)" if run_id else ""
+    rows = conn.execute(
+        f"""SELECT c.citation_id, d.domain FROM citations c
+            JOIN redirects d ON d.proxy_url = c.url
+            WHERE d.domain IS NOT NULL AND c.domain IS NOT d.domain {run_filter}""",
+        (run_id,) if run_id else (),
+    ).fetchall()
+    conn.executemany(
+        "UPDATE citations SET domain = ?, is_coke_domain = ? WHERE citation_id = ?",
+        [(r["domain"], int(registry.is_coke_domain(r["domain"])), r["citation_id"]) for r in rows],
+    )
     conn.commit()
     conn.close()
+    return len(rows)
 
 
 def get_db_stats() -> dict:
@@ -216,6 +485,11 @@ def get_db_stats() -> dict:
     stats["citations"] = conn.execute("SELECT COUNT(*) FROM citations").fetchone()[0]
     stats["brand_mentions"] = conn.execute("SELECT COUNT(*) FROM brand_mentions").fetchone()[0]
     stats["analyses"] = conn.execute("SELECT COUNT(*) FROM analyses").fetchone()[0]
+    stats["cached_analyses"] = conn.execute("SELECT COUNT(*) FROM analyses WHERE is_cached = 1").fetchone()[0]
+    row = conn.execute(
+        "SELECT COALESCE(SUM(MAX(extraction_attempts - 1, 0)), 0), COALESCE(SUM(validation_failures), 0) FROM analyses"
+    ).fetchone()
+    stats["extraction_retries"], stats["validation_failures"] = row[0], row[1]
 
     # Per-provider counts
     rows = conn.execute("SELECT provider, COUNT(*) as cnt FROM responses GROUP BY provider").fetchall()
@@ -0,0 +1,88 @@
+"""ExtractionBatcher fallback and the usage split behind `geo costs`, with a stand-in extractor."""
+
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from src.extraction import batcher
+from src.extraction.analyzer import ResponseAnalysis, empty_analysis
+from src.extraction.client import ExtractionUsage, track_usage
+
+TEXTS = {"r1": "Thums Up is the pick. " * 20, "r2": "Try Sprite.", "r3": "Maaza or Frooti? " * 8}
+
+
+def test_split_adds_up_to_the_batch():
+    usage = ExtractionUsage(model="m", attempts=2, validation_failures=1, input_tokens=1001, output_tokens=333, latency_ms=900)
+    shares = usage.split([0.5, 0.25, 0.125], batch_size=4)  # one response of the batch went unanswered
+
+    assert sum(s.input_tokens for s in shares) == 1001
+    assert sum(s.output_tokens for s in shares) == 333
+    assert [s.attempts for s in shares] == [2, 0, 0]
+    assert [s.validation_failures for s in shares] == [1, 0, 0]
+    assert {(s.model, s.batch_size, s.latency_ms) for s in shares} == {("m", 4, 900)}
+    assert usage.split([], batch_size=4) == []
+
+
+def _spend(attempts: int, input_tokens: int, output_tokens: int):
+    with track_usage() as usage:
+        usage.attempts += attempts
+        usage.input_tokens += input_tokens
+        usage.output_tokens += output_tokens
+    return usage
+
+
+@pytest.fixture
+def extractor(monkeypatch):
+    """Stand-in extraction calls: the batched call answers `answer` (or raises), single calls always answer."""
+    state = {"answer": set(), "single": []}
+
+    async def analyze_batch(items, model, max_connections):
+        _spend(2, 900, 300)
+        if not state["answer"]:
+            raise ValueError("validation failed twice")
+        return {rid: empty_analysis(text) for rid, text, _ in items if rid in state["answer"]}, None
+
+    async def analyze_response_with_usage(text, domains, model, max_connections):
+        state["single"].append(text)
+        return empty_analysis(text), _spend(1, 100, 40)
+
+    monkeypatch.setattr(batcher, "analyze_batch", analyze_batch)
+    monkeypatch.setattr(batcher, "analyze_response_with_usage", analyze_response_with_usage)
+    return state
+
+
+async def _submit_all(pool: batcher.ExtractionBatcher) -> dict[str, tuple[ResponseAnalysis, ExtractionUsage]]:
+    results = await asyncio.gather(*(pool.submit(rid, text) for rid, text in TEXTS.items()))
+    await pool.close()
+    return dict(zip(TEXTS, results))
+
+
+def _pool() -> batcher.ExtractionBatcher:
+    return batcher.ExtractionBatcher(max_batch_size=len(TEXTS), max_batch_tokens=10_000, max_delay=0.01)
+
+
+def test_failed_batch_falls_back_to_single_calls(extractor):
+    pool = _pool()
+    results = asyncio.run(_submit_all(pool))
+
+    assert sorted(extractor["single"]) == sorted(TEXTS.values())
+    assert (pool.calls, pool.batched_calls, pool.fallbacks) == (4, 1, 3)
+    assert all(isinstance(analysis, ResponseAnalysis) for analysis, _ in results.values())
+    # Stored rows add up to everything spent: the failed batch plus the three single calls
+    rows = [usage for _, usage in results.values()]
+    assert sum(u.input_tokens for u in rows) == pool.usage.input_tokens == 900 + 3 * 100
+    assert sum(u.output_tokens for u in rows) == pool.usage.output_tokens == 300 + 3 * 40
+    assert sum(u.attempts for u in rows) == pool.usage.attempts == 2 + 3
+
+
+def test_dropped_response_alone_falls_back(extractor):
+    extractor["answer"] = {"r1", "r3"}
+    pool = _pool()
+    results = asyncio.run(_submit_all(pool))
+
+    assert extractor["single"] == [TEXTS["r2"]]
+    assert (pool.calls, pool.fallbacks) == (2, 1)
+    assert sum(u.input_tokens for _, u in results.values()) == 900 + 100
+    assert results["r1"][1].batch_size == 3
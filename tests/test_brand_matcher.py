@@ -0,0 +1,79 @@
+"""BrandMatcher — overlaps, word boundaries, case folding and ambiguous aliases."""
+
+from __future__ import annotations
+
+import pytest
+
+from src.extraction.brand_matcher import BrandMatcher
+from src.extraction.registry import get_registry
+
+BRANDS = {
+    "coca_cola": (["coca-cola", "coke", "diet coke", "coca-cola zero sugar"], True),
+    "sprite": (["sprite"], True),
+    "pepsi": (["pepsi", "pepsico"], False),
+    "7up": (["7up", "7 up"], False),
+    "slice": (["slice"], False),
+    "real": (["real juice"], False),
+}
+
+
+@pytest.fixture
+def matcher():
+    return BrandMatcher(BRANDS, frozenset({"slice", "real juice"}))
+
+
+def _hits(matcher: BrandMatcher, text: str) -> list[tuple[str, str]]:
+    return [(text[m.start:m.end], m.canonical) for m in matcher.scan(text)]
+
+
+def test_overlapping_aliases_resolve_leftmost_longest(matcher):
+    text = "Diet Coke beats coke; Coca-Cola Zero Sugar beats Coca-Cola."
+    assert _hits(matcher, text) == [
+        ("Diet Coke", "coca_cola"),
+        ("coke", "coca_cola"),
+        ("Coca-Cola Zero Sugar", "coca_cola"),
+        ("Coca-Cola", "coca_cola"),
+    ]
+    assert [m.alias for m in matcher.scan(text)][:1] == ["diet coke"]
+
+
+def test_aliases_match_whole_words_only(matcher):
+    assert _hits(matcher, "cokes, notcoke, pepsicola, 17up") == []
+    assert _hits(matcher, "(Pepsi) vs PepsiCo, 7up! and 7 Up.") == [
+        ("Pepsi", "pepsi"), ("PepsiCo", "pepsi"), ("7up", "7up"), ("7 Up", "7up"),
+    ]
+
+
+def test_ambiguous_aliases_match_only_capitalized(matcher):
+    assert _hits(matcher, "a slice of bread with real juice") == []
+    assert _hits(matcher, "Try Slice or Real Juice") == [("Slice", "slice"), ("Real Juice", "real")]
+
+
+def test_offsets_survive_lowercasing_that_changes_length(matcher):
+    # "İ".lower() is two characters; the match must still point at "Coke"
+    text = "İİ Coke and İstanbul Pepsi"
+    assert _hits(matcher, text) == [("Coke", "coca_cola"), ("Pepsi", "pepsi")]
+
+
+def test_first_mentions_keep_one_match_per_brand_in_order(matcher):
+    first = matcher.first_mentions("Pepsi, then Coke, then pepsi again and a Sprite")
+    assert [(m.canonical, m.is_coke) for m in first] == [("pepsi", False), ("coca_cola", True), ("sprite", True)]
+
+
+def test_registry_matches_lowercase_portfolio_brands():
+    # Portfolio brands are not everyday words: lowercase mentions must count for the prescan
+    found = {m.canonical for m in get_registry().matcher.scan("grab a sprite, a limca or a thums up")}
+    assert found == {"sprite", "limca", "thums_up"}
+    assert not get_registry().matcher.contains_any("cut me a slice of cake")
+
+
+@pytest.mark.parametrize("text", [
+    "grab a sprite", "Try 7 Up.", "notcoke or cokes", "a slice of cake", "Slice!", "İİ Coke", "Diet Coke", "",
+])
+def test_stream_scan_agrees_with_contains_any_however_text_is_split(matcher, text):
+    for i in range(len(text) + 1):
+        for j in range(i, len(text) + 1):
+            scan = matcher.stream()
+            for delta in (text[:i], text[i:j], text[j:]):
+                scan.feed(delta)
+            assert (scan.finish(), scan.chars) == (matcher.contains_any(text), len(text)), (i, j)
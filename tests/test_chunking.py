@@ -0,0 +1,60 @@
+"""merge_analyses — deterministic merge of per-chunk analyses."""
+
+from __future__ import annotations
+
+from src.extraction.analyzer import BrandMention, ResponseAnalysis, Sentiment
+from src.extraction.chunking import Chunk, merge_analyses
+
+CHUNKS = [
+    Chunk("Pepsi is popular, but Thums Up is bolder.", 0),
+    Chunk("Thums Up again, then Coca-Cola.", 200),
+]
+
+
+def _mention(brand: str, position: int, sentiment: Sentiment, recommended: bool = False) -> BrandMention:
+    return BrandMention(brand=brand, position=position, sentiment=sentiment, is_recommended=recommended, context=brand)
+
+
+def _analysis(mentions: list[BrandMention], coke: list[str], competitors: list[str], response_type: str) -> ResponseAnalysis:
+    return ResponseAnalysis(
+        coke_brands_found=coke, competitor_brands_found=competitors, all_mentions=mentions,
+        coke_domains_cited=[], response_type=response_type, coke_is_primary_recommendation=False,
+    )
+
+
+ANALYSES = [
+    # The extractor's chunk-local order is off, and "Desi Fizz" is not in the chunk text
+    _analysis([
+        _mention("Thums Up", 1, Sentiment.positive),
+        _mention("Pepsi", 2, Sentiment.neutral),
+        _mention("Desi Fizz", 3, Sentiment.neutral),
+    ], ["thums_up"], ["pepsi", "desi fizz"], "narrative"),
+    _analysis([
+        _mention("Coca-Cola", 1, Sentiment.positive, recommended=True),
+        _mention("Thums Up", 2, Sentiment.negative, recommended=True),
+    ], ["coca_cola", "thums_up"], [], "list"),
+]
+
+
+def test_merge_orders_by_text_and_reconciles_overlapping_brands():
+    merged = merge_analyses(CHUNKS, ANALYSES)
+
+    assert [(m.brand, m.position, m.sentiment, m.is_recommended) for m in merged.all_mentions] == [
+        ("Pepsi", 1, Sentiment.neutral, False),
+        ("Thums Up", 2, Sentiment.mixed, True),       # positive in one chunk, negative in the other
+        ("Desi Fizz", 3, Sentiment.neutral, False),   # unlocated: after chunk 1's located brands
+        ("Coca-Cola", 4, Sentiment.positive, True),
+    ]
+    assert merged.all_mentions[1].context == "Thums Up"
+    assert merged.coke_brands_found == ["thums_up", "coca_cola"]
+    assert merged.competitor_brands_found == ["pepsi", "desi fizz"]
+    assert merged.response_type == "list"
+    assert merged.coke_is_primary_recommendation  # Thums Up is the first recommended brand
+
+
+def test_merge_ignores_completion_order():
+    forward = merge_analyses(CHUNKS, ANALYSES)
+    backward = merge_analyses(CHUNKS[::-1], ANALYSES[::-1])
+
+    assert backward.all_mentions == forward.all_mentions
+    assert backward.response_type == forward.response_type
@@ -0,0 +1,49 @@
+"""Significance tests behind `geo compare`, checked against reference values."""
+
+from __future__ import annotations
+
+import pytest
+
+from src.aggregation.compare import MetricDelta, _chi2_2x2, _fisher_2x2, _mark_significant, _test_proportions
+
+
+def test_chi2_matches_reference():
+    # scipy.stats.chi2_contingency([[10, 20], [30, 40]], correction=False): chi2 = 0.7937, p = 0.3730
+    assert _chi2_2x2(10, 20, 30, 40) == pytest.approx(0.37300, abs=1e-5)
+    assert _chi2_2x2(0, 5, 0, 7) == 1.0  # empty column: no test possible
+
+
+@pytest.mark.parametrize("table, expected", [
+    ((3, 1, 1, 3), 34 / 70),           # Fisher's tea-tasting table
+    ((1, 9, 11, 3), 41 / 14858),       # scipy.stats.fisher_exact: 0.0027595
+    ((8, 2, 1, 5), 5 / 143),           # scipy.stats.fisher_exact: 0.0349650
+    ((5, 0, 0, 5), 2 / 252),           # both extremes of C(10, 5) tables
+])
+def test_fisher_matches_reference(table, expected):
+    assert _fisher_2x2(*table) == pytest.approx(expected, rel=1e-9)
+
+
+def test_small_expected_counts_use_fisher():
+    assert _test_proportions(3, 4, 1, 4) == (pytest.approx(_fisher_2x2(3, 1, 1, 3)), "fisher")
+    assert _test_proportions(10, 30, 30, 70)[1] == "chi2"
+
+
+def _delta(key: str, p_value: float, metric: str = "visibility") -> MetricDelta:
+    return MetricDelta("engine", key, metric, 0, 1, 0, 1, p_value, "chi2")
+
+
+def test_benjamini_hochberg_steps_up():
+    # Thresholds i/m * 0.05 = 0.0167, 0.0333, 0.05: rank 1 fails alone, but rank 3
+    # passes, so every p-value up to it is significant
+    family = [_delta("c", 0.035), _delta("a", 0.02), _delta("b", 0.03)]
+    _mark_significant(family, 0.05)
+    assert all(d.significant for d in family)
+
+
+def test_benjamini_hochberg_cutoff_and_families():
+    ps = [0.001, 0.008, 0.039, 0.041, 0.042, 0.06, 0.074, 0.205]
+    family = [_delta(f"k{i}", p) for i, p in enumerate(ps)]
+    other = [_delta("x", 0.04, metric="citation")]  # alone in its family: 0.04 <= 0.05
+    _mark_significant(family + other, 0.05)
+    assert [d.key for d in family if d.significant] == ["k0", "k1"]
+    assert other[0].significant
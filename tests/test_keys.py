@@ -0,0 +1,132 @@
+"""KeyPool dispatch, cooldown and revocation, and the runner's retry on another key."""
+
+from __future__ import annotations
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from src import runner
+from src.providers import keys
+from src.providers.base import ProviderResponse
+from src.providers.keys import KeyPool, NoHealthyKeyError
+from src.providers.targets import Target
+
+
+class ApiError(Exception):
+    """Stand-in SDK error carrying an HTTP status (and optional Retry-After)."""
+
+    def __init__(self, status: int, retry_after: str | None = None):
+        super().__init__(f"HTTP {status}")
+        self.status_code = status
+        self.response = SimpleNamespace(headers={"retry-after": retry_after} if retry_after else {})
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Fake monotonic clock for the pool; sleeping advances it instead of waiting."""
+    clock = SimpleNamespace(now=1000.0)
+    real_sleep = asyncio.sleep
+
+    async def sleep(seconds):
+        clock.now += seconds
+        await real_sleep(0)
+
+    monkeypatch.setattr(keys, "time", SimpleNamespace(monotonic=lambda: clock.now))
+    monkeypatch.setattr(keys.asyncio, "sleep", sleep)
+    return clock
+
+
+def _acquire(pool: KeyPool):
+    return asyncio.run(pool.acquire())
+
+
+def test_lease_picks_the_least_loaded_key(clock):
+    pool = KeyPool("openai", ["sk-aaaa", "sk-bbbb", "sk-aaaa"])
+    assert len(pool.keys) == 2  # duplicates collapse
+
+    first, second = _acquire(pool), _acquire(pool)
+    assert first is not second
+    pool.release(first)
+    assert _acquire(pool) is first  # idle again, and no more requests than `second`
+
+
+def test_rate_limited_key_cools_down_until_retry_after(clock):
+    pool = KeyPool("openai", ["sk-aaaa", "sk-bbbb"], cooldown=30)
+    a, b = pool.keys
+    pool.release(_acquire(pool), ApiError(429, retry_after="10"))
+    pool.release(_acquire(pool), ApiError(429))  # no Retry-After: the pool's cooldown
+    assert (a.rate_limited, a.cooldown_until, b.cooldown_until) == (1, 1010.0, 1030.0)
+
+    # Every key is cooling down: acquire waits for the first one back
+    assert _acquire(pool) is a
+    assert clock.now >= 1010.0
+    pool.release(a)
+    clock.now = 1031.0
+    assert {_acquire(pool).key_id, _acquire(pool).key_id} == {a.key_id, b.key_id}
+
+
+def test_revoked_keys_are_skipped_until_none_are_left(clock):
+    pool = KeyPool("openai", ["sk-aaaa", "sk-bbbb"])
+    a, b = pool.keys
+    pool.release(_acquire(pool), ApiError(401))
+    assert a.revoked == "HTTP 401"
+    assert all(_acquire(pool) is b for _ in range(3))
+
+    pool.release(b, ApiError(402))
+    assert b.revoked == "quota exhausted"
+    with pytest.raises(NoHealthyKeyError):
+        _acquire(pool)
+
+
+class FakeProvider:
+    """Answers unless its key is in `failing` (key secret -> error to raise)."""
+
+    def __init__(self, api_key: str, failing: dict[str, Exception]):
+        self.api_key = api_key
+        self.failing = failing
+
+    async def query(self, text: str) -> ProviderResponse:
+        if self.api_key in self.failing:
+            raise self.failing[self.api_key]
+        return ProviderResponse("openai", "m", text, [], {}, 5, 10, 20)
+
+
+@pytest.fixture
+def failing(clock, monkeypatch) -> dict[str, Exception]:
+    """Errors by key secret for the runner's providers; the pool is `runner._key_pool("openai")`."""
+    pool = KeyPool("openai", ["sk-aaaa", "sk-bbbb"])
+    failing: dict[str, Exception] = {}
+    monkeypatch.setattr(runner, "_key_pool", lambda name: pool)
+    monkeypatch.setattr(
+        runner, "_create_provider", lambda name, model=None, api_key=None: FakeProvider(api_key, failing),
+    )
+    return failing
+
+
+def test_query_retries_a_rate_limited_request_on_another_key(failing):
+    a, b = runner._key_pool("openai").keys
+    failing["sk-aaaa"] = ApiError(429)
+
+    resp = asyncio.run(runner._query(Target("openai"), "hi"))
+    assert resp.api_key_id == b.key_id
+    assert (a.rate_limited, a.input_tokens, b.input_tokens, b.output_tokens) == (1, 0, 10, 20)
+    assert a.in_flight == b.in_flight == 0
+
+
+def test_query_does_not_retry_other_errors(failing):
+    a, b = runner._key_pool("openai").keys
+    failing["sk-aaaa"] = ApiError(500)
+
+    with pytest.raises(ApiError):
+        asyncio.run(runner._query(Target("openai"), "hi"))
+    assert (a.failures, a.revoked, a.cooldown_until, b.requests) == (1, None, 0.0, 0)
+
+
+def test_query_gives_up_after_every_key(failing):
+    failing.update({"sk-aaaa": ApiError(403), "sk-bbbb": ApiError(403)})
+
+    with pytest.raises(ApiError):
+        asyncio.run(runner._query(Target("openai"), "hi"))
+    assert [k.revoked for k in runner._key_pool("openai").keys] == ["HTTP 403", "HTTP 403"]
@@ -0,0 +1,90 @@
+"""RedirectResolver against a stand-in proxy server (httpx.MockTransport)."""
+
+from __future__ import annotations
+
+import asyncio
+import sqlite3
+
+import httpx
+import pytest
+
+from src.extraction.normalizer import normalize_citations
+from src.extraction.redirects import PROXY_HOST, RedirectResolver, resolve_citation_redirects
+from src.providers.base import ProviderResponse, RawCitation
+from src.storage import db
+
+PROXY = f"https://{PROXY_HOST}/grounding-api-redirect/"
+
+# Proxy key -> what the stand-in server answers to HEAD
+ANSWERS = {
+    "coke": httpx.Response(302, headers={"location": "https://in.coca-cola.com/brands?utm_source=gemini"}),
+    "pepsi": httpx.Response(301, headers={"location": "https://www.pepsico.com/x"}),
+    "landing": httpx.Response(200),
+    "busy": httpx.Response(429),
+    "timeout": httpx.Response(408),
+    "down": httpx.Response(503),
+    "no-head": httpx.Response(405),
+}
+
+
+class StandInProxy:
+    """Answers like the Vertex AI Search redirect proxy; counts requests per (method, key)."""
+
+    def __init__(self):
+        self.requests: list[tuple[str, str]] = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        key = request.url.path.rsplit("/", 1)[-1]
+        self.requests.append((request.method, key))
+        if key == "no-head" and request.method == "GET":
+            return httpx.Response(302, headers={"location": "https://www.thumsup.com/"})
+        return ANSWERS[key]
+
+
+@pytest.fixture
+def run_id(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, "DB_PATH", tmp_path / "geo.db")
+    db.init_db()
+    run_id = db.create_run(1, 1, 1)
+    resp = ProviderResponse(
+        provider="gemini", model="stand-in", raw_text="text",
+        raw_citations=[RawCitation(url=PROXY + key, title="example.com") for key in ANSWERS],
+        raw_response={}, latency_ms=1, input_tokens=1, output_tokens=1,
+    )
+    response_id = db.store_response(run_id, "p1", "prompt", resp)
+    db.store_citations(response_id, normalize_citations(resp))
+    return run_id
+
+
+def _resolve(server: StandInProxy, run_id: str):
+    resolver = RedirectResolver(transport=httpx.MockTransport(server))
+    return asyncio.run(resolve_citation_redirects(resolver, run_id))
+
+
+def test_redirects_repoint_citations(run_id):
+    stats = _resolve(StandInProxy(), run_id)
+
+    assert (stats.resolved, stats.not_redirects, stats.failed) == (3, 1, 3)
+    conn = sqlite3.connect(db.DB_PATH)
+    domains = dict(conn.execute("SELECT url, domain || ':' || is_coke_domain FROM citations").fetchall())
+    assert domains[PROXY + "coke"] == "coca-cola.com:1"
+    assert domains[PROXY + "pepsi"] == "pepsico.com:0"
+    assert domains[PROXY + "no-head"] == "thumsup.com:1"
+
+
+def test_definitive_answers_are_requested_once(run_id):
+    _resolve(StandInProxy(), run_id)
+    server = StandInProxy()
+    stats = _resolve(server, run_id)
+
+    # Redirects and the 200 are settled; only the 429/408/503 proxies are asked again
+    assert stats.failed == 3
+    assert sorted(key for _, key in server.requests) == ["busy", "down", "timeout"]
+
+
+def test_transient_answers_are_not_stored(run_id):
+    _resolve(StandInProxy(), run_id)
+
+    stored = db.get_redirects([PROXY + key for key in ANSWERS])
+    assert set(stored) == {PROXY + key for key in ("coke", "pepsi", "landing", "no-head")}
+    assert stored[PROXY + "landing"] is None